@@ -1,102 +1,96 @@
-from flask import Flask, request, jsonify
-from datetime import datetime, timedelta
+"""Flask backend of TravelGPT.
+
+Production:  gunicorn backend:app  (or `python backend.py`; settings in gunicorn.conf.py)
+Development: FLASK_DEBUG=1 python backend.py  (Flask's reloader and debugger)
+
+Each gunicorn worker runs at most MAX_CONCURRENT_RUNS agent calls at once and lets
+MAX_QUEUED_RUNS more wait up to QUEUE_TIMEOUT seconds; beyond that requests get 429
+with a Retry-After. On SIGTERM a worker answers new requests with 503, /ready turns
+503, and the generations already running get GRACEFUL_TIMEOUT seconds to finish.
+"""
+from flask import Flask, request, jsonify, Response
 from dotenv import load_dotenv
 import os
-from phi.agent import Agent
-from phi.model.groq import Groq
-from duckduckgo_search import DDGS
+import sys
+from travelgpt import TravelAgent, ddg_tools
+from travelgpt.admission import Admission, Rejected
+from travelgpt.compression import compress_flask_response, plan_headers, served_plan
+from travelgpt.instrumentation import metrics, PROMETHEUS_CONTENT_TYPE
+from travelgpt.preflight import InvalidTrip, normalize_trip
+from travelgpt.gazetteer import gazetteer
+from travelgpt.destination_index import destination_index
+from travelgpt.warmup import Warmup, PREWARM
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
-
-# Initialize Groq Llama model and DuckDuckGo search tool
-def duckduckgo_search(query):
-    ddg = DDGS()
-    return ddg.search(query)
-
-travel_agent = Agent(
-    name="Travel Planner",
-    model=Groq(id="llama-3.3-70b-versatile"),
-    tools=[duckduckgo_search],
-    instructions=[
-        "You are a travel planning assistant using Groq Llama.",
-        "Help users plan their trips by researching destinations, finding attractions, suggesting accommodations, and providing transportation options.",
-        "Give me relevant live links for each place and hotel you provide by searching on the internet.",
-        "Always verify information is current before making recommendations."
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
+# gzip/brotli by Accept-Encoding, and 304 when a GET's If-None-Match names the plan already held
+app.after_request(compress_flask_response)
+# Caps the agent calls running and waiting in this process; gunicorn.conf.py drains it on SIGTERM
+admission = Admission()
+app.extensions["admission"] = admission
+
+# Travel agent backed by Groq Llama and DuckDuckGo search, built in the background
+# so the server starts answering (and /ready can be probed) right away
+travel_agent = TravelAgent(tools=ddg_tools)
+warmup = Warmup(travel_agent.warm, destination_index.load, gazetteer.load)
+if PREWARM:
+    warmup.start()
+
+@app.errorhandler(Rejected)
+def rejected(e):
+    """429 when saturated, 503 while draining; both tell the client when to retry."""
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, e.status
+
+def json_object():
+    """The request's JSON body if it is an object, else None (for a 400 rather than a 500)."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
 
 @app.route("/generate-plan", methods=["POST"])
+@admission.limit
 def generate_plan():
     """Generate a comprehensive travel plan based on user inputs."""
     try:
-        data = request.json
-        destination = data.get("destination")
-        duration = data.get("duration")
-        start_date = datetime.strptime(data.get("start_date"), "%Y-%m-%d")
-        budget = data.get("budget")
-        travel_style = data.get("travel_style", [])
-        present_location = data.get("present_location")
-
-        if not destination or not duration or not budget:
-            return jsonify({"error": "Missing required fields"}), 400
-
-        end_date = start_date + timedelta(days=duration)
-        prompt = f"""
-        Create a comprehensive travel plan for {destination} for {duration} days starting from {start_date} and ending on {end_date}.
-
-        Travel Preferences:
-        - Budget Level: {budget}
-        - Travel Styles: {', '.join(travel_style)}
-
-        Please provide a detailed itinerary that includes:
-
-        1. 🌞 Best Time to Visit
-        - Seasonal highlights
-        - Weather considerations for each day from {start_date} to {end_date} with source links. If the weather is bad on any particular day, suggest alternative dates with good weather.
-
-        2. 🏨 Accommodation Recommendations
-        - {budget} range hotels/stays
-        - Locations and proximity to attractions
-
-        3. 🗺️ Day-by-Day Itinerary
-        - Detailed daily activities
-        - Must-visit attractions
-        - Local experiences aligned with travel styles
-
-        4. 🍽️ Culinary Experiences
-        - Local cuisine highlights
-        - Recommended restaurants
-        - Food experiences matching travel style
-
-        5. 💡 Practical Travel Tips
-        - Local transportation options
-        - Cultural etiquette
-        - Safety recommendations
-        - Estimated daily budget breakdown
-
-        6. 💰 Estimated Total Trip Cost
-        - Breakdown of expenses
-        - Money-saving tips
-
-        7. 🚂 Transportation from {present_location} to {destination}
-        - Trains/buses available with timings and booking links for travel dates between {start_date} and {end_date}.
-        """
-        response = travel_agent.run(prompt)
-        content = response.content if hasattr(response, 'content') else str(response)
-        return jsonify({"travel_plan": content}), 200
+        data = json_object()
+        if data is None:
+            return jsonify({"error": "Expected a JSON object"}), 400
+        # Dates, places, styles and budget are checked and normalized before any tokens are spent
+        trip = normalize_trip(
+            data.get("destination"), data.get("present_location"), data.get("start_date"),
+            end_date=data.get("end_date"), budget=data.get("budget"), travel_style=data.get("travel_style", []),
+            duration=data.get("duration")
+        )
+        travel_plan = travel_agent.generate_travel_plan(*trip.args())
+        response = jsonify({"travel_plan": travel_plan, "metadata": travel_plan.metadata, "trip": trip.as_dict()})
+        response.headers.update(plan_headers(travel_plan))
+        return response, 200
+    except InvalidTrip as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/plans/<version>", methods=["GET"])
+def get_plan(version):
+    """A plan served earlier, by version: 304 when If-None-Match already names it."""
+    plan = served_plan(version)
+    if plan is None:
+        return jsonify({"error": f"Plan {version} not found"}), 404
+    response = jsonify({"travel_plan": plan})
+    response.headers.update(plan_headers(plan))
+    return response, 200
+
 @app.route("/ask-question", methods=["POST"])
+@admission.limit
 def ask_question():
     """Answer specific questions about the generated travel plan."""
     try:
-        data = request.json
+        data = json_object()
+        if data is None:
+            return jsonify({"error": "Expected a JSON object"}), 400
         travel_plan = data.get("travel_plan")
         question = data.get("question")
         destination = data.get("destination")
@@ -104,19 +98,28 @@ def ask_question():
         if not travel_plan or not question or not destination:
             return jsonify({"error": "Missing required fields"}), 400
 
-        context_question = f"""
-        I have a travel plan for {destination}. Here's the existing plan:
-        {travel_plan}
-
-        Now, please answer this specific question: {question}
-
-        Provide a focused, concise answer that relates to the existing travel plan if possible.
-        """
-        response = travel_agent.run(context_question)
-        content = response.content if hasattr(response, 'content') else str(response)
-        return jsonify({"answer": content}), 200
+        answer = travel_agent.answer_question(question, travel_plan, destination)
+        return jsonify({"answer": answer, "metadata": answer.metadata}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 503 until the agent and its tool clients are loaded, and while draining."""
+    status = warmup.status()
+    status["admission"] = admission.status()
+    ready = status["ready"] and not status["admission"]["draining"]
+    return jsonify(status), 200 if ready else 503
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Expose request, LLM and tool timings in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    if os.getenv("FLASK_DEBUG") == "1":
+        app.run(debug=True)
+    else:
+        here = os.path.dirname(os.path.abspath(__file__))
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "--chdir", here,
+                                  "--config", os.path.join(here, "gunicorn.conf.py"), "backend:app"])
@@ -1,17 +1,76 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
+"""FastAPI backend for the Flutter/Dart client.
+
+Single process:   uvicorn backend_dart:app
+Several workers:  TRAVELGPT_CACHE_BACKEND=sqlite uvicorn backend_dart:app --workers 4
+                  (or `python backend_dart.py`, which reads WEB_CONCURRENCY)
+
+Each worker builds its own agent. With TRAVELGPT_CACHE_BACKEND=sqlite the plan,
+tool, search and weather caches live in one SQLite file in WAL mode
+(TRAVELGPT_CACHE_PATH), so every worker hits what any worker has fetched. Set
+PLAN_CACHE_TTL to also reuse whole replies for identical requests. /metrics is
+per worker.
+
+Every agent request is a job whose id comes back in the X-Job-Id header (clients
+may also choose it by sending X-Job-Id). A job stops early when the client
+disconnects, when `DELETE /jobs/{id}` is called, or when a newer request carries
+the same X-Client-Id. At most MAX_CONCURRENT_RUNS jobs run at once per worker.
+Jobs are per worker, so a DELETE only reaches jobs of the worker that serves it.
+
+/generate-plans takes {"trips": [...]} of up to MAX_BATCH_SIZE /generate-plan bodies and
+returns one plan (or error) per trip, in order. Trips to the same destination on the
+same dates, budget and styles are researched once; only each departure city's journey
+is planned separately. At most BATCH_CONCURRENCY agent runs of a batch run at once.
+
+/modify-plan and /update-plan accept "response_format": "patch" to get back only the
+changes against the travel_plan that was sent, instead of the whole new plan.
+
+Trip requests are validated and normalized before any agent run (travelgpt/preflight.py):
+bad dates, places, styles or budgets get 422, and the normalized trip comes back under
+"trip", with any corrections listed in "fixes" and any places that may have been meant
+in "suggestions".
+
+Responses are gzip- or brotli-compressed as the client's Accept-Encoding allows. Plan
+responses carry an ETag of the plan version, telling the client whether the plan changed,
+and a Content-Location: GET /plans/<version> serves the plan again, or an empty 304 when
+If-None-Match names it. The plan endpoints are POSTs and always return their result.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import List, Literal, Optional
 from datetime import date
-from phi.agent import Agent
-from phi.model.groq import Groq
-from phi.tools.serpapi_tools import SerpApiTools
-from phi.tools.duckduckgo import DuckDuckGo
+from travelgpt import TravelAgent
+from travelgpt.batch import MAX_BATCH_SIZE, TRIP_FIELDS
+from travelgpt.cancellation import Cancelled
+from travelgpt.compression import CompressionMiddleware, plan_headers, served_plan
+from travelgpt.instrumentation import metrics, PROMETHEUS_CONTENT_TYPE
+from travelgpt.jobs import jobs
+from travelgpt.plan_diff import diff_plans
+from travelgpt.preflight import InvalidTrip, normalize_trip
+from travelgpt.gazetteer import gazetteer
+from travelgpt.destination_index import destination_index
+from travelgpt.warmup import Warmup, PREWARM
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Travel Agent API")
+# The agent (phi, Groq and the search tools) is built on first use; with TRAVELGPT_PREWARM
+# it is built in the background at startup and /ready turns 200 once that is done.
+travel_agent = TravelAgent()
+warmup = Warmup(travel_agent.warm, destination_index.load, gazetteer.load)
+
+@asynccontextmanager
+async def lifespan(app):
+    if PREWARM:
+        warmup.start()
+    yield
+
+app = FastAPI(title="Travel Agent API", lifespan=lifespan)
+# gzip/brotli by Accept-Encoding, and 304 when a GET's If-None-Match names the plan already held
+app.add_middleware(CompressionMiddleware)
 
 class TravelPreferences(BaseModel):
     destination: str
@@ -20,6 +79,36 @@ class TravelPreferences(BaseModel):
     end_date: date
     budget: str
     travel_styles: List[str]
+    _trip = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def preflight(self):
+        """Answers 422 for trips that cannot be planned, and normalizes the rest, before any tokens are spent."""
+        try:
+            trip = normalize_trip(self.destination, self.present_location, self.start_date, self.end_date,
+                                  self.budget, self.travel_styles)
+        except InvalidTrip as e:
+            raise ValueError(str(e))
+        self.destination, self.present_location = trip.destination, trip.present_location
+        self.budget, self.travel_styles = trip.budget, list(trip.travel_style)
+        self._trip = trip
+        return self
+
+    @property
+    def trip(self):
+        return self._trip
+
+class BatchTrip(BaseModel):
+    """A trip of a batch, only parsed here: batch.py checks each trip, so a bad one fails alone."""
+    destination: Optional[str] = None
+    present_location: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    budget: Optional[str] = None
+    travel_styles: List[str] = []
+
+class BatchRequest(BaseModel):
+    trips: List[BatchTrip] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
 
 class QuestionRequest(BaseModel):
     question: str
@@ -29,150 +118,135 @@ class QuestionRequest(BaseModel):
 class ModifyRequest(BaseModel):
     travel_plan: str
     modifications: str
+    # "patch" returns only the changes against travel_plan (see travelgpt/plan_diff.py)
+    response_format: Literal["full", "patch"] = "full"
 
-class TravelAgent:
-    def __init__(self):
-        self.agent = Agent(
-            name="Comprehensive Travel Assistant",
-            model=Groq(id="llama-3.3-70b-versatile"),
-            tools=[DuckDuckGo(),SerpApiTools()],
-            instructions=[
-                "You are a comprehensive travel planning assistant with expertise in all aspects of travel.",
-                "For every recommendation and data point, you MUST provide working source links.",
-                "Your knowledge spans across:",
-                "- Seasonal travel timing and weather patterns",
-                "- Transportation options and booking",
-                "- Accommodation recommendations",
-                "- Day-by-day itinerary planning",
-                "- Local cuisine and restaurant recommendations",
-                "- Practical travel tips and cultural advice",
-                "- Budget estimation and cost breakdown",
-                "Format all responses in markdown with clear headings (##) and bullet points.",
-                "Use [text](url) format for all hyperlinks.",
-                "Verify all links are functional before including them.",
-                "Organize information clearly with appropriate sections based on the query type."
-            ]
-        )
-
-    def generate_travel_plan(self, preferences: TravelPreferences) -> str:
-        prompt = f"""Act as a Personalized Travel Expert
-You are a travel expert specializing in creating tailored, detailed travel plans. Design a comprehensive itinerary for a trip to {preferences.destination} spanning {preferences.end_date - preferences.start_date}.days days, starting on {preferences.start_date} and ending on {preferences.end_date}.
-
-Traveler Preferences:
-Budget Level: {preferences.budget}
-Travel Styles: {', '.join(preferences.travel_styles)}
-Your Task:
-Provide a structured markdown response that includes the following elements:
-
-🌞 Best Time to Visit:
- - Highlight seasonal considerations for visiting {preferences.destination}.
- - Day-by-day weather forecast from {preferences.start_date} to {preferences.end_date}
- - Alternative date suggestions if weather is unfavorable 
- - Include source links for all weather data.
- - Offer clothing recommendations for each day based on weather forecasts. For example:
-    - Warm jackets and boots for cold, snowy days.
-    - Light, breathable clothing for warm, sunny days.
-    - Raincoats and umbrellas for rainy conditions.
-
-🏨 Accommodation Recommendations:
- - Suggest accommodations within the {preferences.budget} range.
- - Include pros and cons, prices, amenities, and booking links.
- - Indicate the distance and travel time to major attractions.  Include map links where possible.
- - Format your response using markdown with clear headings (##) and bullet points. Use [text](url) format for hyperlinks. Verify all links are functional before including them.
-
-🗺️ Day-by-Day Itinerary:
- - Create a detailed itinerary for each day, broken into specific time slots (e.g., "9:00 AM–12:00 PM: Visit [Attraction]").
- - Incorporate activities, attractions, and cultural experiences that align with the specified travel styles.
- - Include booking links, costs, and recommendations for optimizing time and enjoyment.
-
-🍽️ Culinary Highlights:
- - Recommend local cuisines, restaurants, and food experiences.
- - Provide suggestions based on the travel styles (e.g., street food, fine dining, or unique culinary tours).
- - Include price ranges, opening hours, and reservation links, where available.
-
-💡 Practical Travel Tips:
- - List local and intercity transportation options (e.g., public transit, car rentals, taxis).
- - Provide advice on cultural etiquette, local customs, and safety tips.
- - Include a suggested daily budget breakdown for meals, transport, and activities.
-
-💰 Estimated Total Trip Cost:
- - Provide an itemized expense breakdown by category according to {preferences.budget}
- - Accommodation, transportation, meals, activities, and miscellaneous expenses.
- - Offer budget-saving tips specific to {preferences.budget} constraints.
-
-🚂 Transportation Details:
- - Recommend transportation options from {preferences.present_location} to {preferences.destination}.
- - Include schedules, pricing, duration, and booking links for trains, buses, or flights.
-
-Output Requirements:
- - Use clear, easy-to-read markdown with headings and bullet points for each section.
- - Provide source links, booking references, and maps wherever applicable.
- - Ensure all details are actionable and well-organized to facilitate ease of planning.
-"""
-        response = self.agent.run(prompt)
-        return response.content if hasattr(response, 'content') else str(response)
-
-    def answer_question(self, request: QuestionRequest, preferences: TravelPreferences) -> str:
-        prompt = f"""Using the context of this travel plan for {preferences.destination}:
-
-{request.travel_plan}
-
-Please answer this specific question: {request.question}
-
-Guidelines for your response:
-1. Focus specifically on answering the question asked
-2. Reference relevant parts of the travel plan when applicable
-3. Provide new information if the travel plan doesn't cover the topic
-4. Include verified source links for any new information
-5. Keep the response concise but comprehensive
-6. Use markdown formatting for clarity
-
-Format your response with appropriate headings and verify all included links."""
-        response = self.agent.run(prompt)
-        return response.content if hasattr(response, 'content') else str(response)
-
-    def modify_plan(self, request: ModifyRequest) -> str:
-        prompt = f"""Modify the following travel plan based on the specified changes:
-
-Original Travel Plan:
-{request.travel_plan}
-
-Modifications:
-{request.modifications}
-
-Guidelines:
-1. Integrate changes seamlessly into the existing plan.
-2. Maintain the original structure and formatting.
-3. Provide source links for any new information added.
-4. Ensure all details are accurate and up-to-date.
-
-Return the updated travel plan in markdown format."""
-        response = self.agent.run(prompt)
-        return response.content if hasattr(response, 'content') else str(response)
-
-
-travel_agent = TravelAgent()
-
-@app.post("/generate-plan")
-async def generate_plan(preferences: TravelPreferences):
+class UpdateRequest(BaseModel):
+    travel_plan: str
+    present_location: str
+    extra_time: float
+    response_format: Literal["full", "patch"] = "full"
+
+
+async def watch_disconnect(http_request, job):
+    while not job.token.cancelled:
+        if await http_request.is_disconnected():
+            job.token.cancel("client disconnected")
+            return
+        await asyncio.sleep(0.5)
+
+async def run_job(http_request, response, kind, func, *args):
+    """Runs an agent call as a cancellable job and maps its outcome to an HTTP response."""
+    job_id = http_request.headers.get("X-Job-Id")
+    if job_id and jobs.get(job_id) is not None:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already running")
+    job = jobs.create(kind, job_id=job_id, client_id=http_request.headers.get("X-Client-Id"))
+    response.headers["X-Job-Id"] = job.id
+    watcher = asyncio.create_task(watch_disconnect(http_request, job))
     try:
-        travel_plan = travel_agent.generate_travel_plan(preferences)
-        return {"travel_plan": travel_plan}
+        return await jobs.run(job, func, *args)
+    except Cancelled as e:
+        raise HTTPException(status_code=409, detail=f"Job {job.id} was cancelled: {e}", headers={"X-Job-Id": job.id})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Job-Id": job.id})
+    finally:
+        watcher.cancel()
+
+def plan_response(response, field, base_plan, plan, response_format):
+    response.headers.update(plan_headers(plan))
+    if response_format == "patch":
+        return {"patch": diff_plans(base_plan, plan), "metadata": plan.metadata}
+    return {field: plan, "metadata": plan.metadata}
+
+def batch_entry(plan, fields):
+    """The response entry of one trip of a batch: its plan, or what stopped it."""
+    if isinstance(plan, InvalidTrip):
+        return {"error": str(plan), "errors": plan.errors}
+    if isinstance(plan, Exception):
+        return {"error": str(plan)}
+    # Normalizing again costs microseconds (the gazetteer lookups are cached)
+    trip = normalize_trip(*(fields[f] for f in TRIP_FIELDS))
+    return {"travel_plan": plan, "metadata": plan.metadata, "trip": trip.as_dict()}
+
+@app.post("/generate-plan")
+async def generate_plan(preferences: TravelPreferences, http_request: Request, response: Response):
+    travel_plan = await run_job(
+        http_request, response, "generate-plan", travel_agent.generate_travel_plan,
+        preferences.destination,
+        preferences.present_location,
+        preferences.start_date,
+        preferences.end_date,
+        preferences.budget,
+        preferences.travel_styles
+    )
+    response.headers.update(plan_headers(travel_plan))
+    return {"travel_plan": travel_plan, "metadata": travel_plan.metadata, "trip": preferences.trip.as_dict()}
+
+@app.post("/generate-plans")
+async def generate_plans(request: BatchRequest, http_request: Request, response: Response):
+    """One plan per trip; trips with the same destination, dates, budget and styles share their research."""
+    trips = [{"destination": p.destination, "present_location": p.present_location, "start_date": p.start_date,
+              "end_date": p.end_date, "budget": p.budget, "travel_style": p.travel_styles} for p in request.trips]
+    plans = await run_job(http_request, response, "generate-plans", travel_agent.generate_travel_plans, trips)
+    failures = [plan for plan in plans if isinstance(plan, Exception) and not isinstance(plan, InvalidTrip)]
+    if len(failures) == len(plans):
+        raise HTTPException(status_code=500, detail=str(plans[0]), headers={"X-Job-Id": response.headers["X-Job-Id"]})
+    return {"plans": [batch_entry(plan, trip) for plan, trip in zip(plans, trips)]}
 
 @app.post("/answer-question")
-async def answer_question(request: QuestionRequest):
-    try:
-        answer = travel_agent.answer_question(request)
-        return {"answer": answer}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def answer_question(request: QuestionRequest, http_request: Request, response: Response):
+    answer = await run_job(http_request, response, "answer-question", travel_agent.answer_question,
+                           request.question, request.travel_plan, request.destination)
+    return {"answer": answer, "metadata": answer.metadata}
 
 @app.post("/modify-plan")
-async def modify_plan(request: ModifyRequest):
-    try:
-        modified_plan = travel_agent.modify_plan(request)
-        return {"modified_plan": modified_plan}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def modify_plan(request: ModifyRequest, http_request: Request, response: Response):
+    modified_plan = await run_job(http_request, response, "modify-plan", travel_agent.modify_plan,
+                                  request.travel_plan, request.modifications)
+    return plan_response(response, "modified_plan", request.travel_plan, modified_plan, request.response_format)
+
+@app.post("/update-plan")
+async def update_plan(request: UpdateRequest, http_request: Request, response: Response):
+    updated_plan = await run_job(http_request, response, "update-plan", travel_agent.update_travel_plan,
+                                 request.present_location, request.extra_time, request.travel_plan)
+    return plan_response(response, "updated_plan", request.travel_plan, updated_plan, request.response_format)
+
+@app.api_route("/plans/{version}", methods=["GET", "HEAD"])
+async def get_plan(version: str, response: Response):
+    """A plan served earlier, by version: 304 when If-None-Match already names it."""
+    plan = served_plan(version)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=f"Plan {version} not found")
+    response.headers.update(plan_headers(plan))
+    return {"travel_plan": plan}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such job in flight")
+    return job.as_dict()
+
+@app.delete("/jobs/{job_id}", status_code=202)
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id, "cancelled by client")
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such job in flight")
+    return job.as_dict()
+
+@app.get("/ready")
+async def ready():
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        os.environ.setdefault("TRAVELGPT_CACHE_BACKEND", "sqlite")
+    uvicorn.run("backend_dart:app", host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")), workers=workers)
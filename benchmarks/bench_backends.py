@@ -0,0 +1,216 @@
+"""Offline throughput benchmark for backend.py (Flask) and backend_dart.py (FastAPI).
+
+Groq, SerpApi/DuckDuckGo and OpenWeatherMap are replaced by the stand-ins in
+benchmarks/fakes.py, and the apps are driven in-process at increasing concurrency.
+
+    python -m benchmarks.bench_backends --backend dart --concurrency 1 4 16 --requests 64
+    python -m benchmarks.bench_backends --backend flask --time-scale 0.1 --json bench.json
+    python -m benchmarks.bench_backends --baseline bench.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from benchmarks.fakes import FakeAgent, FakeServices
+from travelgpt.tool_cache import tool_cache
+
+DESTINATIONS = ["Paris", "Kyoto", "Lisbon", "Cusco", "Reykjavik", "Cape Town", "Hanoi", "Vancouver"]
+STYLES = [["Culture", "Food"], ["Nature", "Adventure"], ["Relaxation"], ["Shopping", "Entertainment"]]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def plan_payload(i, flask=False):
+    # Pre-flight validation refuses trips in the past, so start from next week
+    start = date.today() + timedelta(days=7 + i % 30)
+    payload = {
+        "destination": DESTINATIONS[i % len(DESTINATIONS)],
+        "present_location": DESTINATIONS[(i + 3) % len(DESTINATIONS)],
+        "start_date": start.isoformat(),
+        "budget": ["Budget", "Moderate", "Luxury"][i % 3],
+    }
+    if flask:
+        payload.update(duration=3 + i % 5, travel_style=STYLES[i % len(STYLES)])
+    else:
+        payload.update(end_date=(start + timedelta(days=3 + i % 5)).isoformat(), travel_styles=STYLES[i % len(STYLES)])
+    return payload
+
+
+def scenarios(backend):
+    """(endpoint, payload factory) pairs for each backend."""
+    plan = "## Day 1\n- 9:00 AM–12:00 PM: Visit the old town\n" * 20
+    if backend == "flask":
+        return [
+            ("/generate-plan", lambda i: plan_payload(i, flask=True)),
+            ("/ask-question", lambda i: {"travel_plan": plan, "question": f"Where to eat on day {i % 5}?",
+                                         "destination": DESTINATIONS[i % len(DESTINATIONS)]}),
+        ]
+    return [
+        ("/generate-plan", plan_payload),
+        ("/answer-question", lambda i: {"travel_plan": plan, "question": f"Where to eat on day {i % 5}?",
+                                        "destination": DESTINATIONS[i % len(DESTINATIONS)]}),
+        ("/modify-plan", lambda i: {"travel_plan": plan, "modifications": f"Add a rest afternoon on day {i % 5}"}),
+    ]
+
+
+def load_backend(backend, services):
+    """Imports the backend module and swaps its phi agent for the fake one."""
+    # The fake replaces the agent anyway, so don't build the real one in the background
+    os.environ.setdefault("TRAVELGPT_PREWARM", "0")
+    module = importlib.import_module("backend" if backend == "flask" else "backend_dart")
+    module.travel_agent.agent = FakeAgent(services)
+    if hasattr(module, "get_weather"):
+        module.get_weather = services.weather
+    return module
+
+
+def drive_flask(app, endpoint, make_payload, concurrency, total):
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        started = time.perf_counter()
+        response = local.client.post(endpoint, json=make_payload(i))
+        body = response.get_data()
+        return time.perf_counter() - started, response.status_code, len(body)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(total)))
+
+
+async def _drive_asgi(app, endpoint, make_payload, concurrency, total):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(endpoint, json=make_payload(i))
+                return time.perf_counter() - started, response.status_code, len(response.content)
+
+        return await asyncio.gather(*(one(i) for i in range(total)))
+
+
+def drive_asgi(app, endpoint, make_payload, concurrency, total):
+    return asyncio.run(_drive_asgi(app, endpoint, make_payload, concurrency, total))
+
+
+def run_benchmark(backend, concurrency_levels, total, services):
+    module = load_backend(backend, services)
+    drive = drive_flask if backend == "flask" else drive_asgi
+    results = []
+    for endpoint, make_payload in scenarios(backend):
+        for concurrency in concurrency_levels:
+            # Every level starts cold so the levels stay comparable
+            tool_cache.clear()
+            tracemalloc.start()
+            started = time.perf_counter()
+            samples = drive(module.app, endpoint, make_payload, concurrency, total)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            latencies = [s[0] for s in samples if s[1] < 400]
+            results.append({
+                "backend": backend,
+                "endpoint": endpoint,
+                "concurrency": concurrency,
+                "requests": total,
+                "errors": sum(1 for s in samples if s[1] >= 400),
+                "throughput_rps": total / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "mean_ms": (statistics.mean(latencies) * 1000) if latencies else 0.0,
+                "avg_response_bytes": sum(s[2] for s in samples) / len(samples),
+                "peak_traced_mb": peak / 1e6,
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            })
+    return results
+
+
+def print_report(results):
+    header = f"{'backend':<8}{'endpoint':<18}{'conc':>5}{'req':>6}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>9}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['backend']:<8}{r['endpoint']:<18}{r['concurrency']:>5}{r['requests']:>6}{r['errors']:>5}{r['throughput_rps']:>9.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['peak_traced_mb']:>9.1f}{r['max_rss_mb']:>9.1f}")
+
+
+def compare(results, baseline, max_regression):
+    """Returns the rows whose p95 latency or throughput regressed by more than `max_regression`."""
+    previous = {(r["backend"], r["endpoint"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r["backend"], r["endpoint"], r["concurrency"]))
+        if old is None:
+            continue
+        if old["p95_ms"] and r["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            regressions.append((r, "p95_ms", old["p95_ms"], r["p95_ms"]))
+        if old["throughput_rps"] and r["throughput_rps"] < old["throughput_rps"] * (1 - max_regression):
+            regressions.append((r, "throughput_rps", old["throughput_rps"], r["throughput_rps"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["flask", "dart", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="requests per endpoint and concurrency level")
+    parser.add_argument("--llm-ttft", default="lognormal:0.6,0.3")
+    parser.add_argument("--token-rate", type=float, default=250.0, help="completion tokens per second")
+    parser.add_argument("--completion-tokens", default="uniform:600,1800")
+    parser.add_argument("--tool-latency", default="lognormal:0.4,0.5")
+    parser.add_argument("--tool-calls", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every simulated delay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json output")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    services = FakeServices(llm_ttft=args.llm_ttft, token_rate=args.token_rate,
+                            completion_tokens=args.completion_tokens, tool_latency=args.tool_latency,
+                            tool_calls=args.tool_calls, seed=args.seed, time_scale=args.time_scale)
+    backends = ["flask", "dart"] if args.backend == "both" else [args.backend]
+    results = []
+    for backend in backends:
+        results.extend(run_benchmark(backend, args.concurrency, args.requests, services))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for r, metric, old, new in regressions:
+            print(f"REGRESSION {r['backend']} {r['endpoint']} c={r['concurrency']}: {metric} {old:.2f} -> {new:.2f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Load test of the production Flask serving mode: backpressure under saturation and graceful drain.
+
+Starts backend.py under gunicorn with gunicorn.conf.py and the fake agent of
+benchmarks/fakes.py, then runs two scenarios against it over real sockets:
+
+burst  sends --burst-factor times (MAX_CONCURRENT_RUNS + MAX_QUEUED_RUNS) concurrent
+       /generate-plan requests. Every request must get 200 or a fast 429 carrying
+       Retry-After; none may fail with a 5xx or a dropped connection.
+drain  fills every run slot and the queue, then sends SIGTERM to gunicorn. The
+       generations already running must finish with 200, the queued ones must get
+       503, and the server must exit cleanly within GRACEFUL_TIMEOUT.
+
+    python -m benchmarks.bench_backpressure
+    python -m benchmarks.bench_backpressure --max-running 2 --max-queued 2 --time-scale 0.5 --json backpressure.json
+
+Exits 1 when a check fails.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_backends import load_backend, percentile, plan_payload
+from benchmarks.fakes import FakeServices
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_app():
+    """gunicorn app factory: backend.py with the fake agent, slowed by BENCH_TIME_SCALE."""
+    services = FakeServices(llm_ttft="const:0.5", completion_tokens="const:1000", tool_latency="const:0.3",
+                            time_scale=float(os.getenv("BENCH_TIME_SCALE", "0.2")))
+    return load_backend("flask", services).app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, max_running, max_queued, queue_timeout, time_scale, graceful_timeout):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="1", MAX_CONCURRENT_RUNS=str(max_running),
+               MAX_QUEUED_RUNS=str(max_queued), QUEUE_TIMEOUT=str(queue_timeout), GRACEFUL_TIMEOUT=str(graceful_timeout),
+               BENCH_TIME_SCALE=str(time_scale), TRAVELGPT_PREWARM="0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", os.path.join(ROOT, "gunicorn.conf.py"),
+                               "benchmarks.bench_backpressure:fake_app()"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if request(port, "GET", "/ready")["status"] == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"gunicorn did not start: {server.stderr.read().decode(errors='replace')[-2000:]}")
+
+
+def request(port, method, path, payload=None, timeout=120):
+    """One request on a fresh connection: {status, seconds, retry_after, body} or {status: "refused"|"error"}."""
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else None
+        connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        data = response.read()
+        return {"status": response.status, "seconds": time.perf_counter() - started,
+                "retry_after": response.getheader("Retry-After"), "body": data}
+    except (ConnectionRefusedError, ConnectionResetError):
+        # Reset: the connection was still in the backlog of a listener that has since closed
+        if method == "GET":
+            raise
+        return {"status": "refused", "seconds": time.perf_counter() - started}
+    except (OSError, http.client.HTTPException) as e:
+        return {"status": "error", "seconds": time.perf_counter() - started, "error": repr(e)}
+    finally:
+        connection.close()
+
+
+def admission_status(port):
+    return json.loads(request(port, "GET", "/ready")["body"])["admission"]
+
+
+def summarize(name, results):
+    by_status = {}
+    for r in results:
+        by_status.setdefault(str(r["status"]), []).append(r["seconds"])
+    row = {"scenario": name, "requests": len(results)}
+    for status, seconds in sorted(by_status.items()):
+        row[status] = {"count": len(seconds), "p50_s": round(percentile(seconds, 50), 3),
+                       "p95_s": round(percentile(seconds, 95), 3)}
+    retry_after = sorted({int(r["retry_after"]) for r in results if r.get("retry_after")})
+    if retry_after:
+        row["retry_after_s"] = retry_after
+    return row
+
+
+def burst(port, args):
+    capacity = args.max_running + args.max_queued
+    total = capacity * args.burst_factor
+    barrier = threading.Barrier(total)
+
+    def one(i):
+        barrier.wait()
+        return request(port, "POST", "/generate-plan", plan_payload(i, flask=True))
+
+    with ThreadPoolExecutor(max_workers=total) as pool:
+        results = list(pool.map(one, range(total)))
+
+    row = summarize("burst", results)
+    ok = [r for r in results if r["status"] == 200]
+    rejected = [r for r in results if r["status"] == 429]
+    failures = []
+    if len(ok) + len(rejected) != total:
+        failures.append(f"{total - len(ok) - len(rejected)} requests got neither 200 nor 429")
+    if len(ok) < capacity:
+        failures.append(f"only {len(ok)} of {capacity} admitted requests succeeded")
+    if not rejected:
+        failures.append("no request was rejected although the burst exceeded capacity")
+    if any(not r["retry_after"] for r in rejected):
+        failures.append("a 429 came without Retry-After")
+    if rejected and percentile([r["seconds"] for r in rejected], 95) > args.max_reject_seconds:
+        failures.append(f"429s took longer than {args.max_reject_seconds}s to arrive")
+    return row, failures
+
+
+def drain(port, server, args):
+    capacity = args.max_running + args.max_queued
+    with ThreadPoolExecutor(max_workers=capacity) as pool:
+        futures = [pool.submit(request, port, "POST", "/generate-plan", plan_payload(i, flask=True))
+                   for i in range(capacity)]
+        deadline = time.monotonic() + 10
+        status = admission_status(port)
+        while (status["running"], status["queued"]) != (args.max_running, args.max_queued):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"the server never filled up: {status}")
+            time.sleep(0.05)
+            status = admission_status(port)
+
+        stopped = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        time.sleep(0.2)
+        late = request(port, "POST", "/generate-plan", plan_payload(capacity, flask=True), timeout=5)
+        results = [f.result() for f in futures]
+    exit_code = server.wait(timeout=args.graceful_timeout + 10)
+    shutdown_seconds = time.perf_counter() - stopped
+
+    row = summarize("drain", results)
+    row.update(late_request=late["status"], exit_code=exit_code, shutdown_s=round(shutdown_seconds, 3))
+    statuses = sorted(r["status"] for r in results if isinstance(r["status"], int))
+    failures = []
+    if statuses.count(200) != args.max_running:
+        failures.append(f"{statuses.count(200)} of {args.max_running} running generations finished")
+    if statuses.count(503) != args.max_queued:
+        failures.append(f"{statuses.count(503)} of {args.max_queued} queued requests got 503")
+    if late["status"] not in ("refused", 503):
+        failures.append(f"a request after SIGTERM got {late['status']}")
+    if exit_code != 0:
+        failures.append(f"gunicorn exited with {exit_code}")
+    return row, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-running", type=int, default=4, help="MAX_CONCURRENT_RUNS of the server")
+    parser.add_argument("--max-queued", type=int, default=4, help="MAX_QUEUED_RUNS of the server")
+    parser.add_argument("--queue-timeout", type=float, default=60)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--burst-factor", type=int, default=3, help="burst size as a multiple of running + queued")
+    parser.add_argument("--max-reject-seconds", type=float, default=0.5, help="p95 bound on the time to a 429")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="multiply every simulated delay")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    rows, failures = [], []
+    port = free_port()
+    server = start_server(port, args.max_running, args.max_queued, args.queue_timeout, args.time_scale,
+                          args.graceful_timeout)
+    try:
+        for scenario in (burst, drain):
+            row, failed = scenario(port, args) if scenario is burst else scenario(port, server, args)
+            rows.append(row)
+            failures.extend(f"{row['scenario']}: {f}" for f in failed)
+            print(json.dumps(row))
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Bytes on the wire and time to last byte of a plan response, per encoding, on both backends.
+
+The agent is replaced by a stub returning a link-heavy plan of --plan-kb kilobytes, and
+each backend serves /generate-plan in-process with Accept-Encoding identity, gzip and
+br, plus a revalidation: a GET of the plan's Content-Location (/plans/<version>) with
+its ETag in If-None-Match, which must get an empty 304. Time to last byte adds the measured server
+and client decode time to a simple network model (one round trip plus bytes over the
+link's bandwidth) for each --network profile.
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --plan-kb 80 --network slow-3g 4g --json compression.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_backends import load_backend, plan_payload
+from benchmarks.fakes import FakeRunResponse, FakeServices
+from travelgpt.compression import _brotli
+
+# name: (bandwidth in Mbit/s, round-trip time in ms)
+NETWORKS = {
+    "slow-3g": (0.4, 400),
+    "3g": (1.6, 300),
+    "4g": (9.0, 170),
+    "wifi": (30.0, 40),
+}
+
+WORDS = ("old", "town", "museum", "harbour", "cathedral", "market", "garden", "palace", "tower", "bridge", "river",
+         "quarter", "gallery", "castle", "square", "beach", "viewpoint", "monastery", "street", "food", "hall")
+
+
+def make_plan(size_kb, seed=0):
+    """A markdown plan shaped like the real ones: many days, each slot with a booking and a map link."""
+    rng = random.Random(seed)
+    lines, day = ["# Your Trip", ""], 0
+    while sum(len(line) + 1 for line in lines) < size_kb * 1024:
+        day += 1
+        lines.append(f"### Day {day}: {' '.join(rng.sample(WORDS, 3)).title()}")
+        for hour in range(9, 21, 2):
+            place = " ".join(rng.sample(WORDS, 2)).title()
+            lines.append(f"- **{hour}:00–{hour + 1}:{rng.choice(['00', '15', '30', '45'])}:** Visit [{place}]"
+                         f"(https://www.{rng.choice(WORDS)}-tickets.com/book/{rng.getrandbits(40):x}?ref={rng.getrandbits(24):x}) "
+                         f"· [map](https://maps.google.com/?cid={rng.getrandbits(60)}) · €{rng.randint(5, 60)}")
+            lines.append(f"  - Tip: {' '.join(rng.choices(WORDS, k=rng.randint(6, 14)))}.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+class PlanAgent:
+    """Stands in for phi's Agent and always answers with the same plan."""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def run(self, prompt, stream=False):
+        return FakeRunResponse(self.plan, {"completion_tokens": len(self.plan) // 4, "prompt_tokens": len(prompt) // 4})
+
+
+def header_bytes(status, headers):
+    return len(f"HTTP/1.1 {status}\r\n") + sum(len(k) + len(v) + 4 for k, v in headers) + 2
+
+
+def request_flask(module, payload, headers, path="/generate-plan"):
+    client = module.app.test_client()
+    started = time.perf_counter()
+    if payload is None:
+        response = client.get(path, headers=headers)
+    else:
+        response = client.post(path, json=payload, headers=headers)
+    server_ms = (time.perf_counter() - started) * 1000
+    return response.status_code, list(response.headers.items()), response.get_data(), server_ms
+
+
+async def _request_asgi(app, method, path, body, headers):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1),
+             "server": ("testserver", 80),
+             "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+             + [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+    received, status, response_headers, chunks = False, None, [], []
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = [(k.decode(), v.decode()) for k, v in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+def request_asgi(module, payload, headers, path="/generate-plan"):
+    method, body = ("GET", b"") if payload is None else ("POST", json.dumps(payload).encode())
+    started = time.perf_counter()
+    status, response_headers, data = asyncio.run(_request_asgi(module.app, method, path, body, headers))
+    return status, response_headers, data, (time.perf_counter() - started) * 1000
+
+
+def decode(data, encoding):
+    started = time.perf_counter()
+    if encoding == "gzip":
+        data = gzip.decompress(data)
+    elif encoding == "br":
+        data = _brotli().decompress(data)
+    return data, (time.perf_counter() - started) * 1000
+
+
+def measure(backend, module, plan, repeat, networks):
+    request = request_flask if backend == "flask" else request_asgi
+    payload = plan_payload(0, flask=backend == "flask")
+    encodings = ["identity", "gzip"] + (["br"] if _brotli() is not None else [])
+    cases = [(encoding, {"Accept-Encoding": encoding}) for encoding in encodings]
+    cases.append(("if-none-match", {"Accept-Encoding": encodings[-1], "If-None-Match": None}))
+
+    rows = []
+    etag = location = None
+    for name, headers in cases:
+        revalidate = "If-None-Match" in headers
+        if revalidate:
+            headers = {**headers, "If-None-Match": etag}
+        server_times, decode_times = [], []
+        for _ in range(repeat):
+            if revalidate:
+                status, response_headers, data, server_ms = request(module, None, headers, path=location)
+            else:
+                status, response_headers, data, server_ms = request(module, payload, headers)
+            lowered = {k.lower(): v for k, v in response_headers}
+            etag, location = etag or lowered.get("etag"), location or lowered.get("content-location")
+            encoding = lowered.get("content-encoding", "identity")
+            raw, decode_ms = decode(data, encoding)
+            if revalidate:
+                assert (status, raw) == (304, b""), f"{backend} {name}: a revalidation got {status}"
+            else:
+                assert status == 200, f"{backend} {name}: a POST got {status}"
+                assert json.loads(raw)["travel_plan"] == plan, f"{backend} {name}: body does not round-trip"
+            server_times.append(server_ms)
+            decode_times.append(decode_ms)
+        wire = header_bytes(status, response_headers) + len(data)
+        server_ms, decode_ms = min(server_times), min(decode_times)
+        row = {"backend": backend, "case": name, "status": status, "encoding": encoding, "body_bytes": len(data),
+               "wire_bytes": wire, "server_ms": round(server_ms, 2), "decode_ms": round(decode_ms, 2)}
+        for network in networks:
+            mbps, rtt = NETWORKS[network]
+            row[f"ttlb_{network}_ms"] = round(rtt + server_ms + wire * 8 / (mbps * 1000) + decode_ms, 1)
+        rows.append(row)
+    return rows
+
+
+def print_report(rows, networks):
+    header = f"{'backend':<8}{'case':<16}{'status':>7}{'wire B':>9}{'ratio':>7}{'server ms':>11}{'decode ms':>11}" + \
+        "".join(f"{'TTLB ' + n:>15}" for n in networks)
+    print(header)
+    print("-" * len(header))
+    identity = {r["backend"]: r["wire_bytes"] for r in rows if r["case"] == "identity"}
+    for r in rows:
+        ratio = r["wire_bytes"] / identity[r["backend"]]
+        print(f"{r['backend']:<8}{r['case']:<16}{r['status']:>7}{r['wire_bytes']:>9}{ratio:>7.2f}{r['server_ms']:>11.2f}"
+              f"{r['decode_ms']:>11.2f}" + "".join(f"{r[f'ttlb_{n}_ms']:>15.1f}" for n in networks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["flask", "dart", "both"], default="both")
+    parser.add_argument("--plan-kb", type=float, default=40, help="size of the stub plan")
+    parser.add_argument("--network", nargs="+", choices=sorted(NETWORKS), default=["slow-3g", "3g", "4g"])
+    parser.add_argument("--repeat", type=int, default=5, help="requests per case; the fastest is reported")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TRAVELGPT_PREWARM", "0")
+    plan = make_plan(args.plan_kb)
+    rows = []
+    for backend in (["flask", "dart"] if args.backend == "both" else [args.backend]):
+        module = load_backend(backend, FakeServices())
+        module.travel_agent.agent = PlanAgent(plan)
+        rows.extend(measure(backend, module, plan, args.repeat, args.network))
+    print(f"Plan: {len(plan.encode()) / 1024:.1f} KB" + ("" if _brotli() else " (brotli not installed: br skipped)"))
+    print_report(rows, args.network)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Cold-start benchmark for backend.py (Flask) and backend_dart.py (FastAPI).
+
+Every run starts a fresh interpreter and measures:
+
+- import:  importing the backend module (what happens before the port is bound)
+- build:   building the phi agent, i.e. importing phi, Groq and the search tools
+- request: serving the first /generate-plan, with the LLM and tools replaced by
+           the zero-latency stand-ins from benchmarks/fakes.py
+- first response: interpreter start to the first successful response
+
+    python -m benchmarks.bench_startup --backend both --runs 5
+    python -m benchmarks.bench_startup --backend flask --importtime
+    python -m benchmarks.bench_startup --json startup.json --baseline old.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+STAGES = ["import_ms", "build_ms", "request_ms", "first_response_ms"]
+
+
+def plan_request(backend):
+    start = date.today() + timedelta(days=30)
+    if backend == "flask":
+        return {"destination": "Lisbon", "duration": 3, "start_date": start.isoformat(), "budget": "Moderate"}
+    return {"destination": "Lisbon", "present_location": "Madrid", "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=2)).isoformat(), "budget": "Moderate", "travel_styles": ["Food"]}
+
+
+def child(backend):
+    """Runs inside the fresh interpreter; prints one JSON line with the stage timings."""
+    started = time.perf_counter()
+    os.environ["TRAVELGPT_PREWARM"] = "0"
+    module = __import__("backend" if backend == "flask" else "backend_dart")
+    imported = time.perf_counter()
+
+    result = {"backend": backend}
+    try:
+        module.travel_agent.warm()
+    except Exception as e:
+        result["build_error"] = str(e)
+    built = time.perf_counter()
+
+    from benchmarks.fakes import FakeAgent, FakeServices
+
+    module.travel_agent.agent = FakeAgent(FakeServices(time_scale=0))
+    if backend == "flask":
+        status = module.app.test_client().post("/generate-plan", json=plan_request(backend)).status_code
+    else:
+        import asyncio
+        import httpx
+
+        async def first_request():
+            transport = httpx.ASGITransport(app=module.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                return (await client.post("/generate-plan", json=plan_request(backend))).status_code
+
+        status = asyncio.run(first_request())
+    answered = time.perf_counter()
+
+    result.update({
+        "status": status,
+        "import_ms": (imported - started) * 1000,
+        "build_ms": (built - imported) * 1000,
+        "request_ms": (answered - built) * 1000,
+        "first_response_ms": (answered - started) * 1000,
+    })
+    print(json.dumps(result))
+
+
+def run_child(backend):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", backend],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(backend, top=15):
+    """Uses `python -X importtime` to list the modules with the largest cumulative import time."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                             f"import os; os.environ['TRAVELGPT_PREWARM'] = '0'; import {'backend' if backend == 'flask' else 'backend_dart'}"],
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self [us] | cumulative | imported package"
+        own, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|", 2)]
+        rows.append((int(cumulative), int(own), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run_benchmark(backend, runs):
+    samples = [run_child(backend) for _ in range(runs)]
+    result = {"backend": backend, "runs": runs, "errors": sum(1 for s in samples if s["status"] >= 400)}
+    for stage in STAGES:
+        result[stage] = statistics.median(s[stage] for s in samples)
+    build_errors = {s["build_error"] for s in samples if "build_error" in s}
+    if build_errors:
+        result["build_error"] = build_errors.pop()
+    return result
+
+
+def print_report(results):
+    header = f"{'backend':<8}{'runs':>5}{'err':>5}" + "".join(f"{stage[:-3]:>16}" for stage in STAGES)
+    print(header + "   (median ms)")
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['backend']:<8}{r['runs']:>5}{r['errors']:>5}" + "".join(f"{r[stage]:>16.1f}" for stage in STAGES))
+        if "build_error" in r:
+            print(f"  agent build failed, build_ms excludes phi: {r['build_error']}")
+
+
+def compare(results, baseline, max_regression):
+    previous = {r["backend"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get(r["backend"])
+        if old is None:
+            continue
+        for stage in ("import_ms", "first_response_ms"):
+            if old[stage] and r[stage] > old[stage] * (1 + max_regression):
+                regressions.append((r, stage, old[stage], r[stage]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["flask", "dart", "both"], default="both")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per backend")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json output")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--child", choices=["flask", "dart"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    backends = ["flask", "dart"] if args.backend == "both" else [args.backend]
+    results = [run_benchmark(backend, args.runs) for backend in backends]
+    print_report(results)
+
+    if args.importtime:
+        for backend in backends:
+            print(f"\nslowest imports for {backend} (cumulative / self, ms)")
+            for cumulative, own, name in slowest_imports(backend):
+                print(f"{cumulative / 1000:>10.1f}{own / 1000:>10.1f}  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for r, stage, old, new in regressions:
+            print(f"REGRESSION {r['backend']}: {stage} {old:.1f} -> {new:.1f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
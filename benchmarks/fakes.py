@@ -0,0 +1,117 @@
+"""Deterministic local stand-ins for Groq, SerpApi/DuckDuckGo and OpenWeatherMap.
+
+Latencies are drawn from configurable distributions, seeded from the prompt or query,
+so the same request always costs the same simulated time.
+"""
+import hashlib
+import random
+import time
+
+from travelgpt.instrumentation import span
+from travelgpt.tool_cache import tool_cache
+
+
+class Latency:
+    """Parses specs like "const:0.2", "uniform:0.1,0.5" or "lognormal:0.8,0.4" (median seconds, sigma)."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        if kind not in ("const", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng):
+        if self.kind == "const":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        median, sigma = self.params
+        return rng.lognormvariate(0, sigma) * median
+
+    def __repr__(self):
+        return f"Latency({self.spec!r})"
+
+
+def _rng(seed, *parts):
+    digest = hashlib.sha256("|".join(str(p) for p in (seed,) + parts).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+class FakeServices:
+    """Configuration shared by the fake LLM, search and weather backends."""
+
+    def __init__(self, llm_ttft="lognormal:0.6,0.3", token_rate=250.0, completion_tokens="uniform:600,1800",
+                 tool_latency="lognormal:0.4,0.5", tool_calls=3, llm_turns=2, weather_latency="const:0.15",
+                 seed=0, time_scale=1.0):
+        self.llm_ttft = Latency(llm_ttft)
+        self.token_rate = token_rate
+        self.completion_tokens = Latency(completion_tokens)
+        self.tool_latency = Latency(tool_latency)
+        self.tool_calls = tool_calls
+        self.llm_turns = llm_turns
+        self.weather_latency = Latency(weather_latency)
+        self.seed = seed
+        # Shrinks every simulated delay, e.g. 0.1 to run a quick smoke benchmark
+        self.time_scale = time_scale
+
+    def sleep(self, seconds):
+        time.sleep(seconds * self.time_scale)
+
+    def search(self, query, max_results=5):
+        rng = _rng(self.seed, "search", query)
+        self.sleep(self.tool_latency.sample(rng))
+        return [
+            {"title": f"{query} result {i}", "href": f"https://example.com/{rng.getrandbits(32):08x}",
+             "body": f"Stand-in search result {i} for {query}."}
+            for i in range(max_results)
+        ]
+
+    def weather(self, location):
+        rng = _rng(self.seed, "weather", location)
+        self.sleep(self.weather_latency.sample(rng))
+        return {
+            "temperature": round(rng.uniform(-5, 35), 1),
+            "condition": rng.choice(["clear sky", "few clouds", "light rain", "moderate rain", "snow"]),
+            "country": "XX",
+            "needs_update": rng.random() < 0.5,
+            "success": True,
+        }
+
+
+class FakeRunResponse:
+    def __init__(self, content, metrics):
+        self.content = content
+        self.metrics = metrics
+
+
+class FakeAgent:
+    """Drop-in for phi's Agent.run: a few LLM turns with tool calls routed through the real tool cache."""
+
+    def __init__(self, services, name="fake-llm"):
+        self.services = services
+        self.name = name
+        self.search_tool = tool_cache.wrap(services.search, name="fake_search")
+
+    def run(self, prompt, stream=False):
+        services = self.services
+        rng = _rng(services.seed, "llm", prompt)
+        topic = " ".join(prompt.split()[:12])
+        prompt_tokens = len(prompt) // 4
+
+        for turn in range(services.llm_turns):
+            last_turn = turn == services.llm_turns - 1
+            tokens = int(services.completion_tokens.sample(rng)) if last_turn else 40
+            with span("llm", self.name) as llm_span:
+                services.sleep(services.llm_ttft.sample(rng) + tokens / services.token_rate)
+                llm_span.attributes["prompt_tokens"] = prompt_tokens
+                llm_span.attributes["completion_tokens"] = tokens
+            if not last_turn:
+                for i in range(services.tool_calls):
+                    self.search_tool(f"{topic} {i}")
+
+        content = "\n".join(
+            f"## Section {i}\n- Stand-in item for {topic} ([link](https://example.com/{i}))" for i in range(tokens // 40)
+        )
+        return FakeRunResponse(content, {"completion_tokens": tokens, "prompt_tokens": prompt_tokens})
@@ -0,0 +1,50 @@
+"""gunicorn settings for the Flask backend: `gunicorn backend:app` (or `python backend.py`).
+
+Each worker process serves requests from a pool of threads; agent calls are I/O bound,
+so threads overlap them while the worker's admission control (travelgpt.admission)
+bounds how many run and wait. On SIGTERM a worker stops admitting requests and gets
+GRACEFUL_TIMEOUT seconds to finish the generations it has started.
+"""
+import os
+import signal
+
+from travelgpt.admission import MAX_CONCURRENT_RUNS, MAX_QUEUED_RUNS
+
+bind = f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+# Enough threads for every running and queued agent call, plus a few to answer 429s,
+# /ready and /metrics while those are all busy
+threads = int(os.getenv("FLASK_THREADS", str(MAX_CONCURRENT_RUNS + MAX_QUEUED_RUNS + 4)))
+# Connections a worker holds open; further ones wait in the listen backlog
+worker_connections = int(os.getenv("FLASK_MAX_CONNECTIONS", str(threads * 4)))
+backlog = int(os.getenv("FLASK_BACKLOG", "256"))
+# Heartbeat timeout of a worker (gthread workers keep beating during long requests)
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+# Time a stopping worker has to finish its in-flight generations
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+if workers > 1:
+    # Share the plan, tool and weather caches between the workers
+    os.environ.setdefault("TRAVELGPT_CACHE_BACKEND", "sqlite")
+
+
+def post_worker_init(worker):
+    """Makes SIGTERM close the worker's admission before gunicorn stops accepting.
+
+    gunicorn then waits up to graceful_timeout for the requests already admitted; the
+    ones still queued and any arriving on kept-alive connections get 503 right away.
+    """
+    admission = getattr(worker.wsgi, "extensions", {}).get("admission")
+    if admission is None:
+        return
+    handle_exit = worker.handle_exit
+
+    def on_exit(sig, frame):
+        admission.close()
+        worker.log.info("Draining %(running)d running and %(queued)d queued requests", admission.status())
+        handle_exit(sig, frame)
+
+    # The worker registered its handler before this hook ran, so register the wrapper in its place
+    signal.signal(signal.SIGTERM, on_exit)
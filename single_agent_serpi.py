@@ -1,10 +1,8 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from phi.agent import Agent
-from phi.model.groq import Groq
-from phi.tools.serpapi_tools import SerpApiTools
-from phi.tools.duckduckgo import DuckDuckGo
+from travelgpt import TravelAgent
+from travelgpt.instrumentation import render_metrics_panel
 from datetime import datetime
 
 load_dotenv()
@@ -88,119 +86,10 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-class TravelAgent:
-    def __init__(self):
-        self.agent = Agent(
-            name="Comprehensive Travel Assistant",
-            model=Groq(id="llama-3.3-70b-versatile"),
-            tools=[SerpApiTools(), DuckDuckGo()],
-            instructions=[
-                "You are a comprehensive travel planning assistant with expertise in all aspects of travel.",
-                "For every recommendation and data point, you MUST provide working source links.",
-                "Your knowledge spans across:",
-                "- Seasonal travel timing and weather patterns",
-                "- Transportation options and booking",
-                "- Accommodation recommendations",
-                "- Day-by-day itinerary planning",
-                "- Local cuisine and restaurant recommendations",
-                "- Practical travel tips and cultural advice",
-                "- Budget estimation and cost breakdown",
-                "Format all responses in markdown with clear headings (##) and bullet points.",
-                "Use [text](url) format for all hyperlinks.",
-                "Verify all links are functional before including them.",
-                "Organize information clearly with appropriate sections based on the query type."
-            ],
-            show_tool_calls=True,
-            markdown=True,
-            debug_mode=True
-        )
-    def generate_travel_plan(self, destination, present_location, start_date, end_date, budget, travel_style):
-        prompt = f""" Act as a Personalized Travel Expert
-You are a travel expert specializing in creating tailored, detailed travel plans. Design a comprehensive itinerary for a trip to {destination} spanning {duration} days, starting on {start_date} and ending on {end_date}.
-
-Traveler Preferences:
-Budget Level: {budget}
-Travel Styles: {', '.join(travel_style)}
-Your Task:
-Provide a structured markdown response that includes the following elements:
-
-🌞 Best Time to Visit:
- -Highlight seasonal considerations for visiting {destination}.
- -Day-by-day weather forecast from {start_date} to {end_date}
- -Alternative date suggestions if weather is unfavorable .Include source links for all weather data.
- -Offer clothing recommendations for each day based on weather forecasts of that particular day be accurate . For example:
-    -Warm jackets and boots for cold, snowy days.
-    -Light, breathable clothing for warm, sunny days.
-    -Raincoats and umbrellas for rainy conditions.
-
-🏨 Accommodation Recommendations:
- -Suggest accommodations within the {budget} range.
- -Include pros and cons, prices, amenities, and booking links.
- -Indicate the distance and travel time to major attractions. 
- -Format your response using markdown with clear headings (##) and bullet points. Use [text](url) format for hyperlinks. Verify all links are functional before including them.
-
-🗺️ Day-by-Day Itinerary:
- -Create a detailed itinerary for each day, broken into specific time slots (e.g., "9:00 AM–12:00 PM: Visit [Attraction]").
- -Incorporate activities, attractions, and cultural experiences that align with the specified travel styles.
- -Include booking links, costs, and recommendations for optimizing time and enjoyment.
- -Include sites only if the sites exist 
-
-🍽️ Culinary Highlights:
- -Recommend local cuisines, restaurants, and food experiences.
- -Provide suggestions based on the travel styles (e.g., street food, fine dining, or unique culinary tours).
- -Include price ranges, opening hours, and reservation links, where available.
-
-💡 Practical Travel Tips:
- -List local and intercity transportation options (e.g., public transit, car rentals, taxis).
- -Provide advice on cultural etiquette, local customs, and safety tips.
- -Include a suggested daily budget breakdown for meals, transport, and activities.
-
-💰 Estimated Total Trip Cost:
- -Provide an itemized expense breakdown by category:
- -Accommodation, transportation, meals, activities, and miscellaneous expenses.
- -Offer budget-saving tips specific to {budget} constraints.
-
-🚂 Transportation Details:
- -Recommend transportation options from {present_location} to {destination}.
- -Include schedules, pricing, duration, and booking links for trains, buses, or flights.
-
-Output Requirements:
- -Use clear, easy-to-read markdown with headings and bullet points for each section.
- -Provide source links, booking references, and maps wherever applicable.
- -Ensure all details are actionable and well-organized to facilitate ease of planning.
-
-"""
-        response = self.agent.run(prompt)
-        try:
-            if hasattr(response, 'content'):
-                clean_response = response.content.replace('∣', '|').replace('\n\n\n', '\n\n')
-                st.session_state.travel_plan = clean_response
-                st.markdown(clean_response)
-            else:
-                st.session_state.travel_plan = str(response)
-                st.markdown(str(response))
-        except Exception as e:
-            st.error(f"Error generating travel plan: {str(e)}")
-            st.info("Please try again in a few moments.")
-
-    def answer_question(self, question, travel_plan, destination):
-        prompt = f"""Using the context of this travel plan for {destination}:
-
-{travel_plan}
-
-Please answer this specific question: {question}
-
-Guidelines for your response:
-1. Focus specifically on answering the question asked
-2. Reference relevant parts of the travel plan when applicable
-3. Provide new information if the travel plan doesn't cover the topic
-4. Include verified source links for any new information
-5. Keep the response concise but comprehensive
-6. Use markdown formatting for clarity
-
-Format your response with appropriate headings and verify all included links."""
-
-        return self.agent.run(prompt)
+@st.cache_resource
+def get_travel_agent():
+    """One TravelAgent per server process, shared across reruns and sessions; each run checks out its own phi agent."""
+    return TravelAgent(debug_mode=True)
 
 # Sidebar configuration
 with st.sidebar:
@@ -245,7 +134,7 @@ try:
     os.environ["SERP_API_KEY"] = os.getenv("SERP_API_KEY")
 
     # Initialize single travel agent
-    travel_agent = TravelAgent()
+    travel_agent = get_travel_agent()
 
     # Main UI
     st.title("🌎 AI Travel Planner")
@@ -293,25 +182,19 @@ try:
             if question and st.session_state.travel_plan:
                 with st.spinner("🔍 Finding answer..."):
                     try:
-                        # Combine the original travel plan with the new question for context
-                        context_question = f"""
-                        I have a travel plan for {destination}. Here's the existing plan:
-                        {st.session_state.travel_plan}
-
-                        Now, please answer this specific question: {question}
-                        
-                        Provide a focused, concise answer that relates to the existing travel plan if possible.
-                        """
-                        response = travel_agent.run(context_question)
-                        if hasattr(response, 'content'):
-                            st.markdown(response.content)
-                        else:
-                            st.markdown(str(response))
+                        answer = travel_agent.answer_question(
+                            question, st.session_state.travel_plan, destination
+                        )
+                        st.markdown(answer)
                     except Exception as e:
                         st.error(f"Error getting answer: {str(e)}")
             elif not st.session_state.travel_plan:
                 st.warning("Please generate a travel plan first before asking questions.")
             else:
                 st.warning("Please enter a question")
+
+    with st.sidebar:
+        render_metrics_panel()
+
 except Exception as e:
     st.error(f"Application Error: {str(e)}")
\ No newline at end of file
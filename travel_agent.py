@@ -1,17 +1,16 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from phi.agent import Agent
-from phi.model.groq import Groq  # Assuming this is how you import Groq Llama
-from duckduckgo_search import DDGS  #Import duckduckgo search library
 from datetime import datetime, timedelta
+from travelgpt import TravelAgent, ddg_tools, write_agent_stream, speculate, plan_stream
+from travelgpt.instrumentation import render_metrics_panel
 
 load_dotenv()
-def duckduckgo_search(query):
-    """Searches DuckDuckGo and returns the results."""
-    ddg = DDGS()
-    results = ddg.search(query)
-    return results
+
+@st.cache_resource
+def get_travel_agent():
+    """One DuckDuckGo-backed TravelAgent per server process, shared across reruns and sessions; each run checks out its own phi agent."""
+    return TravelAgent(tools=ddg_tools)
 
 # Initialize page config
 st.set_page_config(
@@ -150,19 +149,7 @@ try:
     #os.environ["SERP_API_KEY"] = serpapi_key #Removed SerpAPI Key environment variable setting
 
     # Initialize travel agent with Groq Llama model and DuckDuckGo search
-    travel_agent = Agent(
-        name="Travel Planner",
-        model=Groq(id="llama-3.3-70b-versatile"),  # Adjust if necessary based on actual import
-        tools=[duckduckgo_search], #Replaced SerpApiTools with ddg
-        instructions=[
-            "You are a travel planning assistant using Groq Llama.",
-            "Help users plan their trips by researching destinations, finding attractions, suggesting accommodations, and providing transportation options.",
-            "Give me relevant live Links of each places and hotels you provide by searching on internet (It's important)",
-            "Always verify information is current before making recommendations."
-        ],
-        show_tool_calls=True,
-        markdown=True
-    )
+    travel_agent = get_travel_agent()
 
     # Main UI
     st.title("🌎 AI Travel Planner")
@@ -183,60 +170,11 @@ try:
     if st.button("✨ Generate My Perfect Travel Plan", type="primary"):
         if destination:
             try:
-                with st.spinner("🔍 Researching and planning your trip..."):
-                    duration = (end_date - start_date).days
-                    prompt = f"""Create a comprehensive travel plan for {destination} for {duration} days starting from {start_date} and ending on {end_date}.
-
-    Travel Preferences:
-    - Budget Level: {budget}
-    - Travel Styles: {', '.join(travel_style)}
-
-    Please provide a detailed itinerary that includes:
-
-    1. 🌞 Best Time to Visit
-    - Seasonal highlights
-    - Weather considerations for each day from {start_date} to {end_date} with source links. If the weather is bad on any particular day, suggest alternative dates with good weather.
-
-    2. 🏨 Accommodation Recommendations
-    - {budget} range hotels/stays
-    - Locations and proximity to attractions
-
-    3. 🗺️ Day-by-Day Itinerary
-    - Detailed daily activities
-    - Must-visit attractions
-    - Local experiences aligned with travel styles
-
-    4. 🍽️ Culinary Experiences
-    - Local cuisine highlights
-    - Recommended restaurants
-    - Food experiences matching travel style
-
-    5. 💡 Practical Travel Tips
-    - Local transportation options
-    - Cultural etiquette
-    - Safety recommendations
-    - Estimated daily budget breakdown
-
-    6. 💰 Estimated Total Trip Cost
-    - Breakdown of expenses
-    - Money-saving tips
-
-    7. 🚂 Transportation from {present_location} to {destination}
-    - Trains/buses available with timings and booking links for travel dates between {start_date} and {end_date}.
-
-
-    Please provide source and relevant links without fail.
-
-    Format the response in a clear, easy-to-read markdown format with headings and bullet points.
-                    """
-                    response = travel_agent.run(prompt)
-                    if hasattr(response, 'content'):
-                        clean_response = response.content.replace('∣', '|').replace('\n\n\n', '\n\n')
-                        st.session_state.travel_plan = clean_response
-                        st.markdown(clean_response)
-                    else:
-                        st.session_state.travel_plan = str(response)
-                        st.markdown(str(response))
+                travel_plan = write_agent_stream(plan_stream(
+                    travel_agent,
+                    destination, present_location, start_date, end_date, budget, travel_style
+                ))
+                st.session_state.travel_plan = travel_plan
             except Exception as e:
                 st.error(f"Error generating travel plan: {str(e)}")
                 st.info("Please try again in a few moments.")
@@ -257,28 +195,20 @@ try:
         
         if st.button("Get Answer", key="qa_button"):
             if question and st.session_state.travel_plan:
-                with st.spinner("🔍 Finding answer..."):
-                    try:
-                        # Combine the original travel plan with the new question for context
-                        context_question = f"""
-                        I have a travel plan for {destination}. Here's the existing plan:
-                        {st.session_state.travel_plan}
-
-                        Now, please answer this specific question: {question}
-                        
-                        Provide a focused, concise answer that relates to the existing travel plan if possible.
-                        """
-                        response = travel_agent.run(context_question)
-                        if hasattr(response, 'content'):
-                            st.markdown(response.content)
-                        else:
-                            st.markdown(str(response))
-                    except Exception as e:
-                        st.error(f"Error getting answer: {str(e)}")
+                try:
+                    write_agent_stream(travel_agent.stream_answer(
+                        question, st.session_state.travel_plan, destination
+                    ), label="🔍 Finding answer...")
+                except Exception as e:
+                    st.error(f"Error getting answer: {str(e)}")
             elif not st.session_state.travel_plan:
                 st.warning("Please generate a travel plan first before asking questions.")
             else:
                 st.warning("Please enter a question")
 
+    with st.sidebar:
+        speculate(travel_agent, destination, present_location, start_date, end_date, budget, travel_style)
+        render_metrics_panel()
+
 except Exception as e:
     st.error(f"Application Error: {str(e)}")
@@ -0,0 +1,34 @@
+"""Core of TravelGPT: the TravelAgent and the caching, pooling and instrumentation it runs on.
+
+The Streamlit apps and the HTTP backends are thin adapters over this package.
+Names are resolved lazily, so importing one of them does not load the others'
+dependencies.
+"""
+import importlib
+
+_EXPORTS = {
+    "TravelAgent": "agent",
+    "AgentReply": "agent",
+    "AgentStream": "agent",
+    "search_tools": "agent",
+    "ddg_tools": "agent",
+    "get_weather": "weather",
+    "needs_update_for_heat_or_rain": "weather",
+    "needs_update_for_extremes": "weather",
+    "Warmup": "warmup",
+    "write_agent_stream": "ui",
+    "render_plan": "ui",
+    "render_plan_changes": "ui",
+    "speculate": "ui",
+    "plan_stream": "ui",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
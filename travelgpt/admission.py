@@ -0,0 +1,128 @@
+"""Admission control for the threaded Flask backend: bounded queue, 429 backpressure, drain.
+
+Each worker process runs at most `max_running` agent calls at a time. Up to `max_queued`
+more requests wait, for at most `queue_timeout` seconds, for one of those slots. Past
+that a request is refused at once with Rejected (429 and a Retry-After estimated from
+recent run times), so a saturated worker sheds load instead of piling up threads and
+timing out every request. While the process drains for shutdown, new requests get 503
+and the runs already admitted are left to finish.
+
+    admission = Admission()
+
+    @app.route("/generate-plan", methods=["POST"])
+    @admission.limit
+    def generate_plan(): ...
+"""
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .instrumentation import metrics
+from .jobs import MAX_CONCURRENT_RUNS
+
+# Requests allowed to wait for a run slot per process; more are answered 429 at once
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "16"))
+# Longest wait for a run slot before a queued request is answered 429
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", "30"))
+# Retry-After bounds, and the run time assumed until one has been measured
+RETRY_AFTER_MIN = int(os.getenv("RETRY_AFTER_MIN", "1"))
+RETRY_AFTER_MAX = int(os.getenv("RETRY_AFTER_MAX", "120"))
+EXPECTED_RUN_SECONDS = float(os.getenv("EXPECTED_RUN_SECONDS", "20"))
+
+
+class Rejected(Exception):
+    """A request refused by admission control; answer it with `status` and Retry-After."""
+
+    def __init__(self, message, retry_after, status=429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status = status
+
+
+class Admission:
+    def __init__(self, max_running=MAX_CONCURRENT_RUNS, max_queued=MAX_QUEUED_RUNS, queue_timeout=QUEUE_TIMEOUT):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.queued = 0
+        self.draining = False
+        self._cond = threading.Condition()
+        # Moving average of run time, for Retry-After
+        self._run_seconds = EXPECTED_RUN_SECONDS
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up for one more request."""
+        waves = (self.queued + 1) / max(self.max_running, 1)
+        return max(RETRY_AFTER_MIN, min(RETRY_AFTER_MAX, math.ceil(self._run_seconds * waves)))
+
+    def _reject(self, reason, message, status=429):
+        metrics.inc("travelgpt_admission_total", (("outcome", reason),))
+        return Rejected(message, self.retry_after(), status)
+
+    @contextmanager
+    def slot(self):
+        """Holds a run slot for the body of the with-block, waiting in the queue if needed."""
+        with self._cond:
+            if self.draining:
+                raise self._reject("draining", "Server is shutting down", 503)
+            if self.running >= self.max_running:
+                if self.queued >= self.max_queued:
+                    raise self._reject("queue_full", "Server is busy, try again later")
+                self.queued += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.running >= self.max_running and not self.draining:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject("queue_timeout", "Server is busy, try again later")
+                        self._cond.wait(remaining)
+                finally:
+                    self.queued -= 1
+                if self.draining:
+                    raise self._reject("draining", "Server is shutting down", 503)
+            self.running += 1
+        metrics.inc("travelgpt_admission_total", (("outcome", "admitted"),))
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self.running -= 1
+                self._run_seconds = 0.8 * self._run_seconds + 0.2 * elapsed
+                self._cond.notify_all()
+
+    def limit(self, func):
+        """Decorator: runs the view inside `slot()`; Rejected propagates to the app's error handler."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.slot():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def close(self):
+        """Stops admitting requests: new and queued ones get 503, running ones carry on."""
+        with self._cond:
+            self.draining = True
+            self._cond.notify_all()
+
+    def drain(self, timeout=None):
+        """Closes admission and waits for the running requests. False if `timeout` ran out first."""
+        self.close()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def status(self):
+        with self._cond:
+            return {"running": self.running, "queued": self.queued, "max_running": self.max_running,
+                    "max_queued": self.max_queued, "draining": self.draining}
@@ -0,0 +1,439 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import os
+import threading
+import time
+
+from .cancellation import Cancelled, CancelToken, cancel_scope
+from .instrumentation import traced, trace, listen, metrics
+from .prompts import (
+    TRAVEL_AGENT_INSTRUCTIONS,
+    GENERATE_PLAN,
+    ANSWER_QUESTION,
+    UPDATE_PLAN,
+    REPLACE_DROPPED,
+    SHARED_PLAN,
+    TRANSPORT_PLAN,
+    UPDATE_PLAN_FOR_WEATHER,
+    MODIFY_PLAN,
+    trip_fields,
+)
+from .preflight import normalize_trip
+from .scheduler import extend_stay
+from .shared_cache import make_store
+from .tool_cache import tool_cache, run_agent, stream_agent
+
+MODEL_ID = "llama-3.3-70b-versatile"
+# Identical prompts within this many seconds get the stored reply instead of a new run (0 = off)
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "0"))
+# Re-pack the itinerary locally when a stay is extended, asking the LLM only about dropped activities
+LOCAL_RESCHEDULE = os.getenv("LOCAL_RESCHEDULE", "1") == "1"
+# Idle phi agents kept for reuse by one TravelAgent; more are built while more runs overlap
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
+
+plan_store = make_store("plan", max_size=512)
+
+# phi, Groq and the search clients are imported inside the functions below rather than
+# at module level: they account for most of a cold start, and the backends should be
+# able to bind their port and answer /ready before paying for them.
+
+
+def search_tools():
+    """The local destination index and route tools, then SerpApi (Google) and DuckDuckGo searches; needs SERP_API_KEY.
+
+    Both searches go through the pooled HTTP client's per-host limits, retries and breaker.
+    """
+    from phi.tools.serpapi_tools import SerpApiTools
+
+    from .ddg_search import duckduckgo_search, duckduckgo_search_many
+    from .destination_index import destination_facts
+    from .geo import distances_from, route_day
+    from .http_client import http_client
+
+    serpapi = http_client.guard_toolkit("serpapi.com", SerpApiTools())
+    return [destination_facts, route_day, distances_from, serpapi, duckduckgo_search, duckduckgo_search_many]
+
+
+def ddg_tools():
+    """DuckDuckGo-only tools, for deployments without a SerpApi key."""
+    from .ddg_search import ddg_search, duckduckgo_search, duckduckgo_search_many
+    from .destination_index import destination_facts
+    from .geo import distances_from, route_day
+
+    ddg_search.client_class()  # import the search client now rather than on the first tool call
+    return [destination_facts, route_day, distances_from, duckduckgo_search, duckduckgo_search_many]
+
+
+class AgentReply(str):
+    """The markdown answer of an agent run, carrying the run's tool and cache stats in `metadata`."""
+
+    def __new__(cls, content, metadata=None):
+        reply = super().__new__(cls, content)
+        reply.metadata = metadata or {}
+        return reply
+
+
+def clean_text(content):
+    return (content or "").replace('∣', '|').replace('\n\n\n', '\n\n')
+
+
+def clean_response(response):
+    return clean_text(response.content if hasattr(response, 'content') else str(response))
+
+
+class AgentStream:
+    """Iterates over the text of an agent reply while it is being generated.
+
+    The run happens on a worker thread, which records text deltas and tool-call
+    progress as they come in; iterating replays what has been recorded so far and then
+    follows along, so a consumer may attach after the run has started (see `start`).
+    `on_tool(event, span)` is called on the iterating thread, where Streamlit calls are
+    allowed. Once the iteration ends, `reply` holds the complete AgentReply.
+
+    `cancel()` stops the run at its next LLM chunk, tool call or HTTP attempt. A
+    consumer that stops iterating early (e.g. a Streamlit rerun) cancels it too.
+
+    `run(emit=...)` replaces the single agent run on `prompt` for replies put together
+    from several steps.
+    """
+
+    def __init__(self, travel_agent, name, prompt, on_tool=None, run=None):
+        self.travel_agent = travel_agent
+        self.name = name
+        self.prompt = prompt
+        self.on_tool = on_tool
+        self.run = run or functools.partial(travel_agent._run, prompt)
+        self.events = []
+        self.reply = None
+        self.error = None
+        self.done = False
+        self.future = None
+        self.token = CancelToken()
+        self._started = False
+        self._cond = threading.Condition()
+
+    def _put(self, kind, data):
+        with self._cond:
+            self.events.append((kind, data))
+            self._cond.notify_all()
+
+    def _finish(self, reply, error):
+        with self._cond:
+            self.reply, self.error, self.done = reply, error, True
+            self._cond.notify_all()
+
+    def _work(self):
+        def on_span(event, span):
+            if span.kind == "tool":
+                self._put("tool", (event, span))
+
+        try:
+            with cancel_scope(self.token), trace(self.name), listen(on_span):
+                reply = self.run(emit=lambda text: self._put("text", text))
+        except (Exception, Cancelled) as e:
+            self._finish(None, e)
+        else:
+            self._finish(reply, None)
+
+    def start(self, executor=None):
+        """Starts the run without waiting for a consumer, on `executor` or a thread of its own."""
+        with self._cond:
+            if self._started:
+                return self
+            self._started = True
+        context = contextvars.copy_context()
+        if executor is None:
+            threading.Thread(target=context.run, args=(self._work,), name="agent-stream", daemon=True).start()
+        else:
+            self.future = executor.submit(context.run, self._work)
+        return self
+
+    def cancel(self, reason="cancelled"):
+        if self.future is not None and self.future.cancel():
+            self._finish(None, Cancelled(reason))
+        self.token.cancel(reason)
+
+    def __iter__(self):
+        self.start()
+        position = 0
+        try:
+            while True:
+                with self._cond:
+                    while position == len(self.events) and not self.done:
+                        self._cond.wait()
+                    pending = self.events[position:]
+                    position = len(self.events)
+                    finished = self.done
+                for kind, data in pending:
+                    if kind == "text":
+                        yield data.replace('∣', '|')
+                    elif self.on_tool is not None:
+                        self.on_tool(*data)
+                if finished and position == len(self.events):
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            if not self.done:
+                self.cancel("stream abandoned")
+
+
+class TravelAgent:
+    """The travel planning agent shared by the Streamlit apps and the HTTP backends.
+
+    A phi Agent keeps the state of the run it is doing (run id, response, memory), so
+    one must never serve two runs at once. Each run checks an agent out of a small pool
+    and returns it when done; the tools and the Groq client are built once and shared
+    by every agent of the pool. `tools` is a list of tools or a factory returning one
+    (e.g. `ddg_tools`); factories are only called when the first agent is built, on
+    first use or ahead of time by `warm()`.
+    """
+
+    def __init__(self, tools=search_tools, debug_mode=False):
+        self.tools = tools
+        self.debug_mode = debug_mode
+        self.warmup_seconds = None
+        self._tools = None
+        self._client = None
+        self._idle = []
+        self._shared = None
+        self._lock = threading.Lock()
+
+    def _shared_parts(self):
+        """The memoized tools and the Groq client, built the first time an agent is."""
+        with self._lock:
+            if self._tools is None:
+                from .tool_executor import ParallelToolsGroq
+
+                tools = self.tools() if callable(self.tools) else self.tools
+                # Toolkits are wrapped in place, so this must happen only once
+                self._tools = tool_cache.wrap_tools(tools)
+                self._client = ParallelToolsGroq(id=MODEL_ID).get_client()
+            return self._tools, self._client
+
+    def _build(self):
+        from phi.agent import Agent
+        from .tool_executor import ParallelToolsGroq
+
+        tools, client = self._shared_parts()
+        return Agent(
+            name="Comprehensive Travel Assistant",
+            model=ParallelToolsGroq(id=MODEL_ID, client=client),
+            tools=tools,
+            instructions=TRAVEL_AGENT_INSTRUCTIONS,
+            show_tool_calls=True,
+            markdown=True,
+            debug_mode=self.debug_mode
+        )
+
+    def _take(self):
+        with self._lock:
+            if self._shared is not None:
+                return self._shared
+            if self._idle:
+                return self._idle.pop()
+        started = time.perf_counter()
+        agent = self._build()
+        if self.warmup_seconds is None:
+            self.warmup_seconds = time.perf_counter() - started
+        metrics.inc("travelgpt_agent_builds_total", ())
+        return agent
+
+    def _give_back(self, agent):
+        if agent is self._shared:
+            return
+        memory = getattr(agent, "memory", None)
+        if memory is not None:
+            # phi appends every run to the agent's memory; the next run starts from nothing
+            agent.memory = type(memory)()
+        with self._lock:
+            if len(self._idle) < AGENT_POOL_SIZE:
+                self._idle.append(agent)
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """A phi agent for one run, used by no other run until this one ends."""
+        agent = self._take()
+        yield agent
+        # Not reached when the run raised: an agent stopped mid-run is dropped, not reused
+        self._give_back(agent)
+
+    @property
+    def agent(self):
+        """A stand-in set here (e.g. by the benchmarks) serves every run instead of the pool."""
+        return self._shared
+
+    @agent.setter
+    def agent(self, agent):
+        with self._lock:
+            self._shared = agent
+            self._idle.clear()
+
+    @property
+    def ready(self):
+        return self._shared is not None or self.warmup_seconds is not None
+
+    def warm(self):
+        """Imports phi and the tool clients and builds an agent, so the first request doesn't have to."""
+        with self.checkout() as agent:
+            return agent
+
+    def _run(self, prompt, emit=None):
+        """Runs the agent on `prompt`; with `emit`, the reply's text is also passed to it as it streams in."""
+        key = hashlib.sha256(f"{MODEL_ID}\n{prompt}".encode()).hexdigest()
+        if PLAN_CACHE_TTL > 0:
+            found, cached = plan_store.get(key)
+            if found:
+                reply = AgentReply(cached["content"], {**cached["metadata"], "plan_cache": "hit"})
+                if emit is not None:
+                    emit(str(reply))
+                return reply
+
+        with self.checkout() as agent:
+            if emit is None:
+                response, stats = run_agent(agent, prompt)
+                reply = AgentReply(clean_response(response), stats.as_dict())
+            else:
+                content, stats = stream_agent(agent, prompt, emit)
+                reply = AgentReply(clean_text(content), stats.as_dict())
+        if PLAN_CACHE_TTL > 0:
+            plan_store.set(key, {"content": str(reply), "metadata": reply.metadata}, PLAN_CACHE_TTL)
+        return reply
+
+    @traced()
+    def generate_travel_plan(self, destination, present_location, start_date, end_date, budget, travel_style):
+        # Raises InvalidTrip before any tokens are spent; equal requests render equal prompts
+        trip = normalize_trip(destination, present_location, start_date, end_date, budget, travel_style)
+        prompt = GENERATE_PLAN.render(**trip_fields(*trip.args()))
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error generating travel plan: {str(e)}")
+
+    @traced()
+    def generate_shared_plan(self, destination, start_date, end_date, budget, travel_style, travellers):
+        """The plan of a group trip without anyone's journey there; see `plan_transport`."""
+        fields = trip_fields(destination, None, start_date, end_date, budget, travel_style)
+        prompt = SHARED_PLAN.render(**fields, travellers=travellers)
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error generating shared travel plan: {str(e)}")
+
+    @traced()
+    def plan_transport(self, destination, present_location, start_date, end_date, budget):
+        prompt = TRANSPORT_PLAN.render(destination=destination, present_location=present_location,
+                                       start_date=start_date, end_date=end_date, budget=budget)
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error planning transport: {str(e)}")
+
+    def generate_travel_plans(self, trips):
+        """Plans for a batch of trips, sharing the research of trips that travel together (see batch.py)."""
+        from .batch import generate_plans  # batch builds on AgentReply, so it imports this module
+
+        return generate_plans(self, trips)
+
+    @traced()
+    def answer_question(self, question, travel_plan, destination):
+        prompt = ANSWER_QUESTION.render(destination=destination, travel_plan=travel_plan, question=question)
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error answering question: {str(e)}")
+
+    def _update_plan(self, present_location, extra_time, travel_plan, emit=None):
+        """Extends the stay at `present_location`, re-packing the itinerary with the scheduler.
+
+        The LLM is only asked for replacements of activities that no longer fit. Plans
+        without timed slots, or a location that matches no activity, go to the LLM whole.
+        """
+        rescheduled = extend_stay(travel_plan, present_location, extra_time) if LOCAL_RESCHEDULE else None
+        metrics.inc("travelgpt_reschedules_total", (("mode", "llm" if rescheduled is None else "local"),))
+        if rescheduled is None:
+            prompt = UPDATE_PLAN.render(travel_plan=travel_plan, present_location=present_location, extra_time=extra_time)
+            return self._run(prompt, emit=emit)
+
+        plan = rescheduled.plan()
+        metadata = {"reschedule": "local", "moved": len(rescheduled.moved), "dropped": len(rescheduled.dropped)}
+        if emit is not None:
+            emit(plan)
+        if not rescheduled.dropped:
+            return AgentReply(plan, metadata)
+        if emit is not None:
+            emit("\n\n")
+        prompt = REPLACE_DROPPED.render(present_location=present_location, extra_time=extra_time,
+                                        outline=rescheduled.outline())
+        replacements = self._run(prompt, emit=emit)
+        return AgentReply(f"{plan}\n\n{replacements}", {**replacements.metadata, **metadata})
+
+    @traced()
+    def update_travel_plan(self, present_location, extra_time, travel_plan):
+        try:
+            return self._update_plan(present_location, extra_time, travel_plan)
+        except Exception as e:
+            raise Exception(f"Error updating travel plan: {str(e)}")
+
+    @traced()
+    def update_plan_for_weather(self, travel_plan, location, temperature, condition):
+        prompt = UPDATE_PLAN_FOR_WEATHER.render(travel_plan=travel_plan, location=location,
+                                                temperature=temperature, condition=condition)
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error updating travel plan for weather: {str(e)}")
+
+    @traced()
+    def modify_plan(self, travel_plan, modifications):
+        prompt = MODIFY_PLAN.render(travel_plan=travel_plan, modifications=modifications)
+        try:
+            return self._run(prompt)
+        except Exception as e:
+            raise Exception(f"Error modifying travel plan: {str(e)}")
+
+    # Streaming variants for the Streamlit apps: iterate (e.g. with st.write_stream) to get
+    # the reply as it is generated, then read the full AgentReply from `.reply`.
+
+    def stream_travel_plan(self, destination, present_location, start_date, end_date, budget, travel_style, on_tool=None):
+        trip = normalize_trip(destination, present_location, start_date, end_date, budget, travel_style)
+        prompt = GENERATE_PLAN.render(**trip_fields(*trip.args()))
+        return AgentStream(self, "generate_travel_plan", prompt, on_tool)
+
+    def stream_answer(self, question, travel_plan, destination, on_tool=None):
+        prompt = ANSWER_QUESTION.render(destination=destination, travel_plan=travel_plan, question=question)
+        return AgentStream(self, "answer_question", prompt, on_tool)
+
+    def stream_updated_plan(self, present_location, extra_time, travel_plan, on_tool=None):
+        run = functools.partial(self._update_plan, present_location, extra_time, travel_plan)
+        return AgentStream(self, "update_travel_plan", None, on_tool, run=run)
+
+    def stream_plan_for_weather(self, travel_plan, location, temperature, condition, on_tool=None):
+        prompt = UPDATE_PLAN_FOR_WEATHER.render(travel_plan=travel_plan, location=location,
+                                                temperature=temperature, condition=condition)
+        return AgentStream(self, "update_plan_for_weather", prompt, on_tool)
+
+    def stream_modified_plan(self, travel_plan, modifications, on_tool=None):
+        prompt = MODIFY_PLAN.render(travel_plan=travel_plan, modifications=modifications)
+        return AgentStream(self, "modify_plan", prompt, on_tool)
+
+    # Async variants for the HTTP backends: the blocking agent run moves to a worker
+    # thread so the event loop keeps serving other requests meanwhile.
+
+    async def agenerate_travel_plan(self, *args, **kwargs):
+        return await asyncio.to_thread(self.generate_travel_plan, *args, **kwargs)
+
+    async def aanswer_question(self, *args, **kwargs):
+        return await asyncio.to_thread(self.answer_question, *args, **kwargs)
+
+    async def aupdate_travel_plan(self, *args, **kwargs):
+        return await asyncio.to_thread(self.update_travel_plan, *args, **kwargs)
+
+    async def aupdate_plan_for_weather(self, *args, **kwargs):
+        return await asyncio.to_thread(self.update_plan_for_weather, *args, **kwargs)
+
+    async def amodify_plan(self, *args, **kwargs):
+        return await asyncio.to_thread(self.modify_plan, *args, **kwargs)
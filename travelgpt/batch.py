@@ -0,0 +1,118 @@
+"""Plans for many travellers at once, researching what they have in common only once.
+
+Trips to the same destination on the same dates, budget and travel styles form a group.
+A group of several trips gets one SHARED_PLAN run (weather, accommodation, itinerary,
+food, costs) and one TRANSPORT_PLAN run per distinct departure city; each traveller's
+plan is the shared plan followed by their journey. A traveller who gave no departure
+city gets the shared plan alone. A trip that shares nothing with the others is planned
+on its own, exactly like /generate-plan.
+
+Trips are normalized first (see preflight.py), so spelling variants of one destination,
+style or budget still group together, and a trip that fails validation gets its
+InvalidTrip without costing a run.
+
+All runs of a batch go through one thread pool of `max_workers` threads, so a batch of
+fifty offsite attendees costs a handful of concurrent LLM runs at any moment. Each run
+checks out a phi agent of its own (see TravelAgent.checkout), so the workers never share one.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .agent import AgentReply
+from .cancellation import Cancelled
+from .instrumentation import metrics
+from .preflight import InvalidTrip, normalize_trip
+
+# Agent runs of one batch executing at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Trips accepted in one batch request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "50"))
+
+TRIP_FIELDS = ("destination", "present_location", "start_date", "end_date", "budget", "travel_style")
+
+
+def group_trips(trips):
+    """Indexes of `trips` (normalized Trips) grouped by their `shared_key`, in order of first appearance."""
+    groups = {}
+    for index, trip in enumerate(trips):
+        groups.setdefault(trip.shared_key, []).append(index)
+    return list(groups.values())
+
+
+def _origin(trip):
+    return trip.present_location.casefold()
+
+
+def _submit(pool, func, *args):
+    # Every task gets its own copy of the caller's context: the job's cancel token and trace
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+
+def _outcome(future):
+    """The future's result, or the exception it raised; Cancelled stops the whole batch."""
+    try:
+        return future.result()
+    except Cancelled:
+        raise
+    except Exception as e:
+        return e
+
+
+def generate_plans(travel_agent, trips, max_workers=BATCH_CONCURRENCY):
+    """Plans for every trip (dicts with TRIP_FIELDS), in order: an AgentReply or the Exception that stopped it."""
+    results = [None] * len(trips)
+    valid, positions = [], []
+    for index, fields in enumerate(trips):
+        try:
+            valid.append(normalize_trip(*(fields[f] for f in TRIP_FIELDS)))
+            positions.append(index)
+        except InvalidTrip as e:
+            results[index] = e
+    trips, groups = valid, group_trips(valid)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="travelgpt-batch") as pool:
+        single, shared, transport = {}, {}, {}
+        for number, members in enumerate(groups):
+            first = trips[members[0]]
+            if len(members) == 1:
+                single[number] = _submit(pool, travel_agent.generate_travel_plan, *first.args())
+                continue
+            shared[number] = _submit(pool, travel_agent.generate_shared_plan, first.destination, first.start_date,
+                                     first.end_date, first.budget, list(first.travel_style), len(members))
+            for index in members:
+                origin = (number, _origin(trips[index]))
+                if origin[1] and origin not in transport:
+                    transport[origin] = _submit(pool, travel_agent.plan_transport, first.destination,
+                                                trips[index].present_location, first.start_date, first.end_date,
+                                                first.budget)
+
+        try:
+            for number, members in enumerate(groups):
+                if number in single:
+                    plan = _outcome(single[number])
+                    if not isinstance(plan, Exception):
+                        plan = AgentReply(plan, {**plan.metadata, "group": number, "shared_with": 0})
+                    results[positions[members[0]]] = plan
+                    continue
+                common = _outcome(shared[number])
+                for index in members:
+                    origin = _origin(trips[index])
+                    journey = _outcome(transport[(number, origin)]) if origin else None
+                    if isinstance(common, Exception) or isinstance(journey, Exception):
+                        results[positions[index]] = common if isinstance(common, Exception) else journey
+                        continue
+                    metadata = {"group": number, "shared_with": len(members) - 1, "shared_plan": common.metadata}
+                    if journey is None:
+                        results[positions[index]] = AgentReply(str(common), metadata)
+                        continue
+                    results[positions[index]] = AgentReply(f"{common}\n\n{journey}",
+                                                           {**metadata, "transport": journey.metadata})
+        except Cancelled:
+            for future in (*single.values(), *shared.values(), *transport.values()):
+                future.cancel()
+            raise
+
+    runs = len(single) + len(shared) + len(transport)
+    metrics.inc("travelgpt_batch_trips_total", (), len(results))
+    metrics.inc("travelgpt_batch_runs_total", (), runs)
+    return results
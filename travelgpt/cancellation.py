@@ -0,0 +1,90 @@
+"""Cooperative cancellation of agent runs.
+
+A CancelToken is installed for the duration of a run with `cancel_scope`. Like the
+trace and the tool memo it lives in a ContextVar, so it follows the run into tool
+threads. The LLM, tool and HTTP layers call `check_cancelled()` between steps and
+wait with `sleep()`, which wakes up as soon as the run is cancelled.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class Cancelled(BaseException):
+    """Raised inside a cancelled run.
+
+    A BaseException like asyncio.CancelledError, so that it is not swallowed by the
+    `except Exception` handlers phi wraps around tool calls.
+    """
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Calls `callback()` when the token is cancelled (right away if it already is)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def wait(self, seconds):
+        """Sleeps up to `seconds`; raises Cancelled as soon as the token is cancelled."""
+        if self._event.wait(seconds):
+            raise Cancelled(self.reason)
+
+
+_current_token = ContextVar("cancel_token", default=None)
+
+
+def current_token():
+    return _current_token.get()
+
+
+@contextmanager
+def cancel_scope(token):
+    """Makes `token` the cancellation token of everything run inside the block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def check_cancelled():
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds):
+    """time.sleep that returns early, raising Cancelled, when the current run is cancelled."""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# off: call the model as usual
+# record: call the model and store every run
+# replay: serve stored runs only, fail on a miss
+# auto: serve stored runs, record the ones that are missing (warm cache for demo traffic)
+CASSETTE_MODE = os.getenv("AGENT_CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv("AGENT_CASSETTE_DIR", "cassettes")
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recording exists for an agent run."""
+
+
+class Recording:
+    """LLM requests/responses and tool inputs/outputs captured during one agent run."""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, **data):
+        with self._lock:
+            self.events.append({"kind": kind, **data})
+
+
+class CassetteResponse:
+    """Replayed stand-in for phi's RunResponse."""
+
+    def __init__(self, entry):
+        self.content = entry["content"]
+        self.metrics = dict(entry.get("metrics") or {})
+        self.metrics["cassette"] = "replay"
+        self.events = entry.get("events", [])
+
+
+_current_recording = ContextVar("cassette_recording", default=None)
+
+
+def recording_active():
+    """Whether the current run is being recorded; check it before building an event's payload."""
+    return _current_recording.get() is not None
+
+
+def record_event(kind, **data):
+    """Adds an event to the recording of the current run, if one is being recorded."""
+    recording = _current_recording.get()
+    if recording is not None:
+        recording.add(kind, **data)
+
+
+def message_dict(message):
+    if hasattr(message, "model_dump"):
+        return message.model_dump(include={"role", "content", "tool_calls", "tool_call_id", "name"}, exclude_none=True)
+    return {"role": getattr(message, "role", None), "content": getattr(message, "content", str(message))}
+
+
+def to_jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    try:
+        json.dumps(value)
+        return value
+    except TypeError:
+        return str(value)
+
+
+class Cassette:
+    """Stores agent runs as small gzipped JSON files keyed on the agent setup and the prompt."""
+
+    def __init__(self, directory=CASSETTE_DIR, mode=CASSETTE_MODE):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"AGENT_CASSETTE_MODE must be one of {', '.join(CASSETTE_MODES)}, got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+
+    def key(self, agent, prompt):
+        model = getattr(agent, "model", None)
+        identity = {
+            "agent": getattr(agent, "name", None),
+            "model": getattr(model, "id", None),
+            "instructions": getattr(agent, "instructions", None),
+            "prompt": prompt,
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def load(self, key):
+        try:
+            with gzip.open(self.path(key), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, prompt, response, recording):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "recorded_at": time.time(),
+            "prompt": prompt,
+            "content": response.content if hasattr(response, "content") else str(response),
+            "metrics": to_jsonable(getattr(response, "metrics", None)),
+            "events": recording.events,
+        }
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, default=str, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def recording(self):
+        recording = Recording()
+        token = _current_recording.set(recording)
+        try:
+            yield recording
+        finally:
+            _current_recording.reset(token)
+
+    def run(self, agent, prompt, run):
+        """Serves `agent.run(prompt)` from the cassette or records it, depending on the mode."""
+        if self.mode == "off":
+            return run()
+
+        key = self.key(agent, prompt)
+        if self.mode in ("replay", "auto"):
+            entry = self.load(key)
+            if entry is not None:
+                return CassetteResponse(entry)
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recorded run for this prompt ({key[:12]}) in {self.directory}")
+
+        with self.recording() as recording:
+            response = run()
+        self.save(key, prompt, response, recording)
+        return response
+
+
+cassette = Cassette()
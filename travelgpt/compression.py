@@ -0,0 +1,263 @@
+"""Negotiated gzip/brotli compression and plan-version ETags for the HTTP backends.
+
+Responses carrying a plan get a weak ETag derived from the plan version, and a
+Content-Location of /plans/<version>, where the backends serve the plan again for
+SERVED_PLAN_TTL seconds. A client that sends the ETag back in If-None-Match on a GET or
+HEAD gets an empty 304 instead of the plan it already holds. Other methods are not
+conditional here: a POST that generates or changes a plan always gets its result, and
+the ETag only tells the client whether it changed.
+Bodies of at least COMPRESS_MIN_BYTES are compressed with the best encoding the client
+accepts: brotli when the optional `brotli` package is installed, else gzip.
+
+FastAPI: `app.add_middleware(CompressionMiddleware)` (compresses as the body streams).
+Flask:   `app.after_request(compress_flask_response)`.
+"""
+import functools
+import os
+import zlib
+
+from .instrumentation import metrics
+from .plan_sections import plan_version
+from .shared_cache import make_store
+
+# Smaller bodies are sent as they are: the headers would eat most of the saving
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+# Requests a matching If-None-Match turns into a 304 (RFC 9110, 13.1.2)
+CONDITIONAL_METHODS = ("GET", "HEAD")
+# How long a served plan can be fetched again from /plans/<version>
+SERVED_PLAN_TTL = float(os.getenv("SERVED_PLAN_TTL", "86400"))
+
+served_plans = make_store("served_plan", max_size=1024)
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def plan_etag(plan):
+    """Weak ETag of a plan: equal for every encoding of the same plan version."""
+    return f'W/"{plan_version(str(plan))}"'
+
+
+def plan_headers(plan):
+    """ETag and Content-Location of a plan response; keeps the plan for served_plan()."""
+    version = plan_version(str(plan))
+    served_plans.set(version, str(plan), SERVED_PLAN_TTL)
+    return {"ETag": plan_etag(plan), "Content-Location": f"/plans/{version}"}
+
+
+def served_plan(version):
+    """A plan sent in an earlier response, by version, or None once it has expired."""
+    found, plan = served_plans.get(version)
+    return plan if found else None
+
+
+def _opaque(tag):
+    return tag.strip().removeprefix("W/")
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag) == _opaque(etag) for tag in if_none_match.split(","))
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for an Accept-Encoding header: "br", "gzip" or None."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and _brotli() is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compressible(content_type):
+    return any((content_type or "").startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class Compressor:
+    """Incremental compressor, so a streamed body can be sent as it is produced."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = _brotli().Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, chunk):
+        """Compresses `chunk` and flushes it, so the client can decode everything sent so far."""
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(body, encoding):
+    compressor = Compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def _count(encoding, raw, sent):
+    metrics.inc("travelgpt_http_responses_total", (("encoding", encoding or "identity"),))
+    metrics.inc("travelgpt_http_body_bytes_total", (("stage", "raw"),), raw)
+    metrics.inc("travelgpt_http_body_bytes_total", (("stage", "sent"),), sent)
+
+
+def compress_flask_response(response):
+    """Flask after_request hook: answers 304 for a matching ETag on GET/HEAD, else compresses the body."""
+    from flask import request
+
+    etag = response.headers.get("ETag")
+    if (response.status_code == 200 and request.method in CONDITIONAL_METHODS
+            and etag_matches(request.headers.get("If-None-Match"), etag)):
+        response.status_code = 304
+        response.set_data(b"")
+        for header in ("Content-Type", "Content-Length"):
+            response.headers.pop(header, None)
+        return response
+
+    if response.direct_passthrough or "Content-Encoding" in response.headers or not compressible(response.content_type):
+        return response
+    response.headers.add("Vary", "Accept-Encoding")
+    body = response.get_data()
+    encoding = negotiate(request.headers.get("Accept-Encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    _count(encoding, len(body), response.content_length or 0)
+    return response
+
+
+class CompressionMiddleware:
+    """ASGI middleware: 304 for a matching ETag on GET/HEAD, else negotiated compression of the body.
+
+    The body is compressed chunk by chunk as the app sends it. Bodies that end before
+    `minimum_size` bytes are sent unchanged.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        if_none_match = headers.get("if-none-match") if scope.get("method") in CONDITIONAL_METHODS else None
+        responder = _Responder(send, if_none_match, negotiate(headers.get("accept-encoding")), self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _Responder:
+    def __init__(self, send, if_none_match, encoding, minimum_size):
+        self.send = send
+        self.if_none_match = if_none_match
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.mode = None  # "passthrough", "not-modified", "buffer" or "compress"
+        self.buffer = b""
+        self.compressor = None
+        self.raw = self.sent = 0
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+            if message["status"] == 200 and etag_matches(self.if_none_match, headers.get("etag")):
+                self.mode = "not-modified"
+                kept = [(k, v) for k, v in message["headers"] if k.lower() not in (b"content-type", b"content-length")]
+                await self.send({"type": "http.response.start", "status": 304, "headers": kept})
+            elif "content-encoding" in headers or not compressible(headers.get("content-type")):
+                self.mode = "passthrough"
+                await self.send(message)
+            else:
+                self.mode = "buffer"
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.mode == "not-modified":
+            if not message.get("more_body", False):
+                await self.send({"type": "http.response.body", "body": b""})
+            return
+        if self.mode == "passthrough":
+            await self.send(message)
+            return
+
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        self.raw += len(body)
+        if self.mode == "buffer":
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size and more_body:
+                return
+            if self.encoding is None or len(self.buffer) < self.minimum_size:
+                # Too small (or not accepted compressed): send as it came
+                await self._start(None, None if more_body else len(self.buffer))
+                self.mode = "passthrough"
+                self.sent += len(self.buffer)
+                await self.send({"type": "http.response.body", "body": self.buffer, "more_body": more_body})
+                if not more_body:
+                    _count(None, self.raw, self.sent)
+                return
+            if not more_body:
+                # The whole body arrived at once: compress it in one go and keep a Content-Length
+                data = compress(self.buffer, self.encoding)
+                _count(self.encoding, self.raw, len(data))
+                await self._start(self.encoding, len(data))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            self.mode = "compress"
+            self.compressor = Compressor(self.encoding)
+            body, self.buffer = self.buffer, b""
+            await self._start(self.encoding, None)
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+            self.sent += len(chunk)
+            _count(self.encoding, self.raw, self.sent)
+        else:
+            self.sent += len(chunk)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _start(self, encoding, length):
+        headers = [(k, v) for k, v in self.start.get("headers", []) if k.lower() != b"content-length"]
+        headers.append((b"vary", b"Accept-Encoding"))
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        await self.send({**self.start, "headers": headers})
@@ -0,0 +1,119 @@
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cancellation
+from .http_client import backoff_delay, http_client, READ_TIMEOUT
+from .shared_cache import make_store
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+# DuckDuckGo rate limits are waited out this many times, starting at about SEARCH_RATELIMIT_BACKOFF seconds
+SEARCH_RATELIMIT_RETRIES = int(os.getenv("SEARCH_RATELIMIT_RETRIES", "2"))
+SEARCH_RATELIMIT_BACKOFF = float(os.getenv("SEARCH_RATELIMIT_BACKOFF", "2"))
+
+
+class DuckDuckGoSearch:
+    """Long-lived DuckDuckGo client with a result cache and a concurrency-limited batch API.
+
+    Every thread keeps its own DDGS instance, so the underlying HTTP session is reused
+    instead of being rebuilt on every search, and no session is shared between threads.
+    """
+
+    def __init__(self, max_results=5, ttl=SEARCH_CACHE_TTL, max_size=SEARCH_CACHE_SIZE,
+                 max_concurrency=SEARCH_CONCURRENCY):
+        self.max_results = max_results
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local = threading.local()
+        # Shared between worker processes when TRAVELGPT_CACHE_BACKEND=sqlite
+        self.store = make_store("search", max_size=max_size)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ddg-search")
+
+    @property
+    def client(self):
+        if getattr(self._local, "ddgs", None) is None:
+            self._local.ddgs = self.client_class()(timeout=READ_TIMEOUT)
+        return self._local.ddgs
+
+    @staticmethod
+    def client_class():
+        # Imported on first use; duckduckgo_search pulls in a heavy HTTP stack
+        from duckduckgo_search import DDGS
+
+        return DDGS
+
+    @staticmethod
+    def ratelimit_error():
+        from duckduckgo_search.exceptions import RatelimitException
+
+        return RatelimitException
+
+    @staticmethod
+    def _key(query, max_results):
+        return " ".join(query.split()).lower(), max_results
+
+    def search(self, query, max_results=None):
+        """Returns DuckDuckGo text results for a query, from the cache when possible."""
+        max_results = max_results or self.max_results
+        normalized, _ = self._key(query, max_results)
+        key = f"{max_results}:{normalized}"
+        found, results = self.store.get(key)
+        if not found:
+            results = self._text(query, max_results)
+            # An empty answer is often a soft block rather than a query without results
+            if results:
+                self.store.set(key, results, self.ttl)
+        return list(results)
+
+    def _text(self, query, max_results):
+        # A rate limit says nothing about whether DuckDuckGo is up: back off here, without
+        # counting it toward the host's circuit breaker
+        ratelimit_error = self.ratelimit_error()
+        for attempt in range(SEARCH_RATELIMIT_RETRIES + 1):
+            try:
+                results = http_client.call_except("duckduckgo.com", ratelimit_error, self.client.text, query,
+                                                  max_results=max_results)
+                return list(results or [])
+            except ratelimit_error:
+                if attempt == SEARCH_RATELIMIT_RETRIES:
+                    raise
+                cancellation.sleep(backoff_delay(attempt, base=SEARCH_RATELIMIT_BACKOFF))
+
+    def search_many(self, queries, max_results=None):
+        """Searches several queries in parallel, at most `max_concurrency` at a time.
+
+        Results come back in the order of `queries`; repeated queries are only searched once.
+        """
+        unique = OrderedDict()
+        for query in queries:
+            unique.setdefault(self._key(query, max_results)[0], query)
+        # copy_context carries the run's tool memo and cancellation token into the pool
+        futures = {key: self._pool.submit(contextvars.copy_context().run, self.search, query, max_results)
+                   for key, query in unique.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = [{"error": str(e)}]
+        return [list(results[self._key(q, max_results)[0]]) for q in queries]
+
+    def clear(self):
+        self.store.clear()
+
+
+ddg_search = DuckDuckGoSearch()
+
+
+def duckduckgo_search(query):
+    """Searches DuckDuckGo and returns the results."""
+    return ddg_search.search(query)
+
+
+def duckduckgo_search_many(queries: list):
+    """Searches DuckDuckGo for several queries at once, e.g. one per attraction."""
+    return ddg_search.search_many(queries)
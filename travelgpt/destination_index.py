@@ -0,0 +1,152 @@
+"""Local, versioned index of destination facts, consulted before live web search.
+
+Layout under DEST_INDEX_PATH:
+
+    CURRENT                  name of the version in use (switched atomically by the builder)
+    <version>/manifest.json  version, build time, topics and per-destination summary
+    <version>/records.jsonl.gz  one record per destination:
+        {"destination", "key", "aliases", "updated_at", "facts": {topic: [{"title", "href", "body"}]}}
+
+The text index (BM25 over the snippets) is built in memory the first time the index is
+used. Build or refresh the index with `python -m travelgpt.index_builder`.
+"""
+import gzip
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from .instrumentation import metrics
+
+DEST_INDEX_PATH = os.getenv("DEST_INDEX_PATH",
+                            os.path.join(os.path.dirname(__file__), "..", "data", "destination_index"))
+# Records older than this many days are treated as missing and looked up live instead
+DEST_INDEX_MAX_AGE_DAYS = float(os.getenv("DEST_INDEX_MAX_AGE_DAYS", "90"))
+
+TOPICS = {
+    "attractions": "top attractions and things to do in {destination}",
+    "neighbourhoods": "best neighbourhoods and areas to stay in {destination}",
+    "costs": "typical daily travel costs prices in {destination}",
+    "transport": "getting around {destination} public transport airport transfer",
+    "food": "local food and best restaurants in {destination}",
+}
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def destination_key(name):
+    return " ".join(TOKEN.findall((name or "").lower()))
+
+
+def tokenize(text):
+    return TOKEN.findall((text or "").lower())
+
+
+class DestinationIndex:
+    """Read side of the index: exact destination lookup plus BM25 search over the snippets."""
+
+    def __init__(self, path=DEST_INDEX_PATH, max_age_days=DEST_INDEX_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.version = None
+        self.records = {}
+        self._aliases = {}
+        self._docs = []
+        self._postings = defaultdict(list)
+        self._lengths = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _version_dir(self):
+        try:
+            with open(os.path.join(self.path, "CURRENT")) as f:
+                return os.path.join(self.path, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Loads the current version; a missing index simply leaves every lookup to live search."""
+        with self._lock:
+            if self._loaded:
+                return self
+            directory = self._version_dir()
+            if directory is not None and os.path.exists(os.path.join(directory, "records.jsonl.gz")):
+                with open(os.path.join(directory, "manifest.json")) as f:
+                    self.version = json.load(f)["version"]
+                with gzip.open(os.path.join(directory, "records.jsonl.gz"), "rt", encoding="utf-8") as f:
+                    for line in f:
+                        self._add(json.loads(line))
+            self._loaded = True
+        return self
+
+    def _add(self, record):
+        key = record["key"]
+        self.records[key] = record
+        for alias in [record["destination"]] + record.get("aliases", []):
+            self._aliases[destination_key(alias)] = key
+        for topic, items in record["facts"].items():
+            for item in items:
+                doc_id = len(self._docs)
+                self._docs.append((key, topic, item))
+                counts = Counter(tokenize(f"{item.get('title', '')} {item.get('body', '')}"))
+                self._lengths.append(sum(counts.values()))
+                for token, count in counts.items():
+                    self._postings[token].append((doc_id, count))
+
+    def lookup(self, destination):
+        """Returns the record for a destination if it is indexed and fresh, else None."""
+        self.load()
+        key = self._aliases.get(destination_key(destination))
+        record = self.records.get(key) if key else None
+        fresh = record is not None and time.time() - record["updated_at"] <= self.max_age
+        metrics.inc("travelgpt_destination_index_lookups_total", (("result", "hit" if fresh else "stale" if record else "miss"),))
+        return record if fresh else None
+
+    def search(self, query, destination=None, topic=None, k=5):
+        """BM25 over the indexed snippets, optionally limited to one destination and topic."""
+        self.load()
+        if not self._docs:
+            return []
+        only = self._aliases.get(destination_key(destination)) if destination else None
+        average = sum(self._lengths) / len(self._lengths)
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token, ())
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self._docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                key, doc_topic, _ = self._docs[doc_id]
+                if (only and key != only) or (topic and doc_topic != topic):
+                    continue
+                norm = count * 2.2 / (count + 1.2 * (0.25 + 0.75 * self._lengths[doc_id] / average))
+                scores[doc_id] += idf * norm
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [{"destination": self.records[self._docs[i][0]]["destination"], "topic": self._docs[i][1], **self._docs[i][2]}
+                for i in best]
+
+
+destination_index = DestinationIndex()
+
+
+def destination_facts(destination: str, topic: str = ""):
+    """Looks up curated facts about a destination (attractions, neighbourhoods, costs, transport, food).
+
+    Answers from the local destination index when it has fresh data, and falls back to a
+    live web search otherwise. Leave `topic` empty to get every topic.
+    """
+    record = destination_index.lookup(destination)
+    if record is not None:
+        facts = record["facts"]
+        if topic:
+            matched = {t: items for t, items in facts.items() if t in topic.lower()}
+            facts = matched or {topic: destination_index.search(topic, destination=destination)}
+        return {"source": f"destination index {destination_index.version}", "destination": record["destination"], "facts": facts}
+
+    from .ddg_search import ddg_search
+
+    query = TOPICS.get(topic.lower(), f"{topic} {{destination}}" if topic else TOPICS["attractions"]).format(destination=destination)
+    return {"source": "live search", "destination": destination, "facts": {topic or "attractions": ddg_search.search(query)}}
@@ -0,0 +1,131 @@
+"""Offline place lookup for pre-flight validation: no network, no tokens.
+
+Places come from data/gazetteer.tsv (the indexed destinations plus common departure
+cities, with coordinates). Countries and their subdivisions are recognised too when the
+optional `pycountry` package is installed, without coordinates. `resolve` matches
+aliases ("NYC"), "City, Country" forms and close misspellings of the gazetteer cities
+("Barcelone"). Only an exact city match is safe to substitute for what the user typed:
+regions and near misses are often a different place ("Manaus" is not "Manus").
+"""
+import difflib
+import functools
+import os
+import threading
+
+from .destination_index import destination_key
+
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "gazetteer.tsv"))
+# Similarity a misspelt name needs to be corrected to a known place (difflib ratio)
+GAZETTEER_FUZZY_CUTOFF = float(os.getenv("GAZETTEER_FUZZY_CUTOFF", "0.85"))
+
+
+class Place:
+    def __init__(self, name, country=None, lat=None, lon=None, kind="city"):
+        self.name = name
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+        self.kind = kind  # "city" (a gazetteer entry), "country" or "region"
+
+    def as_dict(self):
+        place = {"name": self.name, "country": self.country, "kind": self.kind}
+        if self.lat is not None:
+            place.update(lat=self.lat, lon=self.lon)
+        return place
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.country!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def _pycountry():
+    try:
+        import pycountry
+    except ImportError:
+        return None
+    return pycountry
+
+
+def read_gazetteer(path):
+    """[(Place, aliases)] from a gazetteer file; # starts a comment line."""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, country, lat, lon, *rest = line.rstrip("\n").split("\t")
+            aliases = [a.strip() for a in rest[0].split("|")] if rest else []
+            entries.append((Place(name, country, float(lat), float(lon)), aliases))
+    return entries
+
+
+class Gazetteer:
+    def __init__(self, path=GAZETTEER_PATH):
+        self.path = path
+        self._places = None
+        self._cities = ()
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._places is None:
+            with self._lock:
+                if self._places is None:
+                    self._places = self._build()
+        return self._places
+
+    def _build(self):
+        places = {}
+        pycountry = _pycountry()
+        if pycountry is not None:
+            # Countries and regions go in first, so a gazetteer city of the same name wins
+            for subdivision in pycountry.subdivisions:
+                places.setdefault(destination_key(subdivision.name),
+                                  Place(subdivision.name, subdivision.country_code, kind="region"))
+            for country in pycountry.countries:
+                place = Place(getattr(country, "common_name", country.name), country.alpha_2, kind="country")
+                for name in (country.name, getattr(country, "common_name", None), getattr(country, "official_name", None)):
+                    if name:
+                        places[destination_key(name)] = place
+        try:
+            for place, aliases in read_gazetteer(self.path):
+                for name in [place.name] + aliases:
+                    places[destination_key(name)] = place
+        except OSError:
+            pass
+        self._cities = [key for key, place in places.items() if place.kind == "city"]
+        return places
+
+    def _country_matches(self, place, text):
+        key = destination_key(text)
+        if place.country and key == place.country.lower():
+            return True
+        other = self.load().get(key)
+        return other is not None and other.kind == "country" and other.country == place.country
+
+    @functools.lru_cache(maxsize=4096)
+    def resolve(self, text):
+        """(Place, how) for a free-text place name, or (None, None); `how` is "exact" or "fuzzy".
+
+        Fuzzy matches only ever name a gazetteer city.
+        """
+        places = self.load()
+        key = destination_key(text)
+        if not key:
+            return None, None
+        if key in places:
+            return places[key], "exact"
+        head, _, tail = text.rpartition(",")
+        if head.strip():
+            place, how = self.resolve(head)
+            # "Paris, France" is Paris; "Paris, Texas" is somewhere else
+            if place is not None and place.kind != "country" and self._country_matches(place, tail):
+                return place, how
+            return None, None
+        if len(key) >= 5:
+            close = difflib.get_close_matches(key, self._cities, n=1, cutoff=GAZETTEER_FUZZY_CUTOFF)
+            if close:
+                return places[close[0]], "fuzzy"
+        return None, None
+
+
+gazetteer = Gazetteer()
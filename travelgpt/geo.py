@@ -0,0 +1,294 @@
+"""Distances, travel times and stop ordering computed locally instead of guessed by the LLM.
+
+Places are geocoded once (OpenStreetMap Nominatim, cached in the shared store) and then
+handled in numpy: haversine distance matrices, a KD-tree for nearest-place lookups and a
+nearest-neighbour + 2-opt heuristic that orders a day's stops. `route_day` and
+`distances_from` expose this to the agent as tools.
+"""
+import heapq
+import os
+import threading
+import time
+from urllib.parse import quote_plus
+
+import numpy as np
+
+from . import cancellation
+from .http_client import http_client
+from .shared_cache import make_store
+
+GEOCODER_URL = os.getenv("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+# Nominatim asks for an identifying User-Agent and at most one request per second
+GEOCODER_USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "TravelGPT/1.0")
+GEOCODER_MIN_INTERVAL = float(os.getenv("GEOCODER_MIN_INTERVAL", "1"))
+# Places do not move; keep coordinates for 30 days
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 86400)))
+# Streets are longer than the straight line between two points
+GEO_DETOUR_FACTOR = float(os.getenv("GEO_DETOUR_FACTOR", "1.3"))
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Average speed in km/h and fixed minutes per leg (waiting, parking) of each way of getting around
+MODES = {
+    "walk": (4.5, 0),
+    "bike": (14, 2),
+    "transit": (20, 8),
+    "drive": (25, 5),
+}
+
+geocode_store = make_store("geocode", max_size=4096)
+
+
+def haversine_matrix(lats, lons):
+    """Great-circle distances in km between every pair of points, as an (n, n) array."""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def haversine(lat1, lon1, lats, lons):
+    """Distances in km from one point to each of `lats`/`lons`."""
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lat - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat) * np.sin((lon - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def travel_minutes(km, mode="walk"):
+    speed, overhead = MODES.get(mode, MODES["walk"])
+    return np.asarray(km) * GEO_DETOUR_FACTOR / speed * 60 + overhead
+
+
+def _unit_vectors(lats, lons):
+    # Points on the unit sphere: the straight-line (chord) distance grows with the
+    # great-circle distance, so a plain euclidean KD-tree finds the right neighbours
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class GeoIndex:
+    """KD-tree over named coordinates for nearest-place and radius queries."""
+
+    def __init__(self, names, lats, lons):
+        self.names = list(names)
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.points = _unit_vectors(self.lats, self.lons)
+        self.root = self._build(np.arange(len(self.names)), 0)
+
+    def _build(self, indices, depth):
+        if len(indices) == 0:
+            return None
+        axis = depth % 3
+        indices = indices[np.argsort(self.points[indices, axis], kind="stable")]
+        middle = len(indices) // 2
+        return (indices[middle], axis,
+                self._build(indices[:middle], depth + 1),
+                self._build(indices[middle + 1:], depth + 1))
+
+    def nearest(self, lat, lon, k=1):
+        """The `k` places closest to (lat, lon) as [(name, km)], closest first."""
+        target = _unit_vectors([lat], [lon])[0]
+        best = []  # max-heap of (-squared chord distance, index)
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            d2 = float(np.sum((self.points[index] - target) ** 2))
+            if len(best) < k:
+                heapq.heappush(best, (-d2, index))
+            elif d2 < -best[0][0]:
+                heapq.heapreplace(best, (-d2, index))
+            diff = target[axis] - self.points[index][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far)
+
+        visit(self.root)
+        found = sorted(index for _, index in best)
+        km = haversine(lat, lon, self.lats[found], self.lons[found])
+        return sorted(zip((self.names[i] for i in found), km.tolist()), key=lambda pair: pair[1])
+
+    def within(self, lat, lon, radius_km):
+        """Every place within `radius_km` of (lat, lon) as [(name, km)], closest first."""
+        places = self.nearest(lat, lon, k=len(self.names))
+        return [(name, km) for name, km in places if km <= radius_km]
+
+
+def route_length(order, matrix):
+    return float(sum(matrix[a][b] for a, b in zip(order, order[1:])))
+
+
+def order_stops(matrix, start=None):
+    """Orders stops into a short open path: nearest neighbour, then 2-opt and Or-opt until no move helps.
+
+    With `start` the path begins at that stop (e.g. the hotel); otherwise every stop is
+    tried as the first one.
+    """
+    matrix = np.asarray(matrix).tolist()  # plain lists index much faster in these loops
+    n = len(matrix)
+    if n < 3:
+        return list(range(n)) if start in (None, 0) else [start] + [i for i in range(n) if i != start]
+
+    def nearest_neighbour(first):
+        order, left = [first], set(range(n)) - {first}
+        while left:
+            nxt = min(left, key=lambda j: matrix[order[-1]][j])
+            order.append(nxt)
+            left.remove(nxt)
+        return order
+
+    def two_opt(order):
+        first_movable = 0 if start is None else 1
+        improved = True
+        while improved:
+            improved = False
+            for i in range(first_movable, n - 1):
+                for j in range(i + 1, n):
+                    # Reversing order[i..j] only changes the edges on either side of the segment
+                    before = after = 0.0
+                    if i > 0:
+                        before += matrix[order[i - 1]][order[i]]
+                        after += matrix[order[i - 1]][order[j]]
+                    if j < n - 1:
+                        before += matrix[order[j]][order[j + 1]]
+                        after += matrix[order[i]][order[j + 1]]
+                    if after < before - 1e-9:
+                        order[i:j + 1] = order[i:j + 1][::-1]
+                        improved = True
+            # Or-opt: move a run of up to three stops elsewhere, which 2-opt alone cannot do
+            length = route_length(order, matrix)
+            for size in (1, 2, 3):
+                for i in range(first_movable, n - size + 1):
+                    segment, rest = order[i:i + size], order[:i] + order[i + size:]
+                    for j in range(first_movable, len(rest) + 1):
+                        candidate = rest[:j] + segment + rest[j:]
+                        if route_length(candidate, matrix) < length - 1e-9:
+                            order[:], length, improved = candidate, route_length(candidate, matrix), True
+                            break
+                    else:
+                        continue
+                    break
+        return order
+
+    starts = [start] if start is not None else range(n)
+    order = min((two_opt(nearest_neighbour(first)) for first in starts), key=lambda o: route_length(o, matrix))
+    return order
+
+
+_geocode_lock = threading.Lock()
+_next_geocode = 0.0
+
+
+def _reserve_geocode_slot():
+    """Seconds to wait before the next geocoder request may go out; books the slot after it."""
+    global _next_geocode
+    with _geocode_lock:
+        now = time.monotonic()
+        slot = max(now, _next_geocode)
+        _next_geocode = slot + GEOCODER_MIN_INTERVAL
+    return slot - now
+
+
+def geocode(place, near=""):
+    """Returns (lat, lon) for a place name, or None when it cannot be found; cached."""
+    query = f"{place}, {near}" if near and near.lower() not in place.lower() else place
+    key = " ".join(query.split()).lower()
+    found, coords = geocode_store.get(key)
+    if found:
+        return tuple(coords) if coords else None
+
+    # Only the booking of a slot is serialized: waiting and the request itself happen
+    # outside the lock, so a slow response does not hold up the requests behind it
+    wait = _reserve_geocode_slot()
+    if wait > 0:
+        cancellation.sleep(wait)
+    response = http_client.get(GEOCODER_URL, params={"q": query, "format": "json", "limit": 1},
+                               headers={"User-Agent": GEOCODER_USER_AGENT})
+    response.raise_for_status()
+    results = response.json()
+    coords = (float(results[0]["lat"]), float(results[0]["lon"])) if results else None
+    # Misses are cached too, so the agent does not look them up again on every run
+    geocode_store.set(key, coords, GEOCODE_CACHE_TTL)
+    return coords
+
+
+def _locate(places, city):
+    located, unresolved = [], []
+    for place in places:
+        coords = geocode(place, near=city)
+        if coords:
+            located.append((place, coords))
+        else:
+            unresolved.append(place)
+    return located, unresolved
+
+
+def _map_link(names, city, mode):
+    travelmode = {"walk": "walking", "bike": "bicycling", "transit": "transit", "drive": "driving"}.get(mode, "walking")
+    stops = [quote_plus(f"{name}, {city}" if city else name) for name in names]
+    link = f"https://www.google.com/maps/dir/?api=1&travelmode={travelmode}&origin={stops[0]}&destination={stops[-1]}"
+    if len(stops) > 2:
+        link += "&waypoints=" + "%7C".join(stops[1:-1])
+    return link
+
+
+def route_day(places: list, city: str = "", mode: str = "walk", start: str = ""):
+    """Orders one day's stops into the shortest route and gives the distance and travel time of every leg.
+
+    Use this for each day of an itinerary instead of estimating distances or travel times.
+    `places` are attraction or venue names, `city` disambiguates them, `mode` is one of
+    walk, bike, transit or drive, and `start` (e.g. the hotel) fixes the first stop.
+    """
+    names = ([start] if start else []) + [p for p in places if p != start]
+    located, unresolved = _locate(names, city)
+    if not located:
+        return {"error": "None of the places could be located", "unresolved": unresolved}
+
+    located_names = [name for name, _ in located]
+    lats, lons = zip(*(coords for _, coords in located))
+    matrix = haversine_matrix(lats, lons)
+    order = order_stops(matrix, start=0 if start and located_names[0] == start else None)
+    stops = [located_names[i] for i in order]
+    km = [float(matrix[a, b]) for a, b in zip(order, order[1:])]
+    minutes = travel_minutes(km, mode).tolist() if km else []
+    return {
+        "mode": mode,
+        "stops": stops,
+        "legs": [{"from": stops[i], "to": stops[i + 1], "km": round(km[i], 2), "minutes": round(minutes[i])}
+                 for i in range(len(km))],
+        "total_km": round(sum(km), 2),
+        "total_minutes": round(sum(minutes)),
+        "map": _map_link(stops, city, mode),
+        "unresolved": unresolved,
+    }
+
+
+def distances_from(origin: str, places: list, city: str = "", mode: str = "walk"):
+    """Distance and travel time from one place (e.g. a hotel) to each of the given places, nearest first.
+
+    Use this to state how far accommodation is from the major attractions instead of estimating it.
+    """
+    origin_coords = geocode(origin, near=city)
+    if origin_coords is None:
+        return {"error": f"Could not locate {origin}"}
+    located, unresolved = _locate(places, city)
+    if not located:
+        return {"origin": origin, "places": [], "unresolved": unresolved}
+
+    index = GeoIndex([name for name, _ in located], *zip(*(coords for _, coords in located)))
+    nearest = index.nearest(*origin_coords, k=len(located))
+    return {
+        "origin": origin,
+        "mode": mode,
+        "places": [{"place": name, "km": round(km, 2), "minutes": round(float(travel_minutes(km, mode)))}
+                   for name, km in nearest],
+        "unresolved": unresolved,
+    }
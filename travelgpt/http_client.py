@@ -0,0 +1,217 @@
+import functools
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import cancellation
+
+# Defaults for every outbound call, overridable from the .env file
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods request() retries on its own; others only with retry=True (RFC 9110, 9.2.2)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(Exception):
+    """Raised when calls to a host are short-circuited after repeated failures."""
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"Upstream returned status {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial call through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def before_call(self, host):
+        with self._lock:
+            state = self._state()
+            if state == "open":
+                raise CircuitOpenError(f"Circuit open for {host}, not calling it for now")
+            if state == "half-open":
+                # Re-arm the timer so only this trial call goes through until it reports back
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after(error):
+    """Honours a numeric Retry-After header on 429/503 responses."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return min(float(value), BACKOFF_MAX) if value is not None else None
+    except ValueError:
+        return None
+
+
+def host_of(url):
+    return urlsplit(url).hostname or url
+
+
+class _HostPolicy:
+    """Per-host breakers shared by every HttpClient."""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+
+_policy = _HostPolicy()
+
+
+class HttpClient:
+    """Pooled keep-alive session with timeouts, per-host limits, jittered retries and a circuit breaker."""
+
+    RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, RetryableStatus)
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES, per_host_limit=PER_HOST_LIMIT):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.per_host_limit = per_host_limit
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+    def _acquire(self, semaphore):
+        # Wait in short slices so a cancelled run gives up its place in the queue
+        while not semaphore.acquire(timeout=0.25):
+            cancellation.check_cancelled()
+
+    def call(self, host, func, *args, **kwargs):
+        """Runs any blocking upstream call (e.g. a search client) under the host's limit, retries and breaker."""
+        return self._call(host, self.max_retries, (), func, args, kwargs)
+
+    def call_except(self, host, exceptions, func, *args, **kwargs):
+        """Like call(), but `exceptions` raised by `func` pass straight through: no retry, no breaker failure."""
+        return self._call(host, self.max_retries, exceptions, func, args, kwargs)
+
+    def _call(self, host, max_retries, passthrough, func, args, kwargs):
+        breaker = _policy.breaker(host)
+        for attempt in range(max_retries + 1):
+            cancellation.check_cancelled()
+            breaker.before_call(host)
+            try:
+                semaphore = self._semaphore(host)
+                self._acquire(semaphore)
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    semaphore.release()
+                if isinstance(result, requests.Response) and result.status_code in RETRY_STATUSES:
+                    raise RetryableStatus(result)
+            except self.RETRY_ERRORS as e:
+                breaker.record_failure()
+                if attempt == max_retries:
+                    if isinstance(e, RetryableStatus):
+                        return e.response
+                    raise
+                cancellation.sleep(retry_after(e) or backoff_delay(attempt))
+            except passthrough:
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    def request(self, method, url, retry=None, **kwargs):
+        """Sends a request; only idempotent methods are retried unless `retry` says otherwise."""
+        kwargs.setdefault("timeout", self.timeout)
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        max_retries = self.max_retries if retry else 0
+        return self._call(host_of(url), max_retries, (), self.session.request, (method, url), kwargs)
+
+    def guard(self, host, func):
+        """Returns `func` run through call(host, ...), for clients that do their own HTTP."""
+
+        @functools.wraps(func)
+        def guarded(*args, **kwargs):
+            return self.call(host, func, *args, **kwargs)
+
+        return guarded
+
+    def guard_toolkit(self, host, toolkit):
+        """Runs every function registered on a phi Toolkit through call(host, ...), in place."""
+        for function in toolkit.functions.values():
+            if function.entrypoint is not None:
+                function.entrypoint = self.guard(host, function.entrypoint)
+        return toolkit
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+http_client = HttpClient()
@@ -0,0 +1,116 @@
+"""Offline ingestion for the destination index.
+
+Searches every topic of every destination once, then writes a new index version and
+switches CURRENT to it. Destinations whose record in the current version is still fresh
+are carried over instead of searched again, so a rebuild only pays for new or stale ones.
+
+    python -m travelgpt.index_builder data/top_destinations.txt
+    python -m travelgpt.index_builder data/top_destinations.txt --refresh --max-results 8
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+from .destination_index import DEST_INDEX_PATH, TOPICS, DestinationIndex, destination_key
+
+
+def read_destinations(path):
+    """One destination per line, optionally followed by `|`-separated aliases; # starts a comment."""
+    destinations = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                name, *aliases = [part.strip() for part in line.split("|")]
+                destinations.append((name, aliases))
+    return destinations
+
+
+def build_record(name, aliases, search_many, max_results):
+    """The index record of a destination, or None when every topic came back empty.
+
+    An empty search is usually a failure (rate limit, network) rather than a destination
+    with nothing to say, so it must not replace or look like a fresh record.
+    """
+    queries = [template.format(destination=name) for template in TOPICS.values()]
+    results = search_many(queries, max_results=max_results)
+    facts = {}
+    for topic, items in zip(TOPICS, results):
+        facts[topic] = [
+            {"title": item.get("title", ""), "href": item.get("href", ""), "body": item.get("body", "")}
+            for item in items if "error" not in item
+        ]
+    if not any(facts.values()):
+        return None
+    return {"destination": name, "key": destination_key(name), "aliases": aliases,
+            "updated_at": time.time(), "facts": facts}
+
+
+def write_version(path, records, version):
+    directory = os.path.join(path, version)
+    os.makedirs(directory, exist_ok=True)
+    with gzip.open(os.path.join(directory, "records.jsonl.gz"), "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    manifest = {
+        "version": version,
+        "built_at": time.time(),
+        "topics": list(TOPICS),
+        "destinations": {r["key"]: {"name": r["destination"], "updated_at": r["updated_at"],
+                                    "snippets": sum(len(items) for items in r["facts"].values())} for r in records},
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    # Point readers at the new version only once it is complete
+    tmp_path = os.path.join(path, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(path, "CURRENT"))
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("destinations", help="text file with one destination per line")
+    parser.add_argument("--path", default=DEST_INDEX_PATH)
+    parser.add_argument("--max-results", type=int, default=5, help="search results kept per topic")
+    parser.add_argument("--refresh", action="store_true", help="search every destination again, even fresh ones")
+    args = parser.parse_args(argv)
+
+    from .ddg_search import ddg_search
+
+    current = DestinationIndex(args.path).load()
+    records = []
+    for i, (name, aliases) in enumerate(read_destinations(args.destinations), 1):
+        record = None if args.refresh else current.lookup(name)
+        if record is None:
+            try:
+                record = build_record(name, aliases, ddg_search.search_many, args.max_results)
+            except Exception as e:
+                record, error = None, e
+            else:
+                error = "no search results"
+            if record is None:
+                # Keep the previous record, stale or not, with its original timestamp
+                record = current.records.get(destination_key(name))
+                kept = f"; kept the record from {current.version}" if record is not None else ""
+                print(f"[{i}] {name}: failed ({error}){kept}", file=sys.stderr)
+                if record is None:
+                    continue
+            else:
+                print(f"[{i}] {name}: searched")
+        else:
+            print(f"[{i}] {name}: kept from {current.version}")
+        records.append(record)
+
+    version = time.strftime("v%Y%m%d-%H%M%S")
+    directory = write_version(args.path, records, version)
+    print(f"Wrote {len(records)} destinations to {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
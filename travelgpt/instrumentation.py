@@ -0,0 +1,216 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+
+class Span:
+    """One timed unit of work: a TravelAgent method, an LLM call or a tool call."""
+
+    def __init__(self, kind, name, **attributes):
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def as_dict(self):
+        return {"kind": self.kind, "name": self.name, "duration": self.duration,
+                "error": self.error, **self.attributes}
+
+
+class Trace:
+    """All spans recorded while serving one TravelAgent call."""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Splits the time of the call into LLM, tool and everything else."""
+        root = next((s for s in self.spans if s.kind == "method"), None)
+        llm = [s for s in self.spans if s.kind == "llm"]
+        tools = [s for s in self.spans if s.kind == "tool"]
+        total = root.duration if root and root.duration else 0.0
+        llm_time = sum(s.duration or 0 for s in llm)
+        tool_time = sum(s.duration or 0 for s in tools)
+        return {
+            "name": self.name,
+            "total_seconds": total,
+            "llm_seconds": llm_time,
+            "tool_seconds": tool_time,
+            # Tool calls of one turn overlap, so their summed time can exceed the wall time
+            "other_seconds": max(0.0, total - llm_time - tool_time),
+            "llm_calls": len(llm),
+            "tool_calls": len(tools),
+            "prompt_tokens": sum(s.attributes.get("prompt_tokens", 0) for s in llm),
+            "completion_tokens": sum(s.attributes.get("completion_tokens", 0) for s in llm),
+            "cached_prompt_tokens": sum(s.attributes.get("cached_prompt_tokens", 0) for s in llm),
+            "cache_hits": sum(1 for s in tools if s.attributes.get("cache_hit")),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide aggregates rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+        self.counters = {}
+
+    def _inc(self, metric, labels, value=1):
+        key = (metric, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def inc(self, metric, labels, value=1):
+        with self._lock:
+            self._inc(metric, labels, value)
+
+    def observe(self, span):
+        labels = (("kind", span.kind), ("name", span.name))
+        with self._lock:
+            histogram = self.durations.setdefault(labels, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += span.duration
+            histogram["count"] += 1
+            if span.error:
+                self._inc("travelgpt_span_errors_total", labels)
+            if span.kind == "llm":
+                self._inc("travelgpt_llm_prompt_tokens_total", labels, span.attributes.get("prompt_tokens", 0))
+                self._inc("travelgpt_llm_completion_tokens_total", labels, span.attributes.get("completion_tokens", 0))
+                self._inc("travelgpt_llm_cached_prompt_tokens_total", labels, span.attributes.get("cached_prompt_tokens", 0))
+            if span.kind == "tool":
+                self._inc("travelgpt_tool_calls_total", labels)
+                if span.attributes.get("cache_hit"):
+                    self._inc("travelgpt_tool_cache_hits_total", labels)
+
+    def render_prometheus(self):
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = [
+            "# HELP travelgpt_span_duration_seconds Duration of TravelAgent methods, LLM calls and tool calls.",
+            "# TYPE travelgpt_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for labels, histogram in sorted(self.durations.items()):
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    lines.append(f"travelgpt_span_duration_seconds_bucket{fmt(labels, [('le', bound)])} {count}")
+                lines.append(f"travelgpt_span_duration_seconds_bucket{fmt(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"travelgpt_span_duration_seconds_sum{fmt(labels)} {histogram['sum']:.6f}")
+                lines.append(f"travelgpt_span_duration_seconds_count{fmt(labels)} {histogram['count']}")
+            seen = set()
+            for (metric, labels), value in sorted(self.counters.items()):
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} counter")
+                    seen.add(metric)
+                lines.append(f"{metric}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+recent_traces = deque(maxlen=20)
+_current_trace = ContextVar("current_trace", default=None)
+_span_listener = ContextVar("span_listener", default=None)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def span(kind, name, **attributes):
+    """Times a block and records it on the current trace and in the metrics registry."""
+    current = Span(kind, name, **attributes)
+    listener = _span_listener.get()
+    if listener is not None:
+        listener("start", current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        current.finish()
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(current)
+        metrics.observe(current)
+        if listener is not None:
+            listener("end", current)
+
+
+@contextmanager
+def listen(callback):
+    """Calls `callback(event, span)` with event "start"/"end" for every span opened inside the block.
+
+    Like traces, listeners follow the context into tool threads started with copy_context.
+    """
+    token = _span_listener.set(callback)
+    try:
+        yield
+    finally:
+        _span_listener.reset(token)
+
+
+@contextmanager
+def trace(name):
+    """Collects every span recorded inside the block into one Trace."""
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        with span("method", name):
+            yield current
+    finally:
+        _current_trace.reset(token)
+        recent_traces.append(current)
+
+
+def traced(name=None):
+    """Decorator for TravelAgent methods: runs the call inside a trace."""
+
+    def decorator(func):
+        trace_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(trace_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics_panel():
+    """Streamlit panel with the breakdown of the most recent TravelAgent calls."""
+    import streamlit as st
+
+    with st.expander("📊 Performance", expanded=False):
+        if not recent_traces:
+            st.caption("No requests recorded yet.")
+            return
+        latest = recent_traces[-1]
+        summary = latest.summary()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total", f"{summary['total_seconds']:.1f}s")
+        col2.metric("LLM", f"{summary['llm_seconds']:.1f}s", f"{summary['llm_calls']} calls", delta_color="off")
+        col3.metric("Tools", f"{summary['tool_seconds']:.1f}s", f"{summary['cache_hits']} cache hits", delta_color="off")
+        st.caption(f"{latest.name}: {summary['prompt_tokens']} prompt / {summary['completion_tokens']} completion tokens")
+        st.dataframe([s.as_dict() for s in latest.spans], use_container_width=True)
+        st.dataframe([t.summary() for t in reversed(recent_traces)], use_container_width=True)
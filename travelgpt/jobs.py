@@ -0,0 +1,126 @@
+"""In-flight agent runs of the HTTP API, with cancellation and a cap on concurrent runs.
+
+Every request becomes a Job with its own CancelToken. A job can be cancelled by id
+(DELETE /jobs/{id}), by a newer request from the same client, or when its client
+disconnects. A cancelled job leaves the queue at once, or stops at its next LLM
+chunk, tool call or HTTP attempt if it is running. Its slot then goes to the next
+queued job. Jobs running at the same time never share a phi agent: each agent run
+checks out its own from TravelAgent's pool (see agent.py).
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+from .cancellation import Cancelled, CancelToken, cancel_scope
+from .instrumentation import metrics
+
+# Agent runs executing at the same time in one process; later requests wait for a slot
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "8"))
+
+
+class Job:
+    def __init__(self, kind, job_id=None, client_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.client_id = client_id
+        self.token = CancelToken()
+        self.status = "queued"
+        self.created_at = time.time()
+
+    def as_dict(self):
+        status = {"id": self.id, "kind": self.kind, "status": self.status, "age_seconds": round(time.time() - self.created_at, 3)}
+        if self.token.cancelled:
+            status["cancel_reason"] = self.token.reason
+        return status
+
+
+class JobRegistry:
+    def __init__(self, max_running=MAX_CONCURRENT_RUNS):
+        self.max_running = max_running
+        self.jobs = {}
+        self._by_client = {}
+        self._lock = threading.Lock()
+        self._slots = None
+
+    def create(self, kind, job_id=None, client_id=None):
+        """Registers a job; an earlier job of the same client is cancelled as superseded."""
+        job = Job(kind, job_id=job_id, client_id=client_id)
+        with self._lock:
+            previous = self._by_client.get(client_id) if client_id else None
+            if client_id:
+                self._by_client[client_id] = job
+            self.jobs[job.id] = job
+        if previous is not None:
+            previous.token.cancel("superseded")
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id, reason="cancelled"):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.token.cancel(reason)
+        return job
+
+    def _finish(self, job, status):
+        job.status = status
+        metrics.inc("travelgpt_jobs_total", (("kind", job.kind), ("status", status)))
+        with self._lock:
+            self.jobs.pop(job.id, None)
+            if self._by_client.get(job.client_id) is job:
+                del self._by_client[job.client_id]
+
+    def _slots_for_loop(self):
+        # asyncio primitives belong to the running loop, so create it there
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        return self._slots
+
+    async def run(self, job, func, *args, **kwargs):
+        """Runs the blocking `func` on a worker thread once a slot is free, under the job's token.
+
+        Raises Cancelled as soon as the job is cancelled, whether it is still queued or running.
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._slots_for_loop()
+        cancelled = loop.create_future()
+        job.token.on_cancel(lambda: loop.call_soon_threadsafe(lambda: cancelled.done() or cancelled.set_result(None)))
+        status = "failed"
+        try:
+            acquire = asyncio.ensure_future(slots.acquire())
+            await asyncio.wait({acquire, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            if not acquire.done():
+                acquire.cancel()
+                raise Cancelled(job.token.reason)
+            if job.token.cancelled:
+                slots.release()
+                raise Cancelled(job.token.reason)
+
+            job.status = "running"
+            with cancel_scope(job.token):
+                work = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+
+            def release(task):
+                # The slot is only freed once the worker thread has actually stopped
+                slots.release()
+                if not task.cancelled():
+                    task.exception()
+
+            work.add_done_callback(release)
+            await asyncio.wait({work, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            if not work.done():
+                raise Cancelled(job.token.reason)
+            result = work.result()
+            status = "done"
+            return result
+        except Cancelled:
+            status = "cancelled"
+            raise
+        finally:
+            self._finish(job, status)
+
+
+jobs = JobRegistry()
@@ -0,0 +1,110 @@
+"""Structural diffs between two versions of a plan, and compact patches built from them.
+
+Plans are compared section by section (the sections of `split_plan`: overview,
+top-level headings, days), then line by line inside the sections that changed. A patch
+references unchanged sections of the base plan by index and carries only the changed
+lines, so a client holding the base plan can rebuild the new one exactly:
+
+    {"base": "<plan_version of the old plan>", "version": "<plan_version of the new one>",
+     "sections": [{"title": "Overview", "same": 0},
+                  {"title": "Day 2", "from": 2, "hunks": [[4, 1, ["- 2:00 PM–4:00 PM: ..."]]]},
+                  {"title": "Weather Adjustment Summary", "lines": ["## Weather ...", ...]}]}
+
+A hunk [at, deleted, lines] replaces `deleted` lines starting at line `at` of the base
+section with `lines`; hunks are listed in order and refer to base-section line numbers.
+"""
+import difflib
+import functools
+import json
+
+from .plan_sections import plan_version, section_starts
+
+
+class PatchMismatch(ValueError):
+    """Raised when a patch is applied to a plan other than its base."""
+
+
+def sections(plan):
+    """Splits a plan into [(title, [lines])] at the same places as `split_plan`, losing nothing.
+
+    Joining every section's lines with newlines gives back the plan exactly.
+    """
+    lines = (plan or "").split("\n")
+    bounds = [(0, "Overview")] + section_starts(lines)
+    result = [(title, lines[start:end]) for (start, title), (end, _) in zip(bounds, bounds[1:] + [(len(lines), None)])]
+    if not result[0][1] and len(result) > 1:
+        result.pop(0)
+    return result
+
+
+def diff_plans(old, new):
+    """Returns the patch that turns plan `old` into plan `new`."""
+    old_sections, new_sections = sections(old), sections(new)
+    by_text = {}
+    by_title = {}
+    for index, (title, lines) in enumerate(old_sections):
+        by_text.setdefault("\n".join(lines), index)
+        by_title.setdefault(title, []).append(index)
+
+    used = set()
+    ops = []
+    for title, lines in new_sections:
+        text = "\n".join(lines)
+        same = by_text.get(text)
+        if same is not None and same not in used:
+            used.add(same)
+            ops.append({"title": title, "same": same})
+            continue
+        base = next((i for i in by_title.get(title, ()) if i not in used), None)
+        if base is None:
+            ops.append({"title": title, "lines": lines})
+            continue
+        used.add(base)
+        matcher = difflib.SequenceMatcher(None, old_sections[base][1], lines, autojunk=False)
+        hunks = [[i1, i2 - i1, lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+        ops.append({"title": title, "from": base, "hunks": hunks})
+    return {"base": plan_version(old), "version": plan_version(new), "sections": ops}
+
+
+def apply_patch(old, patch):
+    """Rebuilds the new plan from its base plan `old` and `patch`."""
+    if plan_version(old) != patch["base"]:
+        raise PatchMismatch(f"Patch is for plan {patch['base']}, not {plan_version(old)}")
+    old_sections = sections(old)
+    lines = []
+    for op in patch["sections"]:
+        if "same" in op:
+            lines.extend(old_sections[op["same"]][1])
+        elif "from" in op:
+            section = list(old_sections[op["from"]][1])
+            for at, deleted, inserted in reversed(op["hunks"]):
+                section[at:at + deleted] = inserted
+            lines.extend(section)
+        else:
+            lines.extend(op["lines"])
+    plan = "\n".join(lines)
+    if plan_version(plan) != patch["version"]:
+        raise PatchMismatch(f"Patched plan is {plan_version(plan)}, expected {patch['version']}")
+    return plan
+
+
+def patch_size(patch):
+    return len(json.dumps(patch, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+@functools.lru_cache(maxsize=32)
+def plan_changes(old, new):
+    """((title, markdown, diff), ...) for every section of `new` that is not in `old` unchanged.
+
+    `diff` is a unified diff of the section's lines. Cached by plan text, so reruns of an
+    unchanged comparison cost a dictionary lookup.
+    """
+    old_sections, new_sections = sections(old), sections(new)
+    changes = []
+    for op, (title, lines) in zip(diff_plans(old, new)["sections"], new_sections):
+        if "same" in op:
+            continue
+        before = old_sections[op["from"]][1] if "from" in op else []
+        diff = "\n".join(difflib.unified_diff(before, lines, lineterm="", n=1))
+        changes.append((title, "\n".join(lines).strip(), diff))
+    return tuple(changes)
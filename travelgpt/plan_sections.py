@@ -0,0 +1,62 @@
+"""Splits a markdown travel plan into sections so the apps can draw one at a time."""
+import functools
+import hashlib
+import re
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+DAY_MARKER = re.compile(r"^(?:#{1,6}\s+|\*\*|__)?\s*(?:[^\w\s]\s*)*day\s*\d+\b", re.IGNORECASE)
+
+
+def plan_version(plan):
+    """Short content hash identifying one version of a plan."""
+    return hashlib.sha1((plan or "").encode()).hexdigest()[:12]
+
+
+def _title(line, max_length=40):
+    match = HEADING.match(line)
+    text = re.sub(r"\*\*|__", "", match.group(2) if match else line).strip().rstrip(":").strip()
+    if len(text) > max_length:
+        text = text[:max_length - 1].rstrip() + "…"
+    return text or "Section"
+
+
+def _add(sections, title, body):
+    # A heading directly followed by the next section (e.g. "Itinerary" above "Day 1") has nothing to show
+    if body and "".join(body[1:] if HEADING.match(body[0]) else body).strip():
+        sections.append((title, "\n".join(body).strip()))
+
+
+def section_starts(lines):
+    """[(index, title)] of the lines starting a section: top-level headings and day markers.
+
+    Lines inside ``` fences never start a section.
+    """
+    levels = [len(m.group(1)) for m in map(HEADING.match, lines) if m]
+    top_level = min(levels) if levels else None
+
+    starts, in_fence = [], False
+    for index, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        heading = None if in_fence else HEADING.match(line)
+        if not in_fence and (
+            DAY_MARKER.match(line.strip()) is not None or (heading is not None and len(heading.group(1)) <= top_level)
+        ):
+            starts.append((index, _title(line)))
+    return starts
+
+
+@functools.lru_cache(maxsize=64)
+def split_plan(plan):
+    """Returns ((title, markdown), ...): one section per top-level heading, and one per day.
+
+    Day sections start at a heading or bold line such as "### Day 2" or "**Day 2:**" and
+    keep their sub-headings. Text before the first heading becomes "Overview". Results
+    are cached by plan text, so a rerun of an unchanged plan costs a dictionary lookup.
+    """
+    lines = (plan or "").splitlines()
+    bounds = [(0, "Overview")] + section_starts(lines)
+    sections = []
+    for (start, title), (end, _) in zip(bounds, bounds[1:] + [(len(lines), None)]):
+        _add(sections, title, lines[start:end])
+    return tuple(sections)
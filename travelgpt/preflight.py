@@ -0,0 +1,265 @@
+"""Pre-flight validation and normalization of trip requests, before any tokens are spent.
+
+`normalize_trip` checks and canonicalises what a plan request is made of:
+
+- dates: ISO strings or dates, an end date or a duration (inclusive of the start
+  date), no trips in the past, longer than MAX_TRIP_DAYS or further out than
+  MAX_LEAD_DAYS;
+- places: trimmed, and matched against the local gazetteer, so "nyc", "New York" and
+  "New York City" become one destination. Only exact matches of gazetteer cities are
+  rewritten; a region or a near miss ("Barcelone") is offered in `suggestions` and the
+  user's text is kept, and unknown places pass through unverified;
+- travel styles and budget: mapped onto the apps' vocabulary ("foodie" -> Food,
+  "mid-range" -> Moderate), de-duplicated and put in a fixed order.
+
+Problems are collected and raised together as InvalidTrip. The Trip that comes back
+renders the same prompt for every spelling of the same request, so the plan cache, the
+speculative runs and batch grouping all key on it.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+
+from .destination_index import destination_key
+from .gazetteer import gazetteer
+from .instrumentation import metrics
+
+MAX_TRIP_DAYS = int(os.getenv("MAX_TRIP_DAYS", "30"))
+# How far ahead a trip may start
+MAX_LEAD_DAYS = int(os.getenv("MAX_LEAD_DAYS", "730"))
+MAX_PLACE_LENGTH = 100
+
+TRAVEL_STYLES = ("Culture", "Nature", "Adventure", "Relaxation", "Food", "Shopping", "Entertainment",
+                 "Scientific Events to Visit", "Tech Events to Visit")
+BUDGET_TIERS = ("Budget", "Moderate", "Luxury")
+
+STYLE_SYNONYMS = {
+    "cultural": "Culture", "history": "Culture", "historical": "Culture", "museums": "Culture", "art": "Culture",
+    "outdoors": "Nature", "hiking": "Nature", "wildlife": "Nature", "nature and outdoors": "Nature",
+    "adventurous": "Adventure", "sports": "Adventure", "extreme sports": "Adventure",
+    "relax": "Relaxation", "relaxing": "Relaxation", "beach": "Relaxation", "wellness": "Relaxation", "spa": "Relaxation",
+    "foodie": "Food", "culinary": "Food", "cuisine": "Food", "food and drink": "Food", "gastronomy": "Food",
+    "shop": "Shopping", "markets": "Shopping",
+    "nightlife": "Entertainment", "music": "Entertainment", "shows": "Entertainment", "festivals": "Entertainment",
+    "science": "Scientific Events to Visit", "scientific": "Scientific Events to Visit",
+    "scientific events": "Scientific Events to Visit",
+    "tech": "Tech Events to Visit", "technology": "Tech Events to Visit", "tech events": "Tech Events to Visit",
+}
+BUDGET_SYNONYMS = {
+    "$": "Budget", "low": "Budget", "cheap": "Budget", "economy": "Budget", "backpacker": "Budget",
+    "$$": "Moderate", "mid": "Moderate", "mid-range": "Moderate", "midrange": "Moderate", "medium": "Moderate",
+    "standard": "Moderate", "comfort": "Moderate",
+    "$$$": "Luxury", "high": "Luxury", "premium": "Luxury", "luxurious": "Luxury", "high-end": "Luxury",
+}
+
+CONTROL = re.compile(r"[\x00-\x1f\x7f]+")
+
+
+class InvalidTrip(ValueError):
+    """A trip request that cannot be planned; `errors` is [{"field", "message"}]."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{e['field']}: {e['message']}" for e in errors))
+        self.errors = errors
+
+
+class Trip:
+    """A validated, canonical trip request.
+
+    `fixes` lists what was corrected on the way, `suggestions` what may have been meant
+    but was left as given.
+    """
+
+    def __init__(self, destination, present_location, start_date, end_date, budget, travel_style,
+                 place=None, origin=None, fixes=(), suggestions=()):
+        self.destination = destination
+        self.present_location = present_location
+        self.start_date = start_date
+        self.end_date = end_date
+        self.budget = budget
+        self.travel_style = travel_style
+        self.place = place
+        self.origin = origin
+        self.fixes = list(fixes)
+        self.suggestions = list(suggestions)
+
+    @property
+    def duration(self):
+        return (self.end_date - self.start_date).days + 1
+
+    def args(self):
+        """Arguments of TravelAgent.generate_travel_plan and stream_travel_plan."""
+        return (self.destination, self.present_location, self.start_date, self.end_date, self.budget,
+                list(self.travel_style))
+
+    @property
+    def shared_key(self):
+        """What travellers must agree on to share their destination research (see batch.py)."""
+        return (self.destination, self.start_date, self.end_date, self.budget, self.travel_style)
+
+    @property
+    def key(self):
+        """Stable hash of the whole request, equal for every spelling of the same trip."""
+        canonical = json.dumps([self.destination, self.present_location, self.start_date.isoformat(),
+                                self.end_date.isoformat(), self.budget, self.travel_style])
+        return hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+    def as_dict(self):
+        trip = {"destination": self.destination, "present_location": self.present_location,
+                "start_date": self.start_date.isoformat(), "end_date": self.end_date.isoformat(),
+                "duration": self.duration, "budget": self.budget, "travel_styles": list(self.travel_style),
+                "key": self.key}
+        if self.place is not None:
+            trip["place"] = self.place.as_dict()
+        if self.fixes:
+            trip["fixes"] = self.fixes
+        if self.suggestions:
+            trip["suggestions"] = self.suggestions
+        return trip
+
+
+def _date(value, field, errors):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        errors.append({"field": field, "message": f"expected a YYYY-MM-DD date, got {value!r}"})
+        return None
+
+
+def _dates(start_date, end_date, duration, today, errors):
+    start = _date(start_date, "start_date", errors) if start_date not in (None, "") else None
+    if start is None:
+        if start_date in (None, ""):
+            errors.append({"field": "start_date", "message": "is required"})
+        return None, None
+
+    end = None
+    if duration not in (None, ""):
+        try:
+            days = float(duration)
+            if days != int(days):
+                raise ValueError
+            days = int(days)
+        except (TypeError, ValueError):
+            errors.append({"field": "duration", "message": f"expected a whole number of days, got {duration!r}"})
+            return start, None
+        if not 1 <= days <= MAX_TRIP_DAYS:
+            errors.append({"field": "duration", "message": f"must be between 1 and {MAX_TRIP_DAYS} days"})
+            return start, None
+        end = start + timedelta(days=days - 1)
+    if end_date not in (None, ""):
+        given = _date(end_date, "end_date", errors)
+        if given is not None and end is not None and given != end:
+            errors.append({"field": "end_date", "message": f"does not match a duration of {duration} days"})
+        end = given if end is None else end
+    if end is None:
+        if end_date in (None, "") and duration in (None, ""):
+            errors.append({"field": "end_date", "message": "an end date or a duration is required"})
+        return start, None
+
+    if end < start:
+        errors.append({"field": "end_date", "message": "is before start_date"})
+    elif (end - start).days + 1 > MAX_TRIP_DAYS:
+        errors.append({"field": "end_date", "message": f"trips are limited to {MAX_TRIP_DAYS} days"})
+    if start < today:
+        errors.append({"field": "start_date", "message": "is in the past"})
+    elif (start - today).days > MAX_LEAD_DAYS:
+        errors.append({"field": "start_date", "message": f"is more than {MAX_LEAD_DAYS} days ahead"})
+    return start, end
+
+
+def _place(value, field, required, errors, fixes, suggestions):
+    """(canonical name, Place or None) for a place field."""
+    text = " ".join(CONTROL.sub(" ", str(value or "")).split())
+    if not text:
+        if required:
+            errors.append({"field": field, "message": "is required"})
+        return "", None
+    if len(text) > MAX_PLACE_LENGTH or not any(c.isalpha() for c in text) or "://" in text:
+        errors.append({"field": field, "message": f"{text[:40]!r} is not a place name"})
+        return text, None
+    place, how = gazetteer.resolve(text)
+    if place is None:
+        return text, None
+    if how == "exact" and place.kind == "city":
+        if destination_key(text) != destination_key(place.name):
+            fixes.append(f"{field}: {text!r} -> {place.name!r}")
+        return place.name, place
+    if how == "exact" and place.kind == "country":
+        return text, place
+    # A region or a near miss is as likely another place as the one meant: suggest, don't rewrite
+    suggestions.append(f"{field}: {text!r} kept as given; closest known place is the {place.kind} "
+                       f"{place.name!r} ({place.country})")
+    return text, None
+
+
+def _choice(value, vocabulary, synonyms):
+    key = " ".join(str(value).split()).casefold()
+    for option in vocabulary:
+        if key == option.casefold():
+            return option
+    if key in synonyms:
+        return synonyms[key]
+    close = difflib.get_close_matches(key, [o.casefold() for o in vocabulary] + list(synonyms), n=1, cutoff=0.8)
+    if close:
+        return next((o for o in vocabulary if o.casefold() == close[0]), None) or synonyms[close[0]]
+    return None
+
+
+def _styles(value, errors, fixes):
+    if isinstance(value, str):
+        value = value.split(",")
+    styles = set()
+    for raw in value or ():
+        if not str(raw).strip():
+            continue
+        if str(raw).strip().casefold() == "all":
+            styles.update(TRAVEL_STYLES)
+            continue
+        style = _choice(raw, TRAVEL_STYLES, STYLE_SYNONYMS)
+        if style is None:
+            errors.append({"field": "travel_styles",
+                           "message": f"unknown style {str(raw).strip()!r}; use any of {', '.join(TRAVEL_STYLES)}"})
+        else:
+            if style.casefold() != str(raw).strip().casefold():
+                fixes.append(f"travel_styles: {str(raw).strip()!r} -> {style!r}")
+            styles.add(style)
+    return tuple(s for s in TRAVEL_STYLES if s in styles)
+
+
+def _budget(value, errors, fixes):
+    if value in (None, ""):
+        errors.append({"field": "budget", "message": "is required"})
+        return None
+    budget = _choice(value, BUDGET_TIERS, BUDGET_SYNONYMS)
+    if budget is None:
+        errors.append({"field": "budget", "message": f"unknown budget {value!r}; use one of {', '.join(BUDGET_TIERS)}"})
+    elif budget.casefold() != str(value).strip().casefold():
+        fixes.append(f"budget: {str(value).strip()!r} -> {budget!r}")
+    return budget
+
+
+def normalize_trip(destination, present_location, start_date, end_date=None, budget=None, travel_style=(),
+                   duration=None, today=None):
+    """The canonical Trip for a plan request, or InvalidTrip listing everything wrong with it.
+
+    Give either `end_date` or `duration` (in days, counting the start date); both must agree.
+    """
+    errors, fixes, suggestions = [], [], []
+    start, end = _dates(start_date, end_date, duration, today or date.today(), errors)
+    destination, place = _place(destination, "destination", True, errors, fixes, suggestions)
+    present_location, origin = _place(present_location, "present_location", False, errors, fixes, suggestions)
+    styles = _styles(travel_style, errors, fixes)
+    budget = _budget(budget, errors, fixes)
+    if errors:
+        metrics.inc("travelgpt_preflight_total", (("outcome", "rejected"),))
+        raise InvalidTrip(errors)
+    metrics.inc("travelgpt_preflight_total", (("outcome", "fixed" if fixes else "ok"),))
+    return Trip(destination, present_location, start, end, budget, styles, place, origin, fixes, suggestions)
@@ -0,0 +1,286 @@
+"""Prompt building for the TravelAgent.
+
+Every prompt is split into a static part, identical for all users, and a dynamic part that
+holds the user's fields. The static part always comes first so that the system prompt plus
+the start of the user message form a stable prefix the provider can cache. Templates are
+parsed once at import time. How much of each prompt the provider actually served from its
+cache is recorded on the LLM spans (travelgpt_llm_cached_prompt_tokens_total).
+"""
+from string import Formatter
+
+TRAVEL_AGENT_INSTRUCTIONS = [
+    "You are a comprehensive travel planning assistant with expertise in all aspects of travel.",
+    "For every recommendation and data point, you MUST provide working source links.",
+    "Your knowledge spans across:",
+    "- Seasonal travel timing and weather patterns",
+    "- Transportation options and booking",
+    "- Accommodation recommendations",
+    "- Day-by-day itinerary planning",
+    "- Local cuisine and restaurant recommendations",
+    "- Practical travel tips and cultural advice",
+    "- Budget estimation and cost breakdown",
+    "Call destination_facts first for attractions, neighbourhoods, costs, transport and food; search the web only for what it does not cover.",
+    "Format all responses in markdown with clear headings (##) and bullet points.",
+    "Use [text](url) format for all hyperlinks.",
+    "Provide verified links, maps, images for each reccomdation",
+    "Verify all links are functional before including them.",
+    "Organize information clearly with appropriate sections based on the query type.",
+]
+
+
+class PromptTemplate:
+    """A static block followed by a dynamic block with `{field}` placeholders, compiled once."""
+
+    def __init__(self, name, static, dynamic):
+        self.name = name
+        self.static = static.strip("\n")
+        if "{" in self.static:
+            raise ValueError(f"Static part of prompt {name!r} must not contain user fields")
+        self._chunks = [
+            (literal, field, spec)
+            for literal, field, spec, _ in Formatter().parse(dynamic.strip("\n"))
+        ]
+        self.fields = {field for _, field, _ in self._chunks if field}
+
+    def render(self, **values):
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name!r} is missing fields: {', '.join(sorted(missing))}")
+        parts = [self.static, "\n\n"]
+        for literal, field, spec in self._chunks:
+            parts.append(literal)
+            if field:
+                parts.append(format(values[field], spec or ""))
+        return "".join(parts)
+
+
+# GENERATE_PLAN is put together from these parts; the batch prompts below reuse them so
+# every plan of a batch asks for the same sections as a single plan
+_PLAN_DESTINATION_SECTIONS = """🌞 Best Time to Visit:
+ -Highlight seasonal considerations for visiting the destination.
+ -Day-by-day weather forecast for every day of the trip.
+ -Alternative date suggestions if weather is unfavorable. Include source links for all weather data.
+ -Offer clothing recommendations for each day based on weather forecasts of that particular day, be accurate. For example:
+    -Warm jackets and boots for cold, snowy days.
+    -Light, breathable clothing for warm, sunny days.
+    -Raincoats and umbrellas for rainy conditions.
+
+🏨 Accommodation Recommendations:
+ -Suggest accommodations within the traveler's budget level.
+ -Include pros and cons, prices, amenities, and booking links.
+ -Indicate the distance and travel time to major attractions, taken from the distances_from tool rather than estimated. Include map links where possible.
+ -Format your response using markdown with clear headings (##) and bullet points. Use [text](url) format for hyperlinks. Verify all links are functional before including them.
+
+🗺️ Day-by-Day Itinerary:
+ -Create a detailed itinerary for each day, broken into specific time slots (e.g., "9:00 AM–12:00 PM: Visit [Attraction]").
+ -Incorporate activities, attractions, and cultural experiences that align with the specified travel styles.
+ -Include booking links, costs, and recommendations for optimizing time and enjoyment.
+ -Order each day's stops with the route_day tool and quote the distances, travel times and map link it returns instead of estimating them.
+ -Include sites only if the sites exist.
+
+🍽️ Culinary Highlights:
+ -Recommend local cuisines, restaurants, and food experiences.
+ -Provide suggestions based on the travel styles (e.g., street food, fine dining, or unique culinary tours).
+ -Include price ranges, opening hours, and reservation links, where available.
+
+💡 Practical Travel Tips:
+ -List local and intercity transportation options (e.g., public transit, car rentals, taxis).
+ -Provide advice on cultural etiquette, local customs, and safety tips.
+ -Include a suggested daily budget breakdown for meals, transport, and activities.
+
+💰 Estimated Total Trip Cost:
+ -Provide an itemized expense breakdown by category according to the budget level:
+ -Accommodation, transportation, meals, activities, and miscellaneous expenses.
+ -Offer budget-saving tips specific to the budget level.
+
+"""
+
+_PLAN_TRANSPORT_SECTION = """🚂 Transportation Details:
+ -Recommend transportation options from the traveler's present location to the destination.
+ -Include schedules, pricing, duration, and booking links for trains, buses, or flights.
+
+"""
+
+_PLAN_OUTPUT_REQUIREMENTS = """Output Requirements:
+ -Use clear, easy-to-read markdown with headings and bullet points for each section.
+ -Provide source links, booking references, and maps wherever applicable.
+ -Ensure all details are actionable and well-organized to facilitate ease of planning.
+ -Verify all links are functional before including them."""
+
+GENERATE_PLAN = PromptTemplate(
+    "generate_travel_plan",
+    static="""Act as a Personalized Travel Expert
+You are a travel expert specializing in creating tailored, detailed travel plans. Design a comprehensive itinerary for the trip described in the Trip Details at the end of this message.
+
+Your Task:
+Provide a structured markdown response that includes the following elements:
+
+""" + _PLAN_DESTINATION_SECTIONS + _PLAN_TRANSPORT_SECTION + _PLAN_OUTPUT_REQUIREMENTS,
+    dynamic="""Trip Details:
+Destination: {destination}
+Present Location: {present_location}
+Start Date: {start_date}
+End Date: {end_date}
+Duration: {duration} days
+Budget Level: {budget}
+Travel Styles: {travel_styles}""",
+)
+
+# Batches: one plan of the destination for everyone travelling together (SHARED_PLAN),
+# plus the journey there for each departure city (TRANSPORT_PLAN)
+SHARED_PLAN = PromptTemplate(
+    "generate_shared_plan",
+    static="""Act as a Personalized Travel Expert
+You are a travel expert specializing in creating tailored, detailed travel plans. Design a comprehensive itinerary for the group trip described in the Trip Details at the end of this message.
+The travellers set out from different places; their journeys to the destination are planned separately, so leave out transport to and from the destination.
+
+Your Task:
+Provide a structured markdown response that includes the following elements:
+
+""" + _PLAN_DESTINATION_SECTIONS + _PLAN_OUTPUT_REQUIREMENTS,
+    dynamic="""Trip Details:
+Destination: {destination}
+Start Date: {start_date}
+End Date: {end_date}
+Duration: {duration} days
+Budget Level: {budget}
+Travel Styles: {travel_styles}
+Group Size: {travellers} travellers""",
+)
+
+TRANSPORT_PLAN = PromptTemplate(
+    "plan_transport",
+    static="""Plan a traveller's journey to and from the destination of the trip described at the end of this message. The rest of the trip is already planned.
+
+Provide a structured markdown response under a "## 🚂 Transportation Details" heading that covers:
+
+""" + _PLAN_TRANSPORT_SECTION.rstrip("\n") + """
+ -Cover the return journey at the end of the trip as well.
+
+""" + _PLAN_OUTPUT_REQUIREMENTS,
+    dynamic="""Trip Details:
+Destination: {destination}
+Present Location: {present_location}
+Start Date: {start_date}
+End Date: {end_date}
+Budget Level: {budget}""",
+)
+
+ANSWER_QUESTION = PromptTemplate(
+    "answer_question",
+    static="""Answer a question about the travel plan given below.
+
+Guidelines for your response:
+1. Focus specifically on answering the question asked
+2. Reference relevant parts of the travel plan when applicable
+3. Provide new information if the travel plan doesn't cover the topic
+4. Include verified source links for any new information
+5. Keep the response concise but comprehensive
+6. Use markdown formatting for clarity
+
+Format your response with appropriate headings and verify all included links.""",
+    dynamic="""Travel plan for {destination}:
+
+{travel_plan}
+
+Question: {question}""",
+)
+
+UPDATE_PLAN = PromptTemplate(
+    "update_travel_plan",
+    static="""Update the day-to-day travel itinerary given below for a traveler who wants to stay longer at their current location.
+
+Instructions:
+Adjust Itinerary: Modify the time and schedule of activities in the Day-to-Day Itinerary starting from the current location to accommodate the extended stay.
+Do not alter sections such as "Best Time to Visit," "Accommodation Recommendations," "Culinary Highlights," or "Practical Travel Tips."
+Ensure that no extraneous sections of the itinerary are changed.
+Rearrange or Remove Activities: If necessary, suggest alternatives for activities that need to be omitted or rescheduled.
+
+Financial Impact:
+Calculate and summarize the financial impact of these adjustments, including the total cost change (increase or decrease).
+Provide a concise explanation of how the costs were recalculated.
+
+Output Format:
+Provide the updated Day-to-Day Itinerary in Markdown format.
+Include a summary section at the end detailing:
+Adjusted total cost and its breakdown.
+Brief reasoning behind the cost adjustments.""",
+    dynamic="""Travel Plan:
+{travel_plan}
+
+Current Situation:
+The user is presently at {present_location}.
+They wish to extend their stay at this location by {extra_time} hours.""",
+)
+
+REPLACE_DROPPED = PromptTemplate(
+    "replace_dropped_activities",
+    static="""A traveler extended their stay at one stop of their itinerary. The rest of the itinerary has already been rescheduled; the activities listed as dropped no longer fit.
+
+Instructions:
+1. For each dropped activity, suggest one nearby alternative that fits one of the free time slots, or say that it is best skipped
+2. Include opening hours, prices and verified source links for every suggestion
+3. Summarize the cost change of the dropped activities and their replacements
+4. Do not repeat or rewrite the itinerary
+
+Format the response in markdown under a "## Suggested Replacements" heading.""",
+    dynamic="""The traveler is at {present_location} and stays {extra_time} hours longer.
+
+{outline}""",
+)
+
+UPDATE_PLAN_FOR_WEATHER = PromptTemplate(
+    "update_plan_for_weather",
+    static="""Update the travel plan given below based on the current weather conditions.
+
+Instructions:
+1. Only modify the Day-to-Day Itinerary section that comes after activities in the given location
+2. Suggest indoor alternatives for outdoor activities if:
+   - Temperature is above 20°C
+   - Weather shows moderate or heavy rain
+3. Keep all other sections unchanged (Best Time to Visit, Accommodation, etc.)
+4. Calculate any financial impacts from the changes
+5. Add a "Weather Adjustment Summary" section at the end showing:
+   - Changed activities
+   - Cost differences
+   - Recommendations for dealing with the weather
+
+Maintain the original format and keep all other sections exactly as they are.""",
+    dynamic="""Original Travel Plan:
+{travel_plan}
+
+Current Weather at {location}:
+Temperature: {temperature}°C
+Condition: {condition}""",
+)
+
+MODIFY_PLAN = PromptTemplate(
+    "modify_plan",
+    static="""Modify the travel plan given below based on the specified changes.
+
+Guidelines:
+1. Integrate changes seamlessly into the existing plan.
+2. Maintain the original structure and formatting.
+3. Provide source links for any new information added.
+4. Ensure all details are accurate and up-to-date.
+
+Return the updated travel plan in markdown format.""",
+    dynamic="""Original Travel Plan:
+{travel_plan}
+
+Modifications:
+{modifications}""",
+)
+
+
+def trip_fields(destination, present_location, start_date, end_date, budget, travel_styles):
+    """Dynamic fields for GENERATE_PLAN, with the duration derived from the dates."""
+    return {
+        "destination": destination,
+        "present_location": present_location,
+        "start_date": start_date,
+        "end_date": end_date,
+        "duration": (end_date - start_date).days + 1,
+        "budget": budget,
+        "travel_styles": ", ".join(travel_styles),
+    }
@@ -0,0 +1,384 @@
+"""Deterministic packing of itinerary activities into daily time windows.
+
+The day-by-day itinerary of a plan is parsed into activities (the time slots such as
+"9:00 AM–12:00 PM: Visit the Louvre", with the lines indented below them). When the
+traveler extends a stay, everything after the current activity is re-packed here in a
+few milliseconds; the LLM is then only asked about the activities that no longer fit.
+"""
+import os
+import re
+
+from .plan_sections import DAY_MARKER, HEADING
+
+# Latest time an activity may end when the itinerary is re-packed ("HH:MM", 24h)
+SCHEDULE_DAY_END = os.getenv("SCHEDULE_DAY_END", "22:00")
+# Fallback travel time between two activities that were not adjacent in the original plan
+SCHEDULE_TRAVEL_MINUTES = int(os.getenv("SCHEDULE_TRAVEL_MINUTES", "20"))
+
+TIME = r"\d{1,2}(?::\d{2})?(?:\s*[AaPp]\.?\s?[Mm]\.?)?"
+SLOT = re.compile(
+    rf"^(?P<prefix>\s*(?:[-*+]|\d+\.)?\s*(?:\*\*|__)?\s*)(?P<start>{TIME})\s*(?P<dash>–|—|-|to)\s*(?P<end>{TIME})(?P<rest>.*)$"
+)
+LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"the", "a", "an", "at", "in", "of", "to", "and", "visit", "explore", "tour", "de", "la", "le"}
+
+# Meals keep to meal times and to their day when they are moved; open/close in minutes after midnight
+MEAL_WINDOWS = {
+    "breakfast": (7 * 60, 10 * 60 + 30),
+    "brunch": (9 * 60 + 30, 14 * 60),
+    "lunch": (11 * 60 + 30, 15 * 60),
+    "dinner": (17 * 60 + 30, 23 * 60),
+}
+LOW_PRIORITY = ("optional", "free time", "leisure", "shopping", "rest at")
+
+
+def parse_clock(text, meridiem=None):
+    """Minutes after midnight for "9", "9:30", "9:30 AM" or "21:30"; returns (minutes, meridiem)."""
+    match = re.match(r"(\d{1,2})(?::(\d{2}))?\s*([AaPp])?", text.strip())
+    hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or meridiem or "").lower() or None
+    if meridiem == "p" and hours < 12:
+        hours += 12
+    elif meridiem == "a" and hours == 12:
+        hours = 0
+    return hours * 60 + minutes, meridiem
+
+
+def format_clock(minutes, twelve_hour=True):
+    hours, minutes = divmod(int(minutes), 60)
+    if not twelve_hour:
+        return f"{hours:02d}:{minutes:02d}"
+    return f"{(hours % 12) or 12}:{minutes:02d} {'AM' if hours < 12 or hours == 24 else 'PM'}"
+
+
+def _words(text):
+    return {w for w in WORD.findall(text.lower()) if w not in STOPWORDS}
+
+
+class Activity:
+    """Something to fit into a day: a duration, an optional opening window and a priority.
+
+    `day` is the earliest day it may be scheduled on and `until_day` the last; on its own
+    day it never starts before its original `start`. `lead_time` is the travel or buffer
+    time it needs after the activity that preceded it (`after`) in the original plan, and
+    `line` the number of its slot line there.
+    """
+
+    def __init__(self, name, duration, opens=None, closes=None, priority=1.0, day=None, until_day=None,
+                 start=None, lead_time=0, after=None, lines=None, twelve_hour=True, line=None):
+        self.name = name
+        self.duration = duration
+        self.opens = opens
+        self.closes = closes
+        self.priority = priority
+        self.day = day
+        self.until_day = until_day
+        self.start = start
+        self.lead_time = lead_time
+        self.after = after
+        self.lines = lines or []
+        self.twelve_hour = twelve_hour
+        self.line = line
+
+    def as_dict(self):
+        return {"name": self.name, "day": self.day, "start": self.start, "duration": self.duration, "priority": self.priority}
+
+
+class Slot:
+    def __init__(self, day, start, activity, end=None):
+        self.day = day
+        self.start = start
+        self.activity = activity
+        self.end = start + activity.duration if end is None else end
+
+    def as_dict(self):
+        return {"day": self.day, "start": format_clock(self.start), "end": format_clock(self.end), "activity": self.activity.name}
+
+
+def default_travel(previous, activity):
+    """Keeps the gap of the original plan between activities that stay adjacent."""
+    return activity.lead_time if activity.after is previous else SCHEDULE_TRAVEL_MINUTES
+
+
+def _pack(activities, days, windows, travel, follows):
+    remaining = list(activities)
+    slots = []
+    for day in days:
+        now, day_end = windows[day]
+        previous = follows.get(day)
+        while True:
+            best = None
+            for index, activity in enumerate(remaining):
+                if (activity.day is not None and activity.day > day) or (activity.until_day is not None and activity.until_day < day):
+                    continue
+                earliest = activity.opens or 0
+                if activity.day == day and activity.start is not None:
+                    earliest = max(earliest, activity.start)
+                begin = max(now + (travel(previous, activity) if previous is not None else 0), earliest)
+                latest = min(day_end, activity.closes) if activity.closes is not None else day_end
+                if begin + activity.duration > latest:
+                    continue
+                # Earliest available first; ties keep priority, then the original order
+                key = (max(now, earliest), -activity.priority, index)
+                if best is None or key < best[0]:
+                    best = (key, index, begin)
+            if best is None:
+                break
+            _, index, begin = best
+            activity = remaining.pop(index)
+            slots.append(Slot(day, begin, activity))
+            now, previous = begin + activity.duration, activity
+    return slots, remaining
+
+
+def schedule(activities, days, windows, travel=default_travel, follows=None):
+    """Packs `activities` (in preference order) into the (start, end) `windows` of `days`.
+
+    Returns (slots, dropped). Activities only ever move to the same or a later day. When
+    not everything fits, an activity that was left out takes the time of placed ones of
+    lower priority, least important first, as many as it needs. `follows` maps a day to
+    the activity just before its window, for the travel time out of it.
+    """
+    follows = follows or {}
+    excluded, given_up = [], []
+
+    def pack(without):
+        return _pack([a for a in activities if a not in without], days, windows, travel, follows)
+
+    slots, dropped = pack(excluded)
+    while True:
+        wanted = [a for a in dropped if a not in given_up]
+        if not wanted:
+            return slots, excluded + dropped
+        target = max(wanted, key=lambda a: a.priority)
+        victims, trial_slots, fits = [], slots, False
+        while not fits:
+            placed = [slot.activity for slot in trial_slots if slot.activity.priority < target.priority]
+            if not placed:
+                break
+            victims.append(min(reversed(placed), key=lambda a: a.priority))
+            trial_slots, trial_dropped = pack(excluded + victims)
+            fits = target not in trial_dropped
+        if not fits:
+            given_up.append(target)
+            continue
+        # An earlier victim may have become unnecessary once later ones made room: put it back
+        for victim in sorted(victims[:-1], key=lambda a: -a.priority):
+            spared = [v for v in victims if v is not victim]
+            spared_slots, spared_dropped = pack(excluded + spared)
+            if target not in spared_dropped and victim not in spared_dropped:
+                victims, trial_slots, trial_dropped = spared, spared_slots, spared_dropped
+        excluded.extend(victims)
+        slots, dropped = trial_slots, trial_dropped
+
+
+class Itinerary:
+    """The timed activities of a markdown plan, with what is needed to write them back."""
+
+    def __init__(self, plan, lines, days, owners):
+        self.plan = plan
+        self.lines = lines
+        self.days = days        # day number -> [Activity] in plan order
+        self.owners = owners    # line number -> Activity, for slot lines and the details under them
+
+    @property
+    def activities(self):
+        return [a for day in sorted(self.days) for a in self.days[day]]
+
+    def find(self, location):
+        """The activity best matching a place name, or None."""
+        wanted = _words(location)
+        if not wanted:
+            return None
+        best, best_score = None, 0.0
+        for activity in self.activities:
+            score = len(wanted & _words(activity.name)) / len(wanted)
+            if score > best_score:
+                best, best_score = activity, score
+        return best if best_score >= 0.5 else None
+
+    def day_end(self, day):
+        last = max(a.start + a.duration for a in self.days[day])
+        return max(last, parse_clock(SCHEDULE_DAY_END)[0])
+
+    def render(self, slots):
+        """The plan with its slot lines, and the details under them, replaced by `slots`.
+
+        The k-th slot of a day takes the place of the day's k-th slot in the plan, and
+        slots beyond the plan's count follow its last one. Every other line (prose, bold
+        notes, blank separators) stays where it is.
+        """
+        by_day = {}
+        for slot in sorted(slots, key=lambda s: (s.day, s.start)):
+            by_day.setdefault(slot.day, []).append(slot)
+        output = []
+        for number, line in enumerate(self.lines):
+            activity = self.owners.get(number)
+            if activity is None:
+                output.append(line)
+                continue
+            if number != activity.line:
+                continue  # a detail line, written out with its slot
+            planned, position = self.days[activity.day], self.days[activity.day].index(activity)
+            new = by_day.get(activity.day, [])
+            for slot in new[position:position + 1] if position < len(planned) - 1 else new[position:]:
+                output.extend(_retime(slot))
+        return "\n".join(output)
+
+
+def _retime(slot):
+    activity = slot.activity
+    if (slot.day, slot.start, slot.end) == (activity.day, activity.start, activity.start + activity.duration):
+        return activity.lines
+    match = SLOT.match(activity.lines[0])
+    times = (format_clock(slot.start, activity.twelve_hour), format_clock(slot.end, activity.twelve_hour))
+    dash = match.group("dash")
+    joiner = f" {dash} " if dash == "to" else dash
+    return [f"{match.group('prefix')}{times[0]}{joiner}{times[1]}{match.group('rest')}"] + activity.lines[1:]
+
+
+def _name(rest):
+    text = LINK.sub(r"\1", rest)
+    text = re.sub(r"\*\*|__|`", "", text)
+    return text.strip(" :-–—*\t") or "Activity"
+
+
+def parse_itinerary(plan):
+    """Parses the timed slots of every "Day N" section; returns None if the plan has none."""
+    lines = (plan or "").splitlines()
+    days, owners = {}, {}
+    day, day_level, current, previous = None, None, None, None
+    for number, line in enumerate(lines):
+        stripped = line.strip()
+        heading = HEADING.match(stripped)
+        day_match = DAY_MARKER.match(stripped)
+        if day_match:
+            day = int(re.search(r"\d+", day_match.group(0)).group(0))
+            # A "**Day 1**" marker is ended by any heading, a "## Day 1" one by a heading of its level
+            day_level = len(heading.group(1)) if heading else 6
+            current = previous = None
+            continue
+        if heading and day is not None and len(heading.group(1)) <= day_level:
+            # The days are over: timed lines further down (opening hours, say) are not slots
+            day = current = previous = None
+            continue
+        match = SLOT.match(line) if day is not None else None
+        if match and not any(":" in t or re.search(r"[AaPp]", t) for t in (match.group("start"), match.group("end"))):
+            match = None  # a range such as "2-3 hours", not a time slot
+        if match:
+            end, end_meridiem = parse_clock(match.group("end"))
+            start, _ = parse_clock(match.group("start"), end_meridiem)
+            if end <= start:
+                end += 12 * 60 if end_meridiem is None and end + 12 * 60 > start else 24 * 60
+            name = _name(match.group("rest"))
+            lowered = name.lower()
+            meal = next((meal for meal in MEAL_WINDOWS if meal in lowered), None)
+            opens, closes = MEAL_WINDOWS[meal] if meal else (None, None)
+            priority = 2.0 if meal else 0.5 if any(word in lowered for word in LOW_PRIORITY) else 1.0
+            # A long gap in the plan is free time rather than travel, so it is not kept
+            lead_time = min(max(0, start - (previous.start + previous.duration)), 60) if previous is not None else 0
+            current = Activity(name, end - start, opens=opens, closes=closes, priority=priority, day=day,
+                               until_day=day if meal else None, start=start, lead_time=lead_time, after=previous, lines=[line],
+                               twelve_hour=end_meridiem is not None, line=number)
+            days.setdefault(day, []).append(current)
+            owners[number] = current
+            previous = current
+        elif current is not None and line[:1].isspace() and stripped and not HEADING.match(stripped):
+            # Details indented under a slot move with it
+            current.lines.append(line)
+            owners[number] = current
+        elif stripped and (HEADING.match(stripped) or not line[:1].isspace()):
+            current = None
+    if not days:
+        return None
+    return Itinerary(plan, lines, days, owners)
+
+
+class Reschedule:
+    """Outcome of `extend_stay`: the re-packed plan and what moved or no longer fits."""
+
+    def __init__(self, itinerary, current, extra_minutes, slots, dropped, windows):
+        # The slot of `current` in `slots` carries its new, later end
+        self.itinerary = itinerary
+        self.current = current
+        self.extra_minutes = extra_minutes
+        self.slots = slots
+        self.dropped = dropped
+        self.windows = windows
+
+    @property
+    def moved(self):
+        return [s for s in self.slots if s.activity is not self.current and (s.day, s.start) != (s.activity.day, s.activity.start)]
+
+    def free_windows(self, min_minutes=30):
+        """(day, start, end) of the gaps of at least `min_minutes` left in the re-packed days."""
+        free = []
+        for day, (start, end) in sorted(self.windows.items()):
+            cursor = start
+            for slot in sorted((s for s in self.slots if s.day == day and s.start >= start), key=lambda s: s.start):
+                if slot.start - cursor >= min_minutes:
+                    free.append((day, cursor, slot.start))
+                cursor = max(cursor, slot.end)
+            if end - cursor >= min_minutes:
+                free.append((day, cursor, end))
+        return free
+
+    def summary(self):
+        lines = ["## Schedule Adjustment Summary",
+                 f"- Extended **{self.current.name}** (Day {self.current.day}) by {self.extra_minutes / 60:g} "
+                 f"hour{'' if self.extra_minutes == 60 else 's'}."]
+        for slot in self.moved:
+            twelve_hour = slot.activity.twelve_hour
+            lines.append(f"- Moved **{slot.activity.name}** to Day {slot.day}, "
+                         f"{format_clock(slot.start, twelve_hour)}–{format_clock(slot.end, twelve_hour)}.")
+        for activity in self.dropped:
+            lines.append(f"- Dropped **{activity.name}** (was Day {activity.day}, "
+                         f"{format_clock(activity.start, activity.twelve_hour)}): it no longer fits.")
+        if not self.moved and not self.dropped:
+            lines.append("- The rest of the itinerary is unchanged.")
+        return "\n".join(lines)
+
+    def outline(self):
+        """Compact text of the re-packed days, dropped activities and free time, for a prompt."""
+        lines = []
+        for day in sorted(self.windows):
+            slots = sorted((s for s in self.slots if s.day == day), key=lambda s: s.start)
+            lines.append(f"Day {day}: " + "; ".join(
+                f"{format_clock(s.start)}–{format_clock(s.end)} {s.activity.name}" for s in slots))
+        lines.append("Dropped: " + "; ".join(
+            f"{a.name} ({a.duration} min, was Day {a.day} at {format_clock(a.start)})" for a in self.dropped))
+        lines.append("Free time: " + ("; ".join(
+            f"Day {day} {format_clock(start)}–{format_clock(end)}" for day, start, end in self.free_windows()) or "none"))
+        return "\n".join(lines)
+
+    def plan(self):
+        return self.itinerary.render(self.slots).rstrip() + "\n\n" + self.summary()
+
+
+def extend_stay(plan, present_location, extra_hours, travel=default_travel):
+    """Re-packs the itinerary after the traveler stays `extra_hours` longer at `present_location`.
+
+    Returns a Reschedule, or None when the plan has no timed slots or the location does not
+    match any activity (the caller then falls back to the LLM).
+    """
+    itinerary = parse_itinerary(plan)
+    current = itinerary.find(present_location) if itinerary else None
+    if current is None:
+        return None
+
+    extra_minutes = int(round(float(extra_hours) * 60))
+    current_end = current.start + current.duration + extra_minutes
+    fixed, movable = [], []
+    for activity in itinerary.activities:
+        if (activity.day, activity.start) < (current.day, current.start):
+            fixed.append(Slot(activity.day, activity.start, activity))
+        elif activity is not current:
+            movable.append(activity)
+
+    days = [day for day in sorted(itinerary.days) if day >= current.day]
+    windows = {day: (min(a.start for a in itinerary.days[day]), itinerary.day_end(day)) for day in days}
+    windows[current.day] = (current_end, max(current_end, itinerary.day_end(current.day)))
+    slots, dropped = schedule(movable, days, windows, travel, follows={current.day: current})
+    current_slot = Slot(current.day, current.start, current, end=current_end)
+    return Reschedule(itinerary, current, extra_minutes, fixed + [current_slot] + slots, dropped, windows)
@@ -0,0 +1,129 @@
+"""Key/value stores behind the plan, tool, search and weather caches.
+
+memory: a dict per process (the default, fine for one worker or a Streamlit app)
+sqlite: one SQLite file in WAL mode shared by every worker process on the host, so
+        running `uvicorn backend_dart:app --workers N` doesn't split the hit rate N ways
+
+Values must be JSON-serializable; anything else is stored as its str().
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .instrumentation import metrics
+
+CACHE_BACKEND = os.getenv("TRAVELGPT_CACHE_BACKEND", "memory")
+CACHE_PATH = os.getenv("TRAVELGPT_CACHE_PATH",
+                       os.path.join(os.path.dirname(__file__), "..", "data", "travelgpt_cache.sqlite3"))
+# Expired rows are swept every this many writes
+SQLITE_PURGE_EVERY = int(os.getenv("TRAVELGPT_CACHE_PURGE_EVERY", "256"))
+
+
+def _count(namespace, found):
+    metrics.inc("travelgpt_cache_requests_total", (("namespace", namespace), ("result", "hit" if found else "miss")))
+
+
+class MemoryStore:
+    """In-process TTL store, least recently used entries evicted past `max_size`."""
+
+    def __init__(self, namespace, max_size=None):
+        self.namespace = namespace
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (found, value)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        _count(self.namespace, entry is not None)
+        return (True, entry[1]) if entry is not None else (False, None)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while self.max_size and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteStore:
+    """TTL store in a SQLite database shared between processes.
+
+    WAL mode lets readers in every worker proceed while one writer commits. Each
+    thread (and each forked process) opens its own connection.
+    """
+
+    def __init__(self, namespace, path=CACHE_PATH, max_size=None):
+        self.namespace = namespace
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def db(self):
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._local.db, self._local.pid = db, pid
+        return self._local.db
+
+    def get(self, key):
+        row = self.db.execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (self.namespace, key, time.time()),
+        ).fetchone()
+        _count(self.namespace, row is not None)
+        return (True, json.loads(row[0])) if row is not None else (False, None)
+
+    def set(self, key, value, ttl):
+        self.db.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, time.time() + ttl, json.dumps(value, default=str)),
+        )
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self):
+        """Drops expired rows and, past `max_size`, the rows closest to expiry."""
+        self.db.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        if self.max_size:
+            self.db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_size),
+            )
+
+    def clear(self):
+        self.db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+
+def make_store(namespace, max_size=None, backend=None):
+    """Returns the store for one cache, as configured by TRAVELGPT_CACHE_BACKEND."""
+    backend = backend or CACHE_BACKEND
+    if backend == "memory":
+        return MemoryStore(namespace, max_size=max_size)
+    if backend == "sqlite":
+        return SQLiteStore(namespace, max_size=max_size)
+    raise ValueError(f"Unknown TRAVELGPT_CACHE_BACKEND: {backend}")
@@ -0,0 +1,74 @@
+"""Speculative plan generation: start the run while the user is still looking at the sidebar.
+
+Opt-in with TRAVELGPT_SPECULATE=1. Once the trip inputs have stayed the same for
+TRAVELGPT_SPECULATE_DEBOUNCE seconds a generation starts in the background; the
+Generate click then picks up that run (finished or still streaming) instead of
+starting its own. Runs whose inputs change before the click are cancelled, and a
+session stops speculating after TRAVELGPT_SPECULATE_MAX_WASTED runs that were
+cancelled after they had started.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .instrumentation import metrics
+
+SPECULATE = os.getenv("TRAVELGPT_SPECULATE", "0") == "1"
+SPECULATE_DEBOUNCE = float(os.getenv("TRAVELGPT_SPECULATE_DEBOUNCE", "2"))
+SPECULATE_MAX_WASTED = int(os.getenv("TRAVELGPT_SPECULATE_MAX_WASTED", "3"))
+# Speculative runs across all sessions; extra ones queue rather than compete with clicks
+SPECULATE_WORKERS = int(os.getenv("TRAVELGPT_SPECULATE_WORKERS", "2"))
+
+speculation_pool = ThreadPoolExecutor(max_workers=SPECULATE_WORKERS, thread_name_prefix="speculate")
+
+
+def _count(result):
+    metrics.inc("travelgpt_speculative_runs_total", (("result", result),))
+
+
+class Speculator:
+    """Tracks one session's inputs and the speculative AgentStream started for them."""
+
+    def __init__(self, debounce=SPECULATE_DEBOUNCE, max_wasted=SPECULATE_MAX_WASTED, executor=speculation_pool):
+        self.debounce = debounce
+        self.max_wasted = max_wasted
+        self.executor = executor
+        self.key = None
+        self.since = None
+        self.stream = None
+        self.claimed = None
+        self.wasted = 0
+
+    def observe(self, key, make_stream):
+        """Called on every rerun with the current inputs; starts `make_stream()` once they have settled."""
+        now = time.monotonic()
+        if key != self.key:
+            self.abandon()
+            self.key, self.since = key, now
+        if (self.stream is None and key is not None and key != self.claimed
+                and now - self.since >= self.debounce and self.wasted < self.max_wasted):
+            self.stream = make_stream().start(self.executor)
+            _count("started")
+        return self.stream
+
+    def abandon(self):
+        if self.stream is None:
+            return
+        queued = self.stream.future is not None and not self.stream.future.running() and not self.stream.done
+        self.stream.cancel("inputs changed")
+        if queued:
+            # Never started: nothing was spent
+            _count("cancelled")
+        else:
+            self.wasted += 1
+            _count("wasted")
+        self.stream = None
+
+    def claim(self, key):
+        """Hands over the speculative run for `key`, if there is one."""
+        if self.stream is None or key != self.key:
+            return None
+        stream, self.stream = self.stream, None
+        self.claimed = key
+        _count("claimed")
+        return stream
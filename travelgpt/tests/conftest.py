@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from travelgpt.agent import TravelAgent
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+        self.metrics = {}
+
+
+class StatefulAgent:
+    """Keeps its run in attributes the way phi's Agent does, so two overlapping runs would mix."""
+
+    def __init__(self):
+        self.memory = []
+        self.running = threading.Lock()
+
+    def run(self, prompt, stream=False):
+        assert self.running.acquire(blocking=False), "two runs on one agent"
+        try:
+            self.run_response = Response(prompt)
+            self.memory.append(prompt)
+            time.sleep(0.01)
+            return self.run_response
+        finally:
+            self.running.release()
+
+
+class EchoAgent:
+    """A stateless stand-in answering every prompt with the prompt itself."""
+
+    def run(self, prompt, stream=False):
+        return Response(prompt)
+
+
+class PooledAgent(TravelAgent):
+    """A TravelAgent whose pool builds StatefulAgents, counting them in `builds`."""
+
+    def __init__(self):
+        super().__init__(tools=[])
+        self.builds = 0
+
+    def _build(self):
+        self.builds += 1
+        return StatefulAgent()
+
+
+@pytest.fixture
+def pooled_agent():
+    return PooledAgent()
+
+
+@pytest.fixture
+def dart_client(monkeypatch):
+    """A test client of backend_dart.py whose agent echoes its prompts."""
+    monkeypatch.setenv("TRAVELGPT_PREWARM", "0")
+    testclient = pytest.importorskip("fastapi.testclient")
+    import backend_dart
+
+    monkeypatch.setattr(backend_dart.travel_agent, "agent", EchoAgent())
+    return testclient.TestClient(backend_dart.app)
+
+
+@pytest.fixture
+def flask_backend_client(monkeypatch):
+    """A test client of backend.py whose agent echoes its prompts."""
+    monkeypatch.setenv("TRAVELGPT_PREWARM", "0")
+    pytest.importorskip("flask")
+    import backend
+
+    monkeypatch.setattr(backend.travel_agent, "agent", EchoAgent())
+    return backend.app.test_client()
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from travelgpt.agent import AGENT_POOL_SIZE
+
+
+def test_overlapping_runs_get_their_own_agent(pooled_agent):
+    prompts = [f"prompt {i}" for i in range(32)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        replies = list(pool.map(pooled_agent._run, prompts))
+    assert replies == prompts
+    assert 1 <= pooled_agent.builds <= 8
+    assert len(pooled_agent._idle) <= AGENT_POOL_SIZE
+
+
+def test_agents_are_reused_with_fresh_memory(pooled_agent):
+    with pooled_agent.checkout() as first:
+        first.run("one")
+    with pooled_agent.checkout() as second:
+        assert second is first
+        assert second.memory == []
+    assert pooled_agent.builds == 1
+
+
+def test_an_agent_whose_run_failed_is_not_reused(pooled_agent):
+    try:
+        with pooled_agent.checkout() as failed:
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    with pooled_agent.checkout() as agent:
+        assert agent is not failed
+    assert pooled_agent.builds == 2
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+START = date.today() + timedelta(days=30)
+
+
+def trip(present_location, destination="Lisbon", start=START):
+    return {"destination": destination, "present_location": present_location, "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=2)).isoformat(), "budget": "mid", "travel_styles": ["foodie"]}
+
+
+def test_an_invalid_trip_fails_alone(dart_client):
+    trips = [trip("London"), trip("Paris"), trip("Oslo", start=date.today() - timedelta(days=3))]
+    response = dart_client.post("/generate-plans", json={"trips": trips})
+    assert response.status_code == 200
+    plans = response.json()["plans"]
+    assert [("travel_plan" in plan, "error" in plan) for plan in plans] == [(True, False), (True, False), (False, True)]
+    assert plans[2]["errors"][0]["field"] == "start_date"
+    assert plans[0]["trip"]["budget"] == "Moderate"
+
+
+def test_a_batch_of_invalid_trips_reports_every_error(dart_client):
+    response = dart_client.post("/generate-plans", json={"trips": [trip("London", destination=""), {"destination": "Lisbon"}]})
+    assert response.status_code == 200
+    assert all("errors" in plan for plan in response.json()["plans"])
+
+
+def test_a_single_invalid_trip_is_still_a_422(dart_client):
+    response = dart_client.post("/generate-plan", json=trip("London", start=date.today() - timedelta(days=3)))
+    assert response.status_code == 422
@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from travelgpt.batch import generate_plans
+
+START = date.today() + timedelta(days=30)
+
+
+def trip(present_location, destination="Lisbon"):
+    return {"destination": destination, "present_location": present_location, "start_date": START.isoformat(),
+            "end_date": (START + timedelta(days=2)).isoformat(), "budget": "Moderate", "travel_style": ["Food"]}
+
+
+def test_group_shares_research_and_skips_transport_without_an_origin(pooled_agent):
+    travel_agent = pooled_agent
+    calls = []
+    for name in ("generate_shared_plan", "plan_transport", "generate_travel_plan"):
+        method = getattr(travel_agent, name)
+        setattr(travel_agent, name, lambda *args, _name=name, _method=method: calls.append(_name) or _method(*args))
+
+    plans = generate_plans(travel_agent, [trip("London"), trip("london"), trip(""), trip("Paris"), trip("Oslo", "Rome")])
+
+    assert sorted(calls) == ["generate_shared_plan", "generate_travel_plan", "plan_transport", "plan_transport"]
+    assert plans[0] == plans[1]
+    assert "transport" in plans[0].metadata
+    assert "transport" not in plans[2].metadata
+    assert str(plans[2]) in str(plans[0])
+    assert plans[4].metadata["shared_with"] == 0
@@ -0,0 +1,38 @@
+import pytest
+
+from travelgpt import tool_cache as tool_cache_module
+from travelgpt.cassette import Cassette, CassetteMiss
+from travelgpt.shared_cache import MemoryStore
+from travelgpt.tool_cache import ToolCallCache
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+        self.metrics = {}
+
+
+def test_tool_events_are_only_built_while_recording(tmp_path, monkeypatch):
+    cache = ToolCallCache(store=MemoryStore("test-tool"))
+    lookup = cache.wrap(lambda city: f"facts about {city}", name="lookup")
+
+    def refuse(value):
+        raise AssertionError("payload built outside a recording")
+
+    monkeypatch.setattr(tool_cache_module, "to_jsonable", refuse)
+    assert lookup("Lisbon") == "facts about Lisbon"
+
+    monkeypatch.undo()
+    recorder = Cassette(str(tmp_path), mode="record")
+    recorder.run(None, "prompt", lambda: Response(lookup("Porto")))
+    entry = recorder.load(recorder.key(None, "prompt"))
+    assert entry["events"] == [{"kind": "tool", "name": "lookup", "args": ["Porto"], "kwargs": {},
+                                "result": "facts about Porto", "cache_hit": False}]
+
+
+def test_replay_serves_recordings_and_fails_on_a_miss(tmp_path):
+    Cassette(str(tmp_path), mode="record").run(None, "prompt", lambda: Response("recorded"))
+    replay = Cassette(str(tmp_path), mode="replay")
+    assert replay.run(None, "prompt", lambda: Response("live")).content == "recorded"
+    with pytest.raises(CassetteMiss):
+        replay.run(None, "other prompt", lambda: Response("live"))
@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from travelgpt import compression
+from travelgpt.compression import CompressionMiddleware, compress, etag_matches, negotiate, plan_etag
+from travelgpt.plan_sections import plan_version
+
+PLAN = "## Day 1\n" + "- Walk the old town and eat pastel de nata\n" * 100
+ETAG = plan_etag(PLAN)
+START = date.today() + timedelta(days=30)
+TRIP = {"destination": "Lisbon", "present_location": "London", "start_date": START.isoformat(),
+        "end_date": (START + timedelta(days=2)).isoformat(), "budget": "mid", "travel_style": ["foodie"]}
+
+
+def test_etag_is_weak_and_follows_the_plan_version():
+    assert ETAG.startswith('W/"')
+    assert plan_etag(PLAN) == ETAG
+    assert plan_etag(PLAN + "- One more stop\n") != ETAG
+
+
+@pytest.mark.parametrize("header, matches", [
+    (ETAG, True), (ETAG.removeprefix("W/"), True), (f'"other", {ETAG}', True), ("*", True),
+    ('"other"', False), ("", False), (None, False),
+])
+def test_etag_matches_weakly(header, matches):
+    assert etag_matches(header, ETAG) is matches
+
+
+@pytest.mark.parametrize("header, brotli, expected", [
+    ("gzip, br", True, "br"), ("gzip, br", False, "gzip"), ("br;q=0, gzip", True, "gzip"),
+    ("identity", True, None), ("*", False, "gzip"), ("gzip;q=0, *;q=0", True, None), (None, True, None),
+])
+def test_negotiate(monkeypatch, header, brotli, expected):
+    if not brotli:
+        monkeypatch.setattr(compression, "_brotli", lambda: None)
+    elif compression._brotli() is None:
+        pytest.skip("brotli is not installed")
+    assert negotiate(header) == expected
+
+
+def test_gzip_round_trips():
+    assert gzip.decompress(compress(PLAN.encode(), "gzip")).decode() == PLAN
+
+
+@pytest.fixture
+def flask_client():
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__)
+    app.after_request(compression.compress_flask_response)
+
+    @app.route("/plan", methods=["GET", "POST"])
+    def plan():
+        response = flask.jsonify({"travel_plan": PLAN})
+        response.headers["ETag"] = ETAG
+        return response
+
+    return app.test_client()
+
+
+def test_flask_backend_revalidates_a_served_plan(flask_backend_client):
+    response = flask_backend_client.post("/generate-plan", json=TRIP)
+    assert response.status_code == 200
+    etag, location = response.headers["ETag"], response.headers["Content-Location"]
+    assert location == "/plans/" + plan_version(response.get_json()["travel_plan"])
+    response = flask_backend_client.get(location, headers={"If-None-Match": etag})
+    assert (response.status_code, response.data) == (304, b"")
+    response = flask_backend_client.get(location, headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert flask_backend_client.get("/plans/unknown").status_code == 404
+    response = flask_backend_client.post("/generate-plan", json=TRIP, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_dart_backend_revalidates_a_served_plan(dart_client):
+    trip = {**TRIP, "travel_styles": TRIP["travel_style"]}
+    response = dart_client.post("/generate-plan", json=trip)
+    assert response.status_code == 200
+    etag, location = response.headers["ETag"], response.headers["Content-Location"]
+    response = dart_client.get(location, headers={"If-None-Match": etag})
+    assert (response.status_code, response.content) == (304, b"")
+    response = dart_client.get(location)
+    assert response.status_code == 200
+    assert plan_etag(response.json()["travel_plan"]) == etag
+    assert dart_client.get("/plans/unknown").status_code == 404
+    assert dart_client.post("/generate-plan", json=trip, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_flask_compresses_by_accept_encoding(flask_client, monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", lambda: None)
+    response = flask_client.post("/plan", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data))["travel_plan"] == PLAN
+
+
+async def plan_app(scope, receive, send):
+    body = json.dumps({"travel_plan": PLAN}).encode()
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"etag", ETAG.encode())]})
+    await send({"type": "http.response.body", "body": body[:100], "more_body": True})
+    await send({"type": "http.response.body", "body": body[100:]})
+
+
+def asgi_request(method, headers):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": "/plan",
+             "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+    asyncio.run(CompressionMiddleware(plan_app)(scope, receive, send))
+    start = messages[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_middleware_revalidates_get_only():
+    status, _, body = asgi_request("GET", {"If-None-Match": ETAG})
+    assert (status, body) == (304, b"")
+    status, _, body = asgi_request("POST", {"If-None-Match": ETAG})
+    assert status == 200
+    assert json.loads(body)["travel_plan"] == PLAN
+
+
+def test_middleware_compresses_a_streamed_body(monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", lambda: None)
+    status, headers, body = asgi_request("POST", {"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert json.loads(gzip.decompress(body))["travel_plan"] == PLAN
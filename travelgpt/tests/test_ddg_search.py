@@ -0,0 +1,48 @@
+from travelgpt import ddg_search as module
+from travelgpt.ddg_search import DuckDuckGoSearch
+from travelgpt.http_client import _policy
+
+
+class Ratelimited(Exception):
+    pass
+
+
+class FakeDDGS:
+    """Answers with the next of `answers`; an exception instance is raised instead."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.queries = []
+
+    def text(self, query, max_results=5):
+        self.queries.append(query)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def make_search(monkeypatch, answers):
+    monkeypatch.setattr(module.cancellation, "sleep", lambda seconds: None)
+    search = DuckDuckGoSearch()
+    search.ratelimit_error = lambda: Ratelimited
+    search._local.ddgs = FakeDDGS(answers)
+    return search, search._local.ddgs
+
+
+def test_empty_results_are_not_cached(monkeypatch):
+    search, ddgs = make_search(monkeypatch, [[], [{"title": "Belém Tower"}]])
+    assert search.search("lisbon towers") == []
+    assert search.search("lisbon towers") == [{"title": "Belém Tower"}]
+    assert search.search("lisbon towers") == [{"title": "Belém Tower"}]
+    assert len(ddgs.queries) == 2
+
+
+def test_rate_limits_are_waited_out_without_tripping_the_breaker(monkeypatch):
+    breaker = _policy.breaker("duckduckgo.com")
+    breaker.record_success()
+    search, ddgs = make_search(monkeypatch, [Ratelimited("202 Ratelimit")] * module.SEARCH_RATELIMIT_RETRIES
+                               + [[{"title": "Alfama"}]])
+    assert search.search("lisbon old town") == [{"title": "Alfama"}]
+    assert len(ddgs.queries) == module.SEARCH_RATELIMIT_RETRIES + 1
+    assert breaker.failures == 0
@@ -0,0 +1,122 @@
+import itertools
+import random
+import threading
+
+import numpy as np
+import pytest
+
+from travelgpt import geo
+from travelgpt.geo import GeoIndex, haversine, haversine_matrix, order_stops, route_length
+
+PARIS = {
+    "Hotel du Louvre": (48.8631, 2.3353),
+    "Louvre": (48.8606, 2.3376),
+    "Notre-Dame": (48.8530, 2.3499),
+    "Eiffel Tower": (48.8584, 2.2945),
+    "Sacré-Cœur": (48.8867, 2.3431),
+    "Arc de Triomphe": (48.8738, 2.2950),
+}
+
+
+def test_haversine():
+    assert haversine(51.5074, -0.1278, [48.8566], [2.3522])[0] == pytest.approx(343.5, abs=1)
+    matrix = haversine_matrix([0, 0, 1], [0, 1, 0])
+    assert np.allclose(matrix, matrix.T) and np.allclose(np.diag(matrix), 0)
+    assert matrix[0, 1] == pytest.approx(111.2, abs=0.1)
+
+
+def test_stops_on_a_line_are_visited_in_order():
+    points = list(range(8))
+    shuffled = random.Random(3).sample(points, len(points))
+    matrix = [[abs(a - b) for b in shuffled] for a in shuffled]
+    order = [shuffled[i] for i in order_stops(matrix)]
+    assert order in (points, points[::-1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_order_is_as_short_as_the_best_path(seed):
+    rng = random.Random(seed)
+    lats, lons = [48.85 + rng.random() / 20 for _ in range(7)], [2.30 + rng.random() / 20 for _ in range(7)]
+    matrix = haversine_matrix(lats, lons)
+    best = min(route_length((0,) + rest, matrix) for rest in itertools.permutations(range(1, 7)))
+    order = order_stops(matrix, start=0)
+    assert order[0] == 0 and sorted(order) == list(range(7))
+    # A heuristic: within 5% of the optimum on these small instances
+    assert route_length(order, matrix) <= best * 1.05
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    lats, lons = [rng.uniform(-60, 60) for _ in range(200)], [rng.uniform(-180, 180) for _ in range(200)]
+    index = GeoIndex(range(200), lats, lons)
+    for lat, lon in [(48.85, 2.35), (-33.9, 151.2), (0, 179.9)]:
+        km = haversine(lat, lon, lats, lons)
+        expected = sorted(range(200), key=lambda i: km[i])[:5]
+        assert [name for name, _ in index.nearest(lat, lon, k=5)] == expected
+    assert [name for name, _ in index.within(lats[0], lons[0], 0.001)] == [0]
+
+
+@pytest.fixture
+def located(monkeypatch):
+    monkeypatch.setattr(geo, "geocode", lambda place, near="": PARIS.get(place))
+
+
+def test_route_day_starts_at_the_hotel(located):
+    route = geo.route_day(["Eiffel Tower", "Notre-Dame", "Atlantis", "Louvre", "Sacré-Cœur", "Arc de Triomphe"],
+                          city="Paris", start="Hotel du Louvre")
+    assert route["stops"][0] == "Hotel du Louvre"
+    assert route["stops"][1] == "Louvre"
+    assert route["unresolved"] == ["Atlantis"]
+    assert len(route["legs"]) == 5
+    assert route["total_km"] == pytest.approx(sum(leg["km"] for leg in route["legs"]), abs=0.05)
+
+
+def test_distances_from_are_nearest_first(located):
+    result = geo.distances_from("Hotel du Louvre", ["Eiffel Tower", "Louvre", "Notre-Dame"], mode="walk")
+    assert [p["place"] for p in result["places"]] == ["Louvre", "Notre-Dame", "Eiffel Tower"]
+    assert geo.distances_from("Atlantis", ["Louvre"]) == {"error": "Could not locate Atlantis"}
+
+
+def test_geocoder_slots_are_spaced_by_the_interval(monkeypatch):
+    monkeypatch.setattr(geo, "GEOCODER_MIN_INTERVAL", 1.0)
+    monkeypatch.setattr(geo, "_next_geocode", 0.0)
+    waits = [geo._reserve_geocode_slot() for _ in range(3)]
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(1, abs=0.05) and waits[2] == pytest.approx(2, abs=0.05)
+
+
+class SlowResponse:
+    def __init__(self, coords):
+        self.coords = coords
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return [{"lat": self.coords[0], "lon": self.coords[1]}]
+
+
+def test_a_slow_geocoder_response_does_not_block_the_next_request(monkeypatch):
+    monkeypatch.setattr(geo, "GEOCODER_MIN_INTERVAL", 0.0)
+    monkeypatch.setattr(geo.geocode_store, "get", lambda key: (False, None))
+    monkeypatch.setattr(geo.geocode_store, "set", lambda key, value, ttl: None)
+    first_sent, release, second_sent = threading.Event(), threading.Event(), threading.Event()
+
+    def get(url, params, headers):
+        if params["q"].startswith("Louvre"):
+            first_sent.set()
+            release.wait(5)
+        else:
+            second_sent.set()
+        return SlowResponse(PARIS[params["q"].split(",")[0]])
+
+    monkeypatch.setattr(geo.http_client, "get", get)
+    first = threading.Thread(target=geo.geocode, args=("Louvre", "Paris"))
+    first.start()
+    try:
+        assert first_sent.wait(5)
+        assert geo.geocode("Eiffel Tower", near="Paris") == PARIS["Eiffel Tower"]
+        assert second_sent.is_set()
+    finally:
+        release.set()
+        first.join()
@@ -0,0 +1,50 @@
+import pytest
+import requests
+
+from travelgpt import http_client as module
+from travelgpt.http_client import HttpClient
+
+
+def flaky_session(client, statuses):
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(method)
+        response = requests.Response()
+        response.status_code = statuses[min(len(calls), len(statuses)) - 1]
+        return response
+
+    client.session.request = request
+    return calls
+
+
+def test_only_idempotent_requests_are_retried(monkeypatch):
+    monkeypatch.setattr(module, "backoff_delay", lambda attempt: 0)
+    client = HttpClient(max_retries=2)
+    calls = flaky_session(client, [503, 200])
+    assert client.get("https://retry.test/a").status_code == 200
+    assert calls == ["GET", "GET"]
+
+    calls.clear()
+    assert client.post("https://retry.test/b").status_code == 503
+    assert calls == ["POST"]
+
+    calls.clear()
+    assert client.post("https://retry.test/c", retry=True).status_code == 200
+    assert calls == ["POST", "POST"]
+
+
+def test_guard_keeps_the_signature_and_counts_failures():
+    client = HttpClient(max_retries=0)
+
+    def search_google(query: str, num_results: int = 5) -> str:
+        """Searches Google."""
+        raise ValueError("quota exceeded")
+
+    guarded = client.guard("guard.test", search_google)
+    assert guarded.__name__ == "search_google" and guarded.__doc__ == "Searches Google."
+    for _ in range(module.BREAKER_FAILURES):
+        with pytest.raises(ValueError):
+            guarded("lisbon")
+    with pytest.raises(module.CircuitOpenError):
+        guarded("lisbon")
@@ -0,0 +1,30 @@
+from travelgpt import index_builder
+from travelgpt.destination_index import TOPICS, DestinationIndex
+from travelgpt.ddg_search import ddg_search
+
+
+def results(*items):
+    return lambda queries, max_results: [list(items) for _ in queries]
+
+
+def test_a_search_that_found_nothing_is_not_a_record():
+    assert index_builder.build_record("Lisbon", [], results(), 5) is None
+    assert index_builder.build_record("Lisbon", [], results({"error": "rate limited"}), 5) is None
+    record = index_builder.build_record("Lisbon", ["Lisboa"], results({"title": "Belém", "href": "h", "body": "b"}), 5)
+    assert set(record["facts"]) == set(TOPICS)
+    assert record["key"] == "lisbon"
+
+
+def test_a_failed_refresh_keeps_the_previous_record(tmp_path, monkeypatch):
+    destinations = tmp_path / "destinations.txt"
+    destinations.write_text("Lisbon | Lisboa\n")
+    index = tmp_path / "index"
+
+    monkeypatch.setattr(ddg_search, "search_many", results({"title": "Belém", "href": "h", "body": "b"}))
+    index_builder.main([str(destinations), "--path", str(index)])
+    built = DestinationIndex(str(index)).load().records["lisbon"]
+
+    monkeypatch.setattr(ddg_search, "search_many", results())
+    index_builder.main([str(destinations), "--path", str(index), "--refresh"])
+    kept = DestinationIndex(str(index)).load().records["lisbon"]
+    assert kept == built
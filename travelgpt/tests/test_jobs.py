@@ -0,0 +1,21 @@
+import asyncio
+
+from travelgpt.jobs import JobRegistry
+
+
+def test_concurrent_jobs_keep_their_own_replies(pooled_agent):
+    travel_agent = pooled_agent
+    registry = JobRegistry(max_running=4)
+
+    async def ask(i):
+        job = registry.create("answer_question", client_id=f"client-{i}")
+        return await registry.run(job, travel_agent.answer_question, f"question {i}?", "plan", "Lisbon")
+
+    async def main():
+        return await asyncio.gather(*(ask(i) for i in range(16)))
+
+    replies = asyncio.run(main())
+    for i, reply in enumerate(replies):
+        assert f"question {i}?" in reply
+        assert not any(f"question {j}?" in reply for j in range(16) if j != i)
+    assert registry.jobs == {}
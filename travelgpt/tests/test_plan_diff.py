@@ -0,0 +1,68 @@
+import pytest
+
+from travelgpt.plan_diff import PatchMismatch, apply_patch, diff_plans, patch_size, plan_changes, sections
+
+PLAN = """Your three days in Lisbon.
+
+## 🌞 Best Time to Visit
+- Spring and autumn are mild.
+
+## Day 1
+- 9:00 AM–12:00 PM: Belém Tower
+- 12:30 PM–1:30 PM: Lunch at Pastéis de Belém
+
+## Day 2
+- 10:00 AM–1:00 PM: Alfama walk
+```
+## not a heading inside a fence
+```
+
+## Day 3
+- 9:00 AM–11:00 AM: Sintra day trip
+
+## 💰 Budget
+- About €120 a day."""
+
+EDITS = {
+    "unchanged": PLAN,
+    "one line": PLAN.replace("Alfama walk", "Alfama walk and Fado"),
+    "day removed": PLAN.replace("## Day 3\n- 9:00 AM–11:00 AM: Sintra day trip\n\n", ""),
+    "section added": PLAN.replace("## 💰 Budget", "## Weather Adjustment Summary\n- Moved Sintra to Day 2.\n\n## 💰 Budget"),
+    "days swapped": PLAN.replace("Belém Tower", "@").replace("Sintra day trip", "Belém Tower").replace("@", "Sintra day trip"),
+    "trailing newline": PLAN + "\n",
+    "from empty": "",
+}
+
+
+def test_sections_lose_nothing():
+    assert "\n".join(line for _, lines in sections(PLAN) for line in lines) == PLAN
+    assert [title for title, _ in sections(PLAN)][-2:] == ["Day 3", "💰 Budget"]
+
+
+@pytest.mark.parametrize("name", EDITS)
+def test_patches_round_trip(name):
+    new = EDITS[name]
+    assert apply_patch(PLAN, diff_plans(PLAN, new)) == new
+    assert apply_patch(new, diff_plans(new, PLAN)) == PLAN
+
+
+def test_a_small_edit_gives_a_small_patch():
+    patch = diff_plans(PLAN, EDITS["one line"])
+    changed = [op for op in patch["sections"] if "same" not in op]
+    assert [op["title"] for op in changed] == ["Day 2"]
+    assert changed[0]["hunks"] == [[1, 1, ["- 10:00 AM–1:00 PM: Alfama walk and Fado"]]]
+    tips = "\n".join(f"- Tip {i}: buy a Viva Viagem card before riding tram 28." for i in range(40))
+    big = PLAN.replace("- Spring and autumn are mild.", tips)
+    assert patch_size(diff_plans(big, big.replace("Alfama walk", "Alfama walk and Fado"))) < len(big.encode()) / 5
+
+
+def test_a_patch_only_applies_to_its_base():
+    patch = diff_plans(PLAN, EDITS["one line"])
+    with pytest.raises(PatchMismatch):
+        apply_patch(EDITS["section added"], patch)
+
+
+def test_plan_changes_lists_changed_sections():
+    changes = plan_changes(PLAN, EDITS["section added"])
+    assert [title for title, _, _ in changes] == ["Weather Adjustment Summary"]
+    assert plan_changes(PLAN, PLAN) == ()
@@ -0,0 +1,77 @@
+import os
+from datetime import date
+
+import pytest
+
+from travelgpt.gazetteer import Gazetteer
+from travelgpt.preflight import InvalidTrip, normalize_trip
+
+TODAY = date(2026, 10, 19)
+
+
+def trip(destination, present_location="London", **fields):
+    fields = {"start_date": "2026-11-01", "end_date": "2026-11-03", "budget": "mid", "travel_style": ["foodie"],
+              **fields}
+    return normalize_trip(destination, present_location, today=TODAY, **fields)
+
+
+@pytest.mark.parametrize("destination", ["Manaus", "Madeira", "Portland", "Como"])
+def test_places_outside_the_gazetteer_are_kept_as_typed(destination):
+    planned = trip(destination)
+    assert planned.destination == destination
+    assert planned.place is None
+    assert not any(f.startswith("destination") for f in planned.fixes)
+
+
+def test_near_misses_are_suggested_not_rewritten():
+    planned = trip("Barcelone")
+    assert planned.destination == "Barcelone"
+    assert any("'Barcelona'" in s for s in planned.suggestions)
+    assert planned.as_dict()["suggestions"] == planned.suggestions
+
+
+@pytest.mark.parametrize("alias", ["nyc", "NYC", "New York", "new york city", "New York, US"])
+def test_city_aliases_are_canonicalised(alias):
+    planned = trip(alias)
+    assert planned.destination == "New York City"
+    assert planned.place.country == "US"
+
+
+def test_spellings_of_one_trip_share_a_key():
+    assert trip("nyc", budget="$$").key == trip("New York City", budget="Moderate", travel_style="Food").key
+
+
+def test_fuzzy_matches_only_name_cities():
+    gazetteer = Gazetteer()
+    for text in ("Manaus", "Madeira", "Portland", "Como"):
+        place, how = gazetteer.resolve(text)
+        assert how != "fuzzy" or place.kind == "city"
+
+
+def test_problems_are_reported_together():
+    with pytest.raises(InvalidTrip) as raised:
+        normalize_trip("", "London", "2026-10-01", end_date="2026-09-30", budget="gold", today=TODAY)
+    fields = {e["field"] for e in raised.value.errors}
+    assert {"destination", "start_date", "end_date", "budget"} <= fields
+
+
+def test_duration_sets_the_end_date():
+    planned = trip("Lisbon", end_date=None, duration=4)
+    assert planned.end_date == date(2026, 11, 4)
+    with pytest.raises(InvalidTrip):
+        trip("Lisbon", duration=5)
+
+
+@pytest.fixture
+def client():
+    os.environ.setdefault("TRAVELGPT_PREWARM", "0")
+    backend = pytest.importorskip("backend")
+    return backend.app.test_client()
+
+
+@pytest.mark.parametrize("body", [[], ["Lisbon"], "Lisbon", 3])
+def test_flask_rejects_a_body_that_is_not_an_object(client, body):
+    for path in ("/generate-plan", "/ask-question"):
+        response = client.post(path, json=body)
+        assert response.status_code == 400
+        assert "error" in response.get_json()
@@ -0,0 +1,100 @@
+from travelgpt.scheduler import Activity, extend_stay, format_clock, parse_clock, schedule
+
+PLAN = """# Paris
+
+## Day 1
+- 9:00 AM–12:00 PM: Visit the Louvre
+- 12:30 PM–4:30 PM: Palace of Versailles
+    - Train from Saint-Lazare
+
+## Day 2
+- 8:00 AM–9:00 AM: Breakfast at Café de Flore
+- 9:30 AM–11:30 AM: Shopping at Marché aux Puces
+- 12:00 PM–1:00 PM: Lunch at Breizh Café
+- 1:30 PM–3:30 PM: Free time in Le Marais
+- 4:00 PM–6:00 PM: Sainte-Chapelle
+- 7:00 PM–9:00 PM: Dinner at Le Comptoir
+"""
+
+
+def names(activities):
+    return sorted(a.name for a in activities)
+
+
+def test_clock_round_trip():
+    assert parse_clock("9:30 PM") == (21 * 60 + 30, "p")
+    assert parse_clock("12", "a") == (0, "a")
+    assert format_clock(21 * 60 + 30) == "9:30 PM"
+    assert format_clock(9 * 60, twelve_hour=False) == "09:00"
+
+
+def test_long_extension_keeps_meals_and_gives_up_low_priority_activities():
+    rescheduled = extend_stay(PLAN, "Louvre", 10)
+    placed = {slot.activity.name for slot in rescheduled.slots}
+    assert {"Breakfast at Café de Flore", "Lunch at Breizh Café", "Dinner at Le Comptoir"} <= placed
+    assert {"Palace of Versailles", "Sainte-Chapelle"} <= placed
+    assert names(rescheduled.dropped) == ["Free time in Le Marais", "Shopping at Marché aux Puces"]
+    plan = rescheduled.plan()
+    assert "9:00 AM–10:00 PM: Visit the Louvre" in plan
+    assert "    - Train from Saint-Lazare" in plan
+
+
+def test_short_extension_only_shifts_the_day():
+    rescheduled = extend_stay(PLAN, "the Louvre", 1)
+    assert rescheduled.dropped == []
+    assert [(s.activity.name, s.day, format_clock(s.start)) for s in rescheduled.moved] == [
+        ("Palace of Versailles", 1, "1:30 PM")]
+
+
+def test_unknown_location_falls_back_to_the_llm():
+    assert extend_stay(PLAN, "Musée d'Orsay", 2) is None
+    assert extend_stay("No timed slots here.", "Louvre", 2) is None
+
+
+def test_eviction_takes_as_many_low_priority_slots_as_needed():
+    low = [Activity(f"low {i}", 60, priority=0.5, day=1, start=(9 + i) * 60) for i in range(3)]
+    lunch = Activity("lunch", 120, opens=10 * 60 + 30, closes=12 * 60 + 30, priority=2.0)
+    slots, dropped = schedule(low + [lunch], [1], {1: (9 * 60, 12 * 60 + 30)}, travel=lambda previous, activity: 0)
+    assert [(slot.activity.name, format_clock(slot.start)) for slot in slots] == [("low 0", "9:00 AM"),
+                                                                                  ("lunch", "10:30 AM")]
+    assert names(dropped) == ["low 1", "low 2"]
+
+
+def test_nothing_is_evicted_for_an_activity_of_equal_priority():
+    first, second = Activity("first", 120), Activity("second", 120)
+    slots, dropped = schedule([first, second], [1], {1: (9 * 60, 12 * 60)}, travel=lambda previous, activity: 0)
+    assert [slot.activity for slot in slots] == [first]
+    assert dropped == [second]
+
+
+PROSE_PLAN = """## Day 1
+- 9:00 AM–12:00 PM: Visit the Louvre
+**Lunch break**
+- 12:30 PM–1:30 PM: Lunch at Café Marly
+Note: closed Mondays.
+
+- 2:00 PM–4:00 PM: Musée de l'Orangerie
+    - Book the Monet rooms ahead
+
+## Day 2
+- 9:00 AM–11:00 AM: Sainte-Chapelle
+
+## 🍽️ Culinary Highlights
+- 7:00 PM–11:00 PM: Le Comptoir opening hours
+- Try the duck confit."""
+
+
+def test_prose_between_slots_is_kept():
+    plan = extend_stay(PROSE_PLAN, "Louvre", 1).plan()
+    for line in ("**Lunch break**", "Note: closed Mondays.", "- 1:30 PM–2:30 PM: Lunch at Café Marly",
+                 "- 3:00 PM–5:00 PM: Musée de l'Orangerie", "    - Book the Monet rooms ahead"):
+        assert line in plan
+    assert plan.index("**Lunch break**") < plan.index("Lunch at Café Marly") < plan.index("Note: closed Mondays.")
+    assert "Note: closed Mondays.\n\n- 3:00 PM" in plan
+
+
+def test_timed_lines_after_the_days_are_not_slots():
+    rescheduled = extend_stay(PROSE_PLAN, "Louvre", 1)
+    assert "Le Comptoir opening hours" not in {a.name for a in rescheduled.itinerary.activities}
+    plan = rescheduled.plan()
+    assert "## 🍽️ Culinary Highlights\n- 7:00 PM–11:00 PM: Le Comptoir opening hours\n- Try the duck confit." in plan
@@ -0,0 +1,49 @@
+from travelgpt.shared_cache import MemoryStore
+from travelgpt.tool_cache import ToolCallCache, is_error
+
+
+def counting(results):
+    calls = []
+
+    def tool(query):
+        calls.append(query)
+        return results[len(calls) - 1]
+
+    return tool, calls
+
+
+def test_results_are_reused_within_and_across_runs():
+    cache = ToolCallCache(store=MemoryStore("test-tool"))
+    tool, calls = counting(["beaches", "museums"])
+    search = cache.wrap(tool, name="search")
+    with cache.run() as stats:
+        assert search("Lisbon") == search(" lisbon ") == "beaches"
+    assert stats.duplicate_calls_avoided == 1
+    with cache.run() as stats:
+        assert search("Lisbon") == "beaches"
+    assert stats.cross_run_hits == 1
+    assert calls == ["Lisbon"]
+
+
+def test_errors_are_not_cached():
+    cache = ToolCallCache(store=MemoryStore("test-tool"))
+    tool, calls = counting([{"error": "rate limited"}, [[{"error": "timeout"}]], "Error: offline", "beaches"])
+    search = cache.wrap(tool, name="search")
+    with cache.run():
+        results = [search("Lisbon") for _ in range(4)]
+    assert results[-1] == "beaches"
+    assert len(calls) == 4
+    assert search("Lisbon") == "beaches" and len(calls) == 4
+
+
+def test_is_error():
+    assert is_error({"error": "x"}) and is_error("Error running tool") and is_error([[], [{"error": "x"}]])
+    assert is_error("Tool duckduckgo_search timed out after 30 seconds.")
+    assert not is_error({"facts": {}}) and not is_error("Lisbon: no errors reported")
+    assert not is_error({"error": None, "facts": {}}) and not is_error("Errors in the old guidebook are fixed")
+    assert not is_error([{"title": "t"}]) and not is_error(None)
+
+
+def test_the_shared_layer_is_bounded():
+    cache = ToolCallCache(max_size=2)
+    assert cache.store.max_size == 2
@@ -0,0 +1,63 @@
+import copy
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("phi.model.groq")
+
+from travelgpt.tool_executor import ConcurrentToolExecutor  # noqa: E402
+
+
+class Function:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeCall:
+    """The parts of phi's FunctionCall the executor uses."""
+
+    def __init__(self, name, seconds, result):
+        self.function = Function(name)
+        self.seconds = seconds
+        self.value = result
+        self.result = self.error = None
+
+    def model_copy(self):
+        return copy.copy(self)
+
+    def execute(self):
+        time.sleep(self.seconds)
+        self.result = self.value
+        return True
+
+
+def test_a_late_result_does_not_replace_the_timeout():
+    executor = ConcurrentToolExecutor(timeouts={"slow": 0.1})
+    slow, fast = FakeCall("slow", 0.5, "late"), FakeCall("fast", 0, "quick")
+    assert executor.execute_all([slow, fast]) == [False, True]
+    assert fast.result == "quick"
+    time.sleep(0.6)
+    assert slow.result == "Tool slow timed out after 0.1 seconds."
+
+
+def test_timeouts_start_when_a_call_starts_running():
+    executor = ConcurrentToolExecutor(max_workers=1, timeouts={"step": 0.3})
+    calls = [FakeCall("step", 0.2, i) for i in range(3)]
+    assert executor.execute_all(calls) == [True, True, True]
+    assert [c.result for c in calls] == [0, 1, 2]
+
+
+def test_runs_do_not_share_workers():
+    executor = ConcurrentToolExecutor(timeouts={"step": 0.5})
+    outcomes = []
+
+    def run():
+        outcomes.extend(executor.execute_all([FakeCall("step", 0.3, i) for i in range(8)]))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outcomes == [True] * 32
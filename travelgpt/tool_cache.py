@@ -0,0 +1,199 @@
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .cancellation import check_cancelled
+from .cassette import cassette, record_event, recording_active, to_jsonable
+from .instrumentation import span
+from .shared_cache import make_store
+
+# Cross-run results are reused for this many seconds
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "300"))
+# Cross-run results kept at most; the least recently used go first
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "2048"))
+# The failure messages of ConcurrentToolExecutor, and tools' own "Error: ..." answers
+ERROR_TEXT = re.compile(r"\s*(Error running tool\b|Tool \S+ timed out\b|Error:)")
+
+
+class RunStats:
+    """Tool call counters for a single agent run."""
+
+    def __init__(self):
+        self.memo = {}
+        self.tool_calls = 0
+        self.duplicate_calls_avoided = 0
+        self.cross_run_hits = 0
+        # Tool calls of one turn may run on several threads
+        self.lock = threading.Lock()
+
+    def as_dict(self):
+        return {
+            "tool_calls": self.tool_calls,
+            "duplicate_tool_calls_avoided": self.duplicate_calls_avoided,
+            "cross_run_cache_hits": self.cross_run_hits,
+        }
+
+
+_current_run = ContextVar("tool_cache_run", default=None)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).lower()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def is_error(value):
+    """Whether a tool result reports a failure (e.g. {"error": ...}) rather than an answer."""
+    if isinstance(value, dict):
+        return bool(value.get("error"))
+    if isinstance(value, str):
+        return ERROR_TEXT.match(value) is not None
+    if isinstance(value, (list, tuple)):
+        return any(is_error(item) for item in value)
+    return False
+
+
+class ToolCallCache:
+    """Memoizes tool calls per agent run, with a short-lived layer shared across runs."""
+
+    def __init__(self, ttl=TOOL_CACHE_TTL, store=None, max_size=TOOL_CACHE_SIZE):
+        self.ttl = ttl
+        # Shared between worker processes when TRAVELGPT_CACHE_BACKEND=sqlite
+        self.store = store or make_store("tool", max_size=max_size)
+
+    def make_key(self, name, func, args, kwargs):
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop("self", None)
+        except (TypeError, ValueError):
+            arguments = {"args": list(args), "kwargs": kwargs}
+        return name + ":" + json.dumps(_normalize(arguments), sort_keys=True, default=str)
+
+    def _get_shared(self, key):
+        return self.store.get(key)
+
+    def _set_shared(self, key, value):
+        self.store.set(key, value, self.ttl)
+
+    def call(self, name, func, args, kwargs):
+        with span("tool", name, cache_hit=False) as tool_span:
+            value = self._call(name, func, args, kwargs, tool_span)
+        if recording_active():
+            record_event("tool", name=name, args=to_jsonable(list(args)), kwargs=to_jsonable(kwargs),
+                         result=to_jsonable(value), cache_hit=tool_span.attributes["cache_hit"])
+        return value
+
+    def _call(self, name, func, args, kwargs, tool_span):
+        check_cancelled()
+        key = self.make_key(name, func, args, kwargs)
+        stats = _current_run.get()
+
+        if stats is not None:
+            with stats.lock:
+                stats.tool_calls += 1
+                if key in stats.memo:
+                    stats.duplicate_calls_avoided += 1
+                    tool_span.attributes["cache_hit"] = "run"
+                    return stats.memo[key]
+
+        found, value = self._get_shared(key)
+        if found:
+            tool_span.attributes["cache_hit"] = "shared"
+            if stats is not None:
+                with stats.lock:
+                    stats.cross_run_hits += 1
+        else:
+            value = func(*args, **kwargs)
+            if is_error(value):
+                # A failure may be gone on the next call: neither this run nor others should keep it
+                return value
+            self._set_shared(key, value)
+
+        if stats is not None:
+            with stats.lock:
+                stats.memo[key] = value
+        return value
+
+    def wrap(self, func, name=None):
+        """Returns a memoized version of a plain function tool."""
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(name, func, args, kwargs)
+
+        return wrapper
+
+    def wrap_toolkit(self, toolkit):
+        """Memoizes every function registered on a phi Toolkit, in place."""
+        for name, function in toolkit.functions.items():
+            if function.entrypoint is not None:
+                function.entrypoint = self.wrap(function.entrypoint, name=name)
+        return toolkit
+
+    def wrap_tools(self, tools):
+        return [self.wrap_toolkit(t) if hasattr(t, "functions") else self.wrap(t) for t in tools]
+
+    def clear(self):
+        self.store.clear()
+
+    @contextmanager
+    def run(self):
+        """Scopes the per-run memo to one agent run and yields its RunStats."""
+        stats = RunStats()
+        token = _current_run.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_run.reset(token)
+
+
+tool_cache = ToolCallCache()
+
+
+def run_agent(agent, prompt):
+    """Runs a phi agent with memoized tool calls and reports the stats in response.metrics.
+
+    Depending on AGENT_CASSETTE_MODE the run may also be recorded to, or replayed from, a cassette.
+    """
+    with tool_cache.run() as stats:
+        response = cassette.run(agent, prompt, lambda: agent.run(prompt))
+    if hasattr(response, "metrics"):
+        response.metrics = dict(response.metrics or {})
+        response.metrics.update(stats.as_dict())
+    return response, stats
+
+
+def stream_agent(agent, prompt, emit):
+    """Like run_agent, but passes the reply's text to `emit` as it is generated.
+
+    Returns (content, stats). Cassettes hold whole runs, so when a cassette mode is
+    set the text arrives in one piece.
+    """
+    with tool_cache.run() as stats:
+        if cassette.mode != "off":
+            response = cassette.run(agent, prompt, lambda: agent.run(prompt))
+            content = response.content or ""
+            emit(content)
+        else:
+            parts = []
+            for chunk in agent.run(prompt, stream=True):
+                check_cancelled()
+                delta = getattr(chunk, "content", None)
+                if delta:
+                    parts.append(delta)
+                    emit(delta)
+            content = "".join(parts)
+    return content, stats
@@ -0,0 +1,144 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from phi.model.groq import Groq
+
+from .cancellation import Cancelled, check_cancelled, current_token
+from .cassette import record_event, recording_active, message_dict, to_jsonable
+from .instrumentation import span
+
+# Seconds a single tool call may take before its result is replaced by a timeout error
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+TOOL_TIMEOUTS = {
+    "search_google": 20,
+    "search_youtube": 20,
+    "duckduckgo_search": 15,
+    "duckduckgo_news": 15,
+}
+
+
+class _Attempt:
+    """One tool call running on a copy of its FunctionCall, so a result that arrives after
+    the call timed out cannot overwrite the timeout message."""
+
+    def __init__(self, function_call):
+        self.call = function_call.model_copy()
+        self.started = None  # monotonic time a worker began running it
+
+    def run(self):
+        self.started = time.monotonic()
+        return self.call.execute()
+
+
+class ConcurrentToolExecutor:
+    """Runs the tool calls of one model turn concurrently, keeping results in call order.
+
+    Every turn gets threads of its own, so concurrent agent runs never queue behind each
+    other's tool calls, and a call's timeout starts when it starts running. A call that
+    overruns is abandoned: its thread finishes on its own and its result is dropped.
+    """
+
+    def __init__(self, max_workers=16, default_timeout=TOOL_TIMEOUT, timeouts=None):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.timeouts = dict(TOOL_TIMEOUTS if timeouts is None else timeouts)
+
+    def timeout_for(self, name):
+        return self.timeouts.get(name, self.default_timeout)
+
+    def execute_all(self, function_calls):
+        """Executes phi FunctionCalls concurrently and returns their success flags in call order."""
+        attempts = [_Attempt(function_call) for function_call in function_calls]
+        pool = ThreadPoolExecutor(max_workers=min(len(attempts), self.max_workers), thread_name_prefix="tool-call")
+        try:
+            # copy_context keeps the per-run tool memo visible inside the worker threads
+            futures = [pool.submit(contextvars.copy_context().run, attempt.run) for attempt in attempts]
+            return [self._outcome(function_call, attempt, future, futures)
+                    for function_call, attempt, future in zip(function_calls, attempts, futures)]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _outcome(self, function_call, attempt, future, futures):
+        name = function_call.function.name
+        timeout = self.timeout_for(name)
+        try:
+            success = bool(self._result(future, attempt, timeout))
+        except Cancelled:
+            for pending in futures:
+                pending.cancel()
+            raise
+        except TimeoutError:
+            future.cancel()
+            function_call.result = f"Tool {name} timed out after {timeout:g} seconds."
+            function_call.error = function_call.result
+            return False
+        except Exception as e:
+            function_call.result = f"Error running tool {name}: {str(e)}"
+            function_call.error = str(e)
+            return False
+        function_call.result, function_call.error = attempt.call.result, attempt.call.error
+        return success
+
+    @staticmethod
+    def _result(future, attempt, timeout):
+        token = current_token()
+        while True:
+            started = attempt.started
+            # Wake up now and then to notice a cancelled run, and the call being picked up
+            wait = 0.25 if started is None else min(0.25, max(0.0, started + timeout - time.monotonic()))
+            try:
+                return future.result(timeout=wait)
+            except TimeoutError:
+                if started is not None and time.monotonic() >= started + timeout:
+                    raise
+                if token is not None:
+                    token.check()
+
+
+tool_executor = ConcurrentToolExecutor()
+
+
+def _record_usage(llm_span, usage):
+    if usage is None:
+        return
+    llm_span.attributes["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+    llm_span.attributes["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+    # Reported by the provider when the prompt prefix was served from its cache
+    # (a dict when the SDK does not model the field, as on the x_groq usage of a stream)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    llm_span.attributes["cached_prompt_tokens"] = cached or 0
+
+
+class ParallelToolsGroq(Groq):
+    """Groq model that executes all tool calls of a single assistant turn at the same time."""
+
+    def invoke(self, messages):
+        check_cancelled()
+        with span("llm", self.id) as llm_span:
+            response = super().invoke(messages)
+            _record_usage(llm_span, getattr(response, "usage", None))
+        if recording_active():
+            record_event("llm", model=self.id, request=[message_dict(m) for m in messages],
+                         response=to_jsonable(response))
+        return response
+
+    def invoke_stream(self, messages):
+        with span("llm", self.id, stream=True) as llm_span:
+            for chunk in super().invoke_stream(messages):
+                check_cancelled()
+                # Groq reports usage on the last chunk of a stream
+                _record_usage(llm_span, getattr(getattr(chunk, "x_groq", None), "usage", None))
+                yield chunk
+
+    def run_function_calls(self, function_calls, function_call_results, tool_role="tool"):
+        check_cancelled()
+        if len(function_calls) > 1:
+            outcomes = tool_executor.execute_all(function_calls)
+            # The base loop still emits events and tool messages in call order,
+            # it just picks up the results that are already there.
+            for function_call, success in zip(function_calls, outcomes):
+                object.__setattr__(function_call, "execute", lambda success=success: success)
+        yield from super().run_function_calls(function_calls, function_call_results, tool_role)
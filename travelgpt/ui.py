@@ -0,0 +1,134 @@
+"""Streamlit helpers shared by the apps. Streamlit is imported on use only."""
+import functools
+
+from .plan_diff import plan_changes
+from .plan_sections import split_plan, plan_version
+from .preflight import InvalidTrip, normalize_trip
+from .speculation import SPECULATE, Speculator
+
+FULL_PLAN = "📄 Full plan"
+
+
+def write_agent_stream(stream, label="🔍 Researching and planning your trip..."):
+    """Renders an AgentStream: tool calls live in a status box, the reply as its tokens arrive.
+
+    Returns the complete AgentReply.
+    """
+    import streamlit as st
+
+    status = st.status(label, expanded=False)
+
+    def on_tool(event, span):
+        if event == "start":
+            status.update(label=f"🔧 {span.name}...")
+        else:
+            cached = " · cached" if span.attributes.get("cache_hit") else ""
+            failed = " · failed" if span.error else ""
+            status.write(f"`{span.name}` {span.duration:.1f}s{cached}{failed}")
+
+    stream.on_tool = on_tool
+    try:
+        st.write_stream(stream)
+    except Exception:
+        status.update(label="Something went wrong", state="error")
+        raise
+    status.update(label=label.replace("...", "").strip() + " ✓", state="complete")
+    return stream.reply
+
+
+def _draw_plan(plan, key):
+    import streamlit as st
+
+    sections = split_plan(plan)
+    if len(sections) < 2:
+        st.markdown(plan)
+        return
+    titles = [title for title, _ in sections] + [FULL_PLAN]
+    # Keyed on the plan version so a new plan starts again at its first section
+    choice = st.radio("Section", range(len(titles)), format_func=titles.__getitem__, horizontal=True,
+                      key=f"{key}_section_{plan_version(plan)}", label_visibility="collapsed")
+    st.markdown(plan if choice == len(sections) else sections[choice][1])
+
+
+@functools.lru_cache(maxsize=None)
+def _plan_fragment():
+    import streamlit as st
+
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(_draw_plan) if fragment else _draw_plan
+
+
+def render_plan(plan, key="plan"):
+    """Draws a plan one section (overview, day, dining, ...) at a time.
+
+    Only the selected section's markdown is sent to the browser. Sections are split
+    once per plan version, and the selector runs as a fragment where Streamlit
+    supports it, so switching sections doesn't rerun the rest of the page.
+    """
+    _plan_fragment()(plan, key)
+
+
+def render_plan_changes(old_plan, new_plan, key="changes"):
+    """Draws only the sections of `new_plan` that differ from `old_plan`, with their line diff."""
+    import streamlit as st
+
+    changes = plan_changes(old_plan or "", new_plan or "")
+    if not changes:
+        st.info("No changes to the plan.")
+        return
+    st.caption(f"✏️ {len(changes)} section{'s' if len(changes) != 1 else ''} changed: "
+               + ", ".join(title for title, _, _ in changes))
+    toggle = getattr(st, "toggle", st.checkbox)
+    for index, (title, markdown, diff) in enumerate(changes):
+        with st.expander(f"✏️ {title}", expanded=index == 0):
+            st.markdown(markdown)
+            if diff and toggle("Show line changes", key=f"{key}_{plan_version(new_plan)}_{index}"):
+                st.code(diff, language="diff")
+
+
+def _speculator():
+    import streamlit as st
+
+    if "_speculator" not in st.session_state:
+        st.session_state._speculator = Speculator()
+    return st.session_state._speculator
+
+
+def _plan_key(destination, present_location, start_date, end_date, budget, travel_style):
+    """Key of the normalized request, so respellings of the same trip share a speculative run."""
+    try:
+        return normalize_trip(destination, present_location, start_date, end_date, budget, travel_style).key
+    except InvalidTrip:
+        return None
+
+
+def _speculate(travel_agent, plan_args):
+    import streamlit as st
+
+    stream = _speculator().observe(_plan_key(*plan_args), lambda: travel_agent.stream_travel_plan(*plan_args))
+    if stream is not None:
+        st.caption("⚡ Plan ready" if stream.done else "⚡ Drafting your plan in the background...")
+
+
+@functools.lru_cache(maxsize=None)
+def _speculation_fragment():
+    import streamlit as st
+
+    fragment = getattr(st, "fragment", None)
+    # Re-checks once a second so the debounce can expire without any user interaction
+    return fragment(run_every=1)(_speculate) if fragment else _speculate
+
+
+def speculate(travel_agent, *plan_args):
+    """Opt-in (TRAVELGPT_SPECULATE=1) background generation for the current sidebar inputs.
+
+    `plan_args` are the arguments of `stream_travel_plan`; call this on every rerun.
+    """
+    if SPECULATE:
+        _speculation_fragment()(travel_agent, plan_args)
+
+
+def plan_stream(travel_agent, *plan_args):
+    """The stream to show for a Generate click: the speculative run for these inputs, or a new one."""
+    stream = _speculator().claim(_plan_key(*plan_args)) if SPECULATE else None
+    return stream or travel_agent.stream_travel_plan(*plan_args)
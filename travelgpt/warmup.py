@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+
+from .instrumentation import metrics
+
+# Warm the agent in the background as soon as a backend starts (set to 0 to build it on the first request)
+PREWARM = os.getenv("TRAVELGPT_PREWARM", "1") == "1"
+
+
+class Warmup:
+    """Runs start-up steps on a background thread and reports readiness for a /ready probe.
+
+    If the warm-up is never started the service counts as ready: the first request
+    then pays for the lazy imports instead.
+    """
+
+    def __init__(self, *steps):
+        self.steps = steps
+        self.state = "cold"
+        self.error = None
+        self.seconds = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self.state = "warming"
+                self._thread = threading.Thread(target=self.run, name="travelgpt-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            for step in self.steps:
+                step()
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            metrics.inc("travelgpt_warmup_failures_total", ())
+        else:
+            self.state = "ready"
+        self.seconds = time.perf_counter() - started
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        return self.state in ("cold", "ready")
+
+    def status(self):
+        status = {"status": self.state, "ready": self.ready}
+        if self.seconds is not None:
+            status["warmup_seconds"] = round(self.seconds, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
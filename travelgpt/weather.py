@@ -0,0 +1,76 @@
+import os
+from urllib.parse import quote
+
+from .http_client import http_client
+from .shared_cache import make_store
+
+OPENWEATHERMAP_FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+# Forecasts change slowly; reuse one per location for this many seconds
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+
+weather_store = make_store("weather", max_size=1024)
+
+
+class WeatherError(Exception):
+    """Raised when OpenWeatherMap answers with a non-200 status."""
+
+
+def needs_update_for_heat_or_rain(temperature, condition):
+    """Outdoor plans suffer above 20°C or in moderate/heavy rain."""
+    return temperature > 20 or 'moderate rain' in condition or 'heavy rain' in condition
+
+
+def needs_update_for_extremes(temperature, condition):
+    """Outdoor plans suffer outside 5–15°C or in rain, storms or snow."""
+    return (
+        temperature > 15 or
+        temperature < 5 or
+        'rain' in condition or
+        'storm' in condition or
+        'snow' in condition
+    )
+
+
+def fetch_forecast(location, api_key):
+    """Returns the first forecast slot as {temperature, condition, country}, cached per location."""
+    key = " ".join(location.split()).lower()
+    found, forecast = weather_store.get(key)
+    if found:
+        return forecast
+
+    url = f"{OPENWEATHERMAP_FORECAST_URL}?q={quote(location)}&appid={api_key}&units=metric"
+    response = http_client.get(url)
+    if response.status_code != 200:
+        raise WeatherError(f"Error fetching weather data. Status code: {response.status_code}")
+
+    data = response.json()
+    forecast = {
+        'temperature': data['list'][0]['main']['temp'],
+        'condition': data['list'][0]['weather'][0]['description'].lower(),
+        'country': data['city']['country'],
+    }
+    weather_store.set(key, forecast, WEATHER_CACHE_TTL)
+    return forecast
+
+
+def get_weather(location: str, needs_update=needs_update_for_extremes):
+    """Fetches the weather forecast for a given location."""
+    api_key = os.environ.get("OPENWEATHERMAP_API_KEY")
+    if not api_key:
+        return {
+            'success': False,
+            'error': "API key not found. Please set OPENWEATHERMAP_API_KEY in the .env file."
+        }
+
+    try:
+        forecast = fetch_forecast(location, api_key)
+        return {
+            **forecast,
+            'needs_update': needs_update(forecast['temperature'], forecast['condition']),
+            'success': True
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }